@@ -0,0 +1,304 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import gspread
+from gspread.exceptions import WorksheetNotFound, APIError
+from gspread.utils import absolute_range_name
+
+from instrumentacao import registrar_chamada_api
+
+# --- CAMADA ÚNICA DE ACESSO AO GOOGLE SHEETS ---
+# Os dois scripts (backup e predição) usam o mesmo Service Account, só que cada workflow
+# expõe o segredo com um nome diferente. Aceitamos os dois.
+VARIAVEIS_CREDENCIAIS = ('GCP_SA_CREDENTIALS', 'GSPREAD_SERVICE_ACCOUNT_CREDENTIALS')
+
+# Retentativa com backoff exponencial + jitter para erros de cota (429) e instabilidades (5xx)
+TENTATIVAS_MAXIMAS = 6
+ESPERA_BASE_SEGUNDOS = 1.0
+ESPERA_MAXIMA_SEGUNDOS = 64.0
+CODIGOS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+# Limite de requisições do processo inteiro (balde de fichas): várias lojas em paralelo dividem a
+# mesma cota do Service Account (60 leituras + 60 escritas por minuto por usuário). 0 = sem limite.
+REQUISICOES_POR_MINUTO = float(os.environ.get('SHEETS_REQUISICOES_POR_MINUTO', '60'))
+RAJADA_REQUISICOES = int(os.environ.get('SHEETS_RAJADA_REQUISICOES', '10'))
+
+# Fonte dos dados: 'gspread' (Google Sheets, padrão) ou offline: 'csv', 'parquet', 'sqlite' (ver fontes_dados)
+FONTE_DADOS = os.environ.get('FONTE_DADOS', 'gspread').lower()
+DIRETORIO_FONTE_DADOS = os.environ.get('FONTE_DADOS_DIR', 'dados_offline')
+
+# Cliente autorizado (sessão HTTP) e planilhas já abertas, reaproveitados no processo inteiro
+_CLIENTE = None
+_PLANILHAS_ABERTAS = {}
+# --------------------------------------------------------------------------------
+
+
+class BaldeDeFichas:
+    """
+    Token bucket compartilhado entre threads: até `capacidade` requisições de uma vez e, depois,
+    `por_minuto` em média. Quem chega sem ficha reserva a próxima (o saldo fica negativo) e
+    dorme fora do lock só o tempo da sua vez, então as threads são atendidas na ordem de chegada.
+    """
+
+    def __init__(self, por_minuto, capacidade):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = max(capacidade, 1)
+        self.fichas = float(self.capacidade)
+        self.atualizado_em = time.monotonic()
+        self.espera_total = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        """Consome uma ficha, dormindo se preciso. Retorna os segundos esperados."""
+        with self._lock:
+            agora = time.monotonic()
+            self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado_em) * self.taxa)
+            self.atualizado_em = agora
+            self.fichas -= 1
+            espera = -self.fichas / self.taxa if self.fichas < 0 else 0.0
+            self.espera_total += espera
+        if espera:
+            time.sleep(espera)
+        return espera
+
+
+def _criar_limitador():
+    return BaldeDeFichas(REQUISICOES_POR_MINUTO, RAJADA_REQUISICOES) if REQUISICOES_POR_MINUTO > 0 else None
+
+
+# Só o Google Sheets tem cota: fontes offline e clientes injetados (usar_cliente) rodam sem limite
+_LIMITADOR = _criar_limitador() if FONTE_DADOS == 'gspread' else None
+
+
+def limitar_requisicao():
+    """Chamado antes de cada requisição à API (o limite vale para todas as lojas e threads)."""
+    if _LIMITADOR is not None:
+        _LIMITADOR.aguardar()
+
+
+def limitador_requisicoes():
+    """O balde de fichas em uso (None sem limite), para relatórios de espera."""
+    return _LIMITADOR
+
+
+def autenticar_gspread():
+    """Autentica UMA VEZ por processo e devolve sempre o mesmo cliente (mesma sessão HTTP)."""
+    global _CLIENTE
+    if _CLIENTE is not None:
+        return _CLIENTE
+
+    if FONTE_DADOS != 'gspread':
+        # Fonte offline: mesma interface de planilha, sem credenciais nem rede
+        from fontes_dados import criar_cliente
+        _CLIENTE = criar_cliente(FONTE_DADOS, DIRETORIO_FONTE_DADOS)
+        return _CLIENTE
+
+    credenciais_json = next((os.environ[v] for v in VARIAVEIS_CREDENCIAIS if os.environ.get(v)), None)
+    if not credenciais_json:
+        raise ConnectionError(f"Nenhuma das variáveis de ambiente {VARIAVEIS_CREDENCIAIS} foi encontrada. O fluxo vai falhar!")
+
+    _CLIENTE = gspread.service_account_from_dict(json.loads(credenciais_json))
+    return _CLIENTE
+
+
+def usar_cliente(cliente, limitar=False):
+    """
+    Troca o cliente do processo (ex.: ClienteMemoria nos benchmarks) e esquece as planilhas abertas.
+    limitar=True aplica o limite de REQUISICOES_POR_MINUTO também a esse cliente.
+    """
+    global _CLIENTE, _LIMITADOR
+    _CLIENTE = cliente
+    _LIMITADOR = _criar_limitador() if limitar else None
+    _PLANILHAS_ABERTAS.clear()
+    return cliente
+
+
+def abrir_planilha(gc, sheet_id):
+    """Abre a planilha (1 ida à API de metadados) e reaproveita o objeto nas chamadas seguintes."""
+    chave = (id(gc), sheet_id)
+    if chave not in _PLANILHAS_ABERTAS:
+        limitar_requisicao()
+        _PLANILHAS_ABERTAS[chave] = gc.open_by_key(sheet_id)
+        registrar_chamada_api('open_by_key')
+    return _PLANILHAS_ABERTAS[chave]
+
+
+def abrir_planilhas(gc, sheet_ids):
+    """Abre várias planilhas em paralelo (thread pool). Retorna {sheet_id: planilha}."""
+    ids_unicos = list(dict.fromkeys(sheet_ids))
+    with ThreadPoolExecutor(max_workers=len(ids_unicos) or 1) as executor:
+        planilhas = executor.map(lambda sheet_id: abrir_planilha(gc, sheet_id), ids_unicos)
+        return dict(zip(ids_unicos, planilhas))
+
+
+def intervalo(aba_nome, celulas=None):
+    """Nome absoluto do intervalo em notação A1 (ex.: 'VENDAS'!A1:ZZ1). Sem células = aba inteira."""
+    return absolute_range_name(aba_nome, celulas)
+
+
+def _codigo_erro(erro):
+    """Status HTTP de um APIError do gspread."""
+    return getattr(erro, 'code', None) or getattr(erro.response, 'status_code', None)
+
+
+def _esperar_nova_tentativa(codigo, tentativa):
+    """Espera aleatória entre 0 e base * 2^tentativa (full jitter), limitada a ESPERA_MAXIMA_SEGUNDOS."""
+    espera = random.uniform(0, min(ESPERA_MAXIMA_SEGUNDOS, ESPERA_BASE_SEGUNDOS * 2 ** tentativa))
+    print(f"Alerta: API do Sheets respondeu {codigo}. Nova tentativa {tentativa + 2}/{TENTATIVAS_MAXIMAS} em {espera:.1f}s...")
+    time.sleep(espera)
+
+
+def com_retentativa(funcao, *args, **kwargs):
+    """
+    Executa a chamada à API repetindo em erros de cota/instabilidade (backoff com full jitter).
+    Só para chamadas idempotentes (leituras, sobrescritas): anexos usam anexar_sem_duplicar.
+    """
+    for tentativa in range(TENTATIVAS_MAXIMAS):
+        try:
+            return funcao(*args, **kwargs)
+        except APIError as e:
+            codigo = _codigo_erro(e)
+            if codigo not in CODIGOS_RETENTAVEIS or tentativa == TENTATIVAS_MAXIMAS - 1:
+                raise
+            _esperar_nova_tentativa(codigo, tentativa)
+
+
+def _eh_erro_de_aba(erro):
+    """Aba inexistente chega como erro 400 de intervalo inválido."""
+    return 'Unable to parse range' in str(erro)
+
+
+def _relancar_erro_de_aba(erro):
+    """Relança o erro da API, convertendo aba inexistente em WorksheetNotFound."""
+    if _eh_erro_de_aba(erro):
+        raise WorksheetNotFound(str(erro)) from erro
+    raise erro
+
+
+def ler_intervalos(planilha, intervalos, valores_brutos=False):
+    """
+    Lê vários intervalos (de uma ou mais abas) em UMA requisição values:batchGet.
+    Retorna uma lista de linhas (lista de listas) por intervalo, na mesma ordem.
+    valores_brutos=True devolve os números sem formatação (UNFORMATTED_VALUE).
+    """
+    if not intervalos:
+        return []
+
+    params = {'valueRenderOption': 'UNFORMATTED_VALUE'} if valores_brutos else None
+    limitar_requisicao()
+    try:
+        resposta = planilha.values_batch_get(intervalos, params=params)
+    except APIError as e:
+        _relancar_erro_de_aba(e)
+
+    registrar_chamada_api('values_batch_get', resposta)
+    return [faixa.get('values', []) for faixa in resposta.get('valueRanges', [])]
+
+
+def ler_abas(planilha, abas_nomes):
+    """Lê todas as abas pedidas em uma única requisição. Retorna {aba: linhas}."""
+    blocos = ler_intervalos(planilha, [intervalo(aba) for aba in abas_nomes])
+    return dict(zip(abas_nomes, blocos))
+
+
+def anexar_linhas(planilha, aba_nome, linhas):
+    """Anexa linhas no fim da aba direto pela planilha (sem buscar metadados da worksheet)."""
+    limitar_requisicao()
+    try:
+        resposta = planilha.values_append(
+            intervalo(aba_nome, 'A1'),
+            params={'valueInputOption': 'USER_ENTERED'},
+            body={'values': linhas},
+        )
+    except APIError as e:
+        _relancar_erro_de_aba(e)
+
+    registrar_chamada_api('values_append', linhas)
+    return resposta
+
+
+def contar_linhas_aba(planilha, aba_nome):
+    """Linhas ocupadas da aba (cabeçalho incluído), lendo só a coluna A - a data, sempre preenchida."""
+    return len(ler_intervalos(planilha, [intervalo(aba_nome, 'A:A')])[0])
+
+
+def ultima_linha_anexada(resposta):
+    """Última linha gravada por um values_append (updates.updatedRange, ex.: 'VENDAS'!A101:F150). None se ausente."""
+    faixa = ((resposta or {}).get('updates') or {}).get('updatedRange', '')
+    encontrado = re.search(r'(\d+)$', faixa)
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def lote_ja_anexado(planilha, aba_nome, fim_anterior, linhas):
+    """
+    Confere se um anexo cuja resposta se perdeu foi gravado: relê a aba logo depois de fim_anterior
+    (a última linha ocupada antes do envio). True = as linhas estão lá; False = nada foi gravado.
+    Qualquer outra coisa (lote pela metade, aba alterada por outra pessoa) não dá para decidir sozinho.
+    """
+    # A API omite linhas vazias no fim do intervalo lido
+    esperadas = max((posicao + 1 for posicao, linha in enumerate(linhas) if any(c != '' for c in linha)), default=0)
+    gravadas = com_retentativa(ler_intervalos, planilha, [intervalo(aba_nome, f'A{fim_anterior + 1}:ZZ{fim_anterior + len(linhas)}')])[0]
+    if not gravadas:
+        return False
+    if len(gravadas) == esperadas:
+        return True
+    raise RuntimeError(
+        f"Não foi possível confirmar o último anexo em '{aba_nome}': {len(gravadas)} de {len(linhas)} linhas "
+        f"após a linha {fim_anterior}. Confira a aba manualmente antes de rodar novamente."
+    )
+
+
+def anexar_sem_duplicar(planilha, aba_nome, linhas, fim_anterior=None):
+    """
+    Anexa linhas com retentativa SEM duplicar. values_append não é idempotente: um 5xx pode chegar
+    depois de o servidor gravar o lote, e reenviar às cegas grava tudo duas vezes. Antes de reenviar,
+    relê o fim da aba (lote_ja_anexado). 429 é recusado antes de gravar e é reenviado direto.
+    fim_anterior: última linha ocupada da aba antes do envio (None = conta pela coluna A).
+    Retorna a nova última linha ocupada (fim_anterior do próximo lote).
+    """
+    if fim_anterior is None:
+        fim_anterior = com_retentativa(contar_linhas_aba, planilha, aba_nome)
+
+    for tentativa in range(TENTATIVAS_MAXIMAS):
+        try:
+            resposta = anexar_linhas(planilha, aba_nome, linhas)
+            return ultima_linha_anexada(resposta) or fim_anterior + len(linhas)
+        except APIError as e:
+            codigo = _codigo_erro(e)
+            if codigo not in CODIGOS_RETENTAVEIS or tentativa == TENTATIVAS_MAXIMAS - 1:
+                raise
+            _esperar_nova_tentativa(codigo, tentativa)
+            if codigo != 429 and lote_ja_anexado(planilha, aba_nome, fim_anterior, linhas):
+                print(f"Alerta: o lote de {len(linhas)} linhas já tinha sido gravado em '{aba_nome}' apesar do erro {codigo}. Não foi reenviado.")
+                return fim_anterior + len(linhas)
+
+
+def sobrescrever_aba(planilha, aba_nome, linhas):
+    """
+    Substitui todo o conteúdo da aba (cria a aba se não existir). Grava em RAW, sem
+    reinterpretar números/datas. Usa append após limpar para a grade crescer sozinha.
+    """
+    limitar_requisicao()
+    try:
+        planilha.values_clear(intervalo(aba_nome))
+        registrar_chamada_api('values_clear')
+    except APIError as e:
+        if not _eh_erro_de_aba(e):
+            raise
+        limitar_requisicao()
+        planilha.add_worksheet(title=aba_nome, rows=max(len(linhas), 1), cols=max(len(linhas[0]) if linhas else 1, 1))
+        registrar_chamada_api('add_worksheet')
+
+    limitar_requisicao()
+    resposta = planilha.values_append(
+        intervalo(aba_nome, 'A1'),
+        params={'valueInputOption': 'RAW'},
+        body={'values': linhas},
+    )
+    registrar_chamada_api('values_append', linhas)
+    return resposta
@@ -0,0 +1,23 @@
+import os
+from datetime import datetime
+
+# --- AGENDA DO BACKUP (SÓ BIBLIOTECA PADRÃO) ---
+# Consultada ANTES de importar gspread/pandas: nos dias sem backup o processo termina em milissegundos.
+DIA_EXECUCAO_BACKUP = int(os.environ.get('BACKUP_DIA_EXECUCAO', '1'))
+# --------------------------------------------------------------------------------
+
+
+def execucao_forcada():
+    """Execução sob demanda (input manual do workflow ou --forcar no cli.py)."""
+    return os.environ.get('FORCA_EXECUCAO_MANUAL', 'false').lower() == 'true'
+
+
+def backup_liberado_hoje():
+    """Retorna (liberado, forçado, dia de hoje): roda só no DIA_EXECUCAO_BACKUP, a menos que seja forçado."""
+    hoje = datetime.now().day
+    forcado = execucao_forcada()
+    return forcado or hoje == DIA_EXECUCAO_BACKUP, forcado, hoje
+
+
+def avisar_backup_dormindo(hoje):
+    print(f"Hoje é dia {hoje}. O Agente de Backup está dormindo (aguardando o dia {DIA_EXECUCAO_BACKUP} do mês).")
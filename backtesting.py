@@ -0,0 +1,151 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# --- BACKTESTING COM ORIGEM MÓVEL (ROLLING ORIGIN) ---
+# Cada modelo recebe a matriz Y (séries x períodos), as origens e o horizonte h, e devolve a previsão
+# de Y[:, origem + h - 1] usando só Y[:, :origem] - para todas as séries e origens de uma vez (NumPy).
+HORIZONTES_BACKTEST = tuple(int(h) for h in os.environ.get('BACKTEST_HORIZONTES', '1,2,3').split(','))
+
+# Mínimo de origens para um modelo entrar na comparação (o Naive entra sempre)
+MIN_ORIGENS = 3
+
+# Processos para avaliar (modelo, horizonte) em paralelo. 1 = sequencial (padrão, séries curtas)
+PROCESSOS_BACKTEST = int(os.environ.get('BACKTEST_PROCESSOS', '1'))
+
+PERIODO_SAZONAL = 12
+JANELA_TENDENCIA = 12
+# --------------------------------------------------------------------------------
+
+
+def _somas_acumuladas(Y):
+    """Soma acumulada com zero na frente: soma de Y[:, a:b] = C[:, b] - C[:, a]."""
+    return np.concatenate([np.zeros((Y.shape[0], 1)), np.cumsum(Y, axis=1)], axis=1)
+
+
+def prever_naive(Y, origens, h):
+    """Naive: repete o último valor observado."""
+    return Y[:, origens - 1]
+
+
+def prever_sazonal_naive(Y, origens, h):
+    """Naive sazonal: repete o valor do mesmo mês no ciclo anterior."""
+    defasagem = PERIODO_SAZONAL * int(np.ceil(h / PERIODO_SAZONAL))
+    return Y[:, origens + h - 1 - defasagem]
+
+
+def _media_movel(k):
+    def prever(Y, origens, h):
+        C = _somas_acumuladas(Y)
+        return (C[:, origens] - C[:, origens - k]) / k
+    prever.__doc__ = f"Média móvel dos últimos {k} meses."
+    return prever
+
+
+def _suavizacao_exponencial(alpha):
+    def prever(Y, origens, h):
+        # Nível suavizado calculado numa única passada no tempo (vetorizado entre séries)
+        nivel = np.empty_like(Y, dtype='float64')
+        nivel[:, 0] = Y[:, 0]
+        for t in range(1, Y.shape[1]):
+            nivel[:, t] = alpha * Y[:, t] + (1 - alpha) * nivel[:, t - 1]
+        return nivel[:, origens - 1]
+    prever.__doc__ = f"Suavização exponencial simples (alpha={alpha})."
+    return prever
+
+
+def prever_tendencia_linear(Y, origens, h):
+    """Tendência linear (mínimos quadrados) nos últimos JANELA_TENDENCIA meses, extrapolada h passos."""
+    tempo = np.arange(Y.shape[1], dtype='float64')
+    C_y = _somas_acumuladas(Y)
+    C_xy = _somas_acumuladas(Y * tempo)
+    C_x = np.concatenate([[0.0], np.cumsum(tempo)])
+    C_xx = np.concatenate([[0.0], np.cumsum(tempo ** 2)])
+
+    inicio = np.maximum(origens - JANELA_TENDENCIA, 0)
+    n = (origens - inicio).astype('float64')
+    s_x, s_xx = C_x[origens] - C_x[inicio], C_xx[origens] - C_xx[inicio]
+    s_y, s_xy = C_y[:, origens] - C_y[:, inicio], C_xy[:, origens] - C_xy[:, inicio]
+
+    denominador = n * s_xx - s_x ** 2
+    inclinacao = np.divide(n * s_xy - s_x * s_y, denominador, out=np.zeros_like(s_y), where=denominador != 0)
+    intercepto = (s_y - inclinacao * s_x) / n
+    return intercepto + inclinacao * (origens - 1 + h)
+
+
+# Nome exibido -> (função, histórico mínimo em meses)
+MODELO_BASELINE = 'Naive (Última Observação)'
+MODELOS = {
+    MODELO_BASELINE: (prever_naive, 1),
+    'Média Móvel 3M': (_media_movel(3), 3),
+    'Média Móvel 6M': (_media_movel(6), 6),
+    'Suavização Exponencial (α=0.3)': (_suavizacao_exponencial(0.3), 2),
+    'Suavização Exponencial (α=0.7)': (_suavizacao_exponencial(0.7), 2),
+    'Tendência Linear 12M': (prever_tendencia_linear, 3),
+    'Naive Sazonal (12M)': (prever_sazonal_naive, PERIODO_SAZONAL),
+}
+
+
+def selecionar_modelos(qtd_periodos, horizonte):
+    """Modelos com histórico suficiente para pelo menos MIN_ORIGENS origens (Naive sempre entra)."""
+    return [
+        nome for nome, (_, minimo) in MODELOS.items()
+        if nome == MODELO_BASELINE or qtd_periodos - horizonte - minimo + 1 >= MIN_ORIGENS
+    ]
+
+
+def origens_comuns(qtd_periodos, horizonte, modelos):
+    """Origens avaliadas por TODOS os modelos selecionados (erros comparáveis entre si)."""
+    inicio = max(MODELOS[nome][1] for nome in modelos)
+    return np.arange(inicio, qtd_periodos - horizonte + 1)
+
+
+def erros_absolutos(Y, nome_modelo, horizonte, origens):
+    """Matriz de erros absolutos (séries x origens) do modelo no horizonte."""
+    previsoes = MODELOS[nome_modelo][0](Y, origens, horizonte)
+    return np.abs(Y[:, origens + horizonte - 1] - previsoes)
+
+
+def _avaliar_tarefa(tarefa):
+    """Unidade de trabalho do pool: MAE de um (modelo, horizonte) sobre a série."""
+    y, nome_modelo, horizonte, origens = tarefa
+    if not len(origens):
+        return nome_modelo, horizonte, np.nan
+    return nome_modelo, horizonte, float(erros_absolutos(y[np.newaxis, :], nome_modelo, horizonte, origens).mean())
+
+
+def executar_backtest(serie, horizontes=HORIZONTES_BACKTEST, processos=PROCESSOS_BACKTEST):
+    """
+    Avalia todos os modelos elegíveis em origem móvel para cada horizonte.
+    Retorna o leaderboard (DataFrame indexado pelo modelo, colunas MAE_h{n}), ordenado pelo
+    MAE fora da amostra no horizonte 1 - o primeiro da lista é o modelo escolhido.
+    """
+    y = np.asarray(serie, dtype='float64')
+    modelos = selecionar_modelos(len(y), 1)
+
+    tarefas = []
+    for horizonte in horizontes:
+        for nome in modelos:
+            origens = origens_comuns(len(y), horizonte, modelos)
+            tarefas.append((y, nome, horizonte, origens))
+
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_avaliar_tarefa, tarefas))
+    else:
+        resultados = [_avaliar_tarefa(tarefa) for tarefa in tarefas]
+
+    leaderboard = pd.DataFrame(index=pd.Index(modelos, name='Modelo'))
+    for nome, horizonte, mae in resultados:
+        leaderboard.loc[nome, f'MAE_h{horizonte}'] = mae
+    leaderboard['Origens'] = len(origens_comuns(len(y), horizontes[0], modelos))
+
+    return leaderboard.sort_values(f'MAE_h{horizontes[0]}', na_position='last', kind='stable')
+
+
+def prever_proximo(serie, nome_modelo, horizonte=1):
+    """Previsão do modelo para o período seguinte ao fim da série (origem = tamanho da série)."""
+    y = np.asarray(serie, dtype='float64')[np.newaxis, :]
+    return float(MODELOS[nome_modelo][0](y, np.array([y.shape[1]]), horizonte)[0, 0])
@@ -1,90 +1,512 @@
 import gspread
 import os 
-import json 
 import sys
+import json
+import threading
+import numpy as np
+from collections import Counter
 from datetime import datetime
 
+from acesso_planilhas import (
+    autenticar_gspread, abrir_planilhas, ler_abas, ler_intervalos, anexar_sem_duplicar, lote_ja_anexado,
+    contar_linhas_aba, sobrescrever_aba, intervalo, com_retentativa,
+)
+from config_planilhas import PLANILHA_ORIGEM_ID, PLANILHA_HISTORICO_ID
+from cache_local import DIRETORIO_ESTADO, hash_linhas
+from indice_fingerprints import IndiceFingerprints, fingerprints_linhas
+from indice_diario import IndiceDiario, caminho_indice_diario
+from agendamento import backup_liberado_hoje, avisar_backup_dormindo
+from instrumentacao import iniciar_execucao, etapa, gravar_relatorio_execucao
+from resumo_mensal import (
+    ABA_RESUMO, agregar_resumo, combinar_resumos, resumo_para_linhas, linhas_para_resumo,
+    ler_resumo_arquivo, gravar_resumo_arquivo, cobertura_confere, resumo_do_historico,
+)
+
 # --- CONFIGURAÇÕES DAS PLANILHAS ---
 
-# IDs das planilhas (APENAS o ID)
-PLANILHA_ORIGEM_ID = "1LuqYrfR8ry_MqCS93Mpj9_7Vu0i9RUTomJU2n69bEug"  # Vendas e Gastos (Origem do mês)
-PLANILHA_HISTORICO_ID = "1XWdRbHqY6DWOlSO-oJbBSyOsXmYhM_NEA2_yvWbfq2Y" # HISTORICO DE VENDAS E GASTOS (Destino)
+# IDs das planilhas da loja única: ver config_planilhas (PLANILHA_ORIGEM_ID / PLANILHA_HISTORICO_ID)
 
 # Mapeamento das Abas: {ABA_ORIGEM (minúscula): ABA_DESTINO (MAIÚSCULA)}
 MAP_ABAS = {
     "vendas": "VENDAS",
     "gastos": "GASTOS"
 }
+
+# Modo de backup: 'streaming' (páginas + lotes + checkpoint) ou 'simples' (tudo em uma chamada)
+MODO_BACKUP = os.environ.get('BACKUP_MODO', 'streaming').lower()
+
+# Streaming: linhas lidas da origem por página e linhas anexadas ao histórico por lote
+TAMANHO_PAGINA = int(os.environ.get('BACKUP_TAMANHO_PAGINA', '5000'))
+TAMANHO_LOTE = int(os.environ.get('BACKUP_TAMANHO_LOTE', '1000'))
+
+# Checkpoint: quantas linhas de cada aba de origem já foram confirmadas no histórico e o lote em
+# envio (gravado ANTES de anexar). Fica no diretório de estado, comitado pelo workflow mesmo se falhar.
+ARQUIVO_CHECKPOINT = os.path.join(DIRETORIO_ESTADO, 'backup_checkpoint.json')
+# Lojas em paralelo gravam no mesmo arquivo (chaves diferentes): leitura + gravação sob lock
+_LOCK_CHECKPOINT = threading.Lock()
+
+# Anti-duplicação: só anexa linhas cujo fingerprint ainda não está no índice local da aba de destino
+DEDUPLICAR = os.environ.get('BACKUP_DEDUP', 'true').lower() == 'true'
+
+# Resumo mensal materializado (aba RESUMO_MENSAL no Histórico), atualizado a cada lote anexado.
+# O delta ainda não aplicado na planilha fica no diretório de estado (comitado mesmo se o backup falhar).
+MANTER_RESUMO = os.environ.get('BACKUP_RESUMO', 'true').lower() == 'true'
+ARQUIVO_RESUMO_PENDENTE = os.path.join(DIRETORIO_ESTADO, 'resumo_pendente.json')
 # -----------------------------------------------------------
 
 
-def autenticar_gspread():
-    """Autentica o gspread usando a variável de ambiente."""
-    credenciais_json_string = os.environ.get('GSPREAD_SERVICE_ACCOUNT_CREDENTIALS')
+def obter_indice(planilha_historico, aba_historico_name):
+    """
+    Carrega o índice de fingerprints da aba de destino. Na primeira vez (ou sem o cache), constrói lendo
+    o Histórico uma única vez. Um fingerprint por linha: índice com outra contagem (cache de uma execução
+    antiga) também é reconstruído.
+    """
+    indice = IndiceFingerprints.carregar(planilha_historico.id, aba_historico_name)
+    if indice is not None and len(indice) != com_retentativa(contar_linhas_aba, planilha_historico, aba_historico_name) - 1:
+        print(f"Alerta: índice de fingerprints de '{aba_historico_name}' não confere com o Histórico (cache antigo).")
+        indice = None
+    if indice is None:
+        print(f"Índice de fingerprints de '{aba_historico_name}' não encontrado. Construindo a partir do Histórico (varredura única)...")
+        dados_historico = com_retentativa(ler_abas, planilha_historico, [aba_historico_name])[aba_historico_name]
+        indice = IndiceFingerprints.construir(planilha_historico.id, aba_historico_name, dados_historico[1:])
+        indice.salvar()
+    return indice
+
 
-    if not credenciais_json_string:
-        raise Exception("Variável de ambiente GSPREAD_SERVICE_ACCOUNT_CREDENTIALS não encontrada!")
+def filtrar_linhas_ineditas(indice, linhas, ocorrencias):
+    """
+    Separa as linhas ainda não gravadas no Histórico.
+    Retorna (linhas_novas, fingerprints_novos, posicoes_novas) - as posições dentro de `linhas`.
+    """
+    fingerprints = fingerprints_linhas(linhas, ocorrencias)
+    posicoes = np.flatnonzero(~indice.contem(fingerprints))
+    return [linhas[posicao] for posicao in posicoes], fingerprints[posicoes], posicoes
 
-    try:
-        credenciais_dict = json.loads(credenciais_json_string)
-        return gspread.service_account_from_dict(credenciais_dict)
-    except Exception as e:
-        raise Exception(f"Erro ao carregar ou autenticar credenciais JSON: {e}")
+
+def registrar_resumo_pendente(cabecalho, linhas_anexadas, aba_historico_name, arquivo_pendente=ARQUIVO_RESUMO_PENDENTE):
+    """Agrega as linhas recém-anexadas e soma ao delta local pendente do resumo mensal."""
+    if not MANTER_RESUMO or not linhas_anexadas:
+        return
+    delta = agregar_resumo(cabecalho, linhas_anexadas, aba_historico_name)
+    if delta.empty:
+        return
+    gravar_resumo_arquivo(arquivo_pendente, combinar_resumos(ler_resumo_arquivo(arquivo_pendente), delta))
+
+
+def registrar_indice_diario(historico_id, cabecalho, linhas_anexadas, aba_historico_name):
+    """
+    Soma as linhas recém-anexadas ao índice diário salvo pelo predict (consultas de período e comparativo
+    anual). Sem índice salvo não há o que atualizar: o predict monta o próximo das abas brutas.
+    """
+    if not linhas_anexadas:
+        return
+    caminho = caminho_indice_diario(historico_id)
+    indice_diario = IndiceDiario.carregar(caminho)
+    if indice_diario is None:
+        return
+    indice_diario.adicionar_linhas(cabecalho, linhas_anexadas, aba_historico_name)
+    indice_diario.salvar(caminho)
+
+
+def aplicar_resumo_pendente(planilha_historico, abas_historico=None, arquivo_pendente=ARQUIVO_RESUMO_PENDENTE):
+    """
+    Soma o delta pendente à aba RESUMO_MENSAL (poucas dezenas de linhas) e regrava a aba.
+    Antes de gravar, confere o resultado com as abas do Histórico (linhas de controle LINHAS_BRUTAS):
+    delta perdido ou somado duas vezes, resumo antigo sem controle, aba inexistente ou
+    BACKUP_RESUMO_RECONSTRUIR=true reconstroem o resumo a partir do Histórico completo (varredura
+    única, com o histórico importado de CSV da aba RESUMO_IMPORTADO).
+    abas_historico: abas de destino lidas nessa reconstrução (padrão: as de MAP_ABAS).
+    """
+    if not MANTER_RESUMO:
+        return
+    
+    abas_historico = list(abas_historico or MAP_ABAS.values())
+    pendente = ler_resumo_arquivo(arquivo_pendente)
+    reconstruir = os.environ.get('BACKUP_RESUMO_RECONSTRUIR', 'false').lower() == 'true'
+    
+    linhas_resumo = []
+    if not reconstruir:
+        try:
+            linhas_resumo = com_retentativa(ler_intervalos, planilha_historico, [intervalo(ABA_RESUMO)], valores_brutos=True)[0]
+        except gspread.exceptions.WorksheetNotFound:
+            linhas_resumo = []
+    
+    resumo = None
+    if linhas_resumo:
+        resumo = combinar_resumos(linhas_para_resumo(linhas_resumo), pendente)
+        divergentes = cobertura_confere(planilha_historico, resumo, abas_historico)
+        if divergentes:
+            print(f"Alerta: '{ABA_RESUMO}' (com o delta pendente) não confere com {', '.join(divergentes)} do Histórico.")
+            resumo = None
+        elif pendente is None:
+            return
+    
+    if resumo is None:
+        print(f"Construindo a aba '{ABA_RESUMO}' a partir do Histórico completo (varredura única)...")
+        resumo = resumo_do_historico(planilha_historico, abas_historico)
+    
+    com_retentativa(sobrescrever_aba, planilha_historico, ABA_RESUMO, resumo_para_linhas(resumo))
+    if os.path.exists(arquivo_pendente):
+        os.remove(arquivo_pendente)
+    print(f"Resumo mensal '{ABA_RESUMO}' atualizado ({len(resumo)} linhas).")
 
 
-def fazer_backup(gc, planilha_origem_id, planilha_historico_id, aba_origem_name, aba_historico_name):
+def fazer_backup(planilha_origem, planilha_historico, aba_origem_name, aba_historico_name, dados_do_mes=None, arquivo_pendente=ARQUIVO_RESUMO_PENDENTE):
     """
     Função modularizada que copia os dados. A LIMPEZA DA ORIGEM AGORA É MANUAL.
+    Retorna quantas linhas foram anexadas ao Histórico.
+    As planilhas chegam já abertas (uma vez só, no main); dados_do_mes pode vir pré-carregado
+    pela leitura em lote de todas as abas de origem.
+    Usa o mesmo checkpoint do streaming: as linhas confirmadas em execuções anteriores ficam de fora.
     """
     print(f"\n--- Iniciando Backup: {aba_origem_name.upper()} para {aba_historico_name} ---")
-    
+
     try:
-        # 1. Abre a aba de origem e pega todos os dados
-        planilha_origem = gc.open_by_key(planilha_origem_id).worksheet(aba_origem_name)
-        dados_do_mes = planilha_origem.get_all_values()
-        
+        # 1. Pega todos os dados da aba de origem (se ainda não vieram na leitura em lote)
+        if dados_do_mes is None:
+            dados_do_mes = ler_abas(planilha_origem, [aba_origem_name])[aba_origem_name]
+
         # 2. Verifica se há dados novos (dados_do_mes[1:] exclui o cabeçalho)
-        dados_para_copiar = dados_do_mes[1:] 
+        dados_para_copiar = dados_do_mes[1:]
 
         if not dados_para_copiar:
             print(f"Não há novos dados na aba '{aba_origem_name}' para consolidar (apenas cabeçalho).")
-            return
+            return 0
 
-        # 3. Abre a aba de destino (Histórico)
-        planilha_historico = gc.open_by_key(planilha_historico_id).worksheet(aba_historico_name)
-        
-        # 4. Apêndice: Insere os dados no Histórico.
-        planilha_historico.append_rows(dados_para_copiar, value_input_option='USER_ENTERED')
-        
-        print(f"Backup de {len(dados_para_copiar)} linhas concluído e consolidado na aba '{aba_historico_name}'.")
-        print(f"=========================================================================")
-        print(f"!!! ATENÇÃO !!!: A limpeza da aba de origem ('{aba_origem_name}') NÃO FOI FEITA.")
-        print(f"PARA EVITAR DUPLICAÇÃO NO PRÓXIMO MÊS, LIMPE MANUALMENTE esta aba APÓS a confirmação.")
-        print(f"=========================================================================")
+        # 3. Checkpoint: pula o trecho já confirmado (se a última linha confirmada ainda é a mesma)
+        chave = chave_checkpoint(planilha_origem, aba_origem_name, planilha_historico, aba_historico_name)
+        checkpoint = ler_checkpoint(chave)
+        confirmadas = checkpoint.get('linhas_confirmadas', 0)
+        hash_ultima = checkpoint.get('hash_ultima_linha')
+        em_envio = checkpoint.get('lote_em_envio')
+        if confirmadas and hash_linhas(dados_para_copiar[confirmadas - 1:confirmadas]) != hash_ultima:
+            print(f"Checkpoint de '{aba_origem_name}' não confere com a origem (aba limpa?). Recomeçando do zero.")
+            confirmadas, hash_ultima, em_envio = 0, None, None
+
+        indice = obter_indice(planilha_historico, aba_historico_name) if DEDUPLICAR else None
+        conferir_indice = indice is not None and confirmadas == 0
+        ocorrencias = Counter()
+        copiadas = 0
+        restantes = dados_para_copiar[confirmadas:]
+
+        if em_envio is not None:
+            lote, enviadas = confirmar_lote_interrompido(chave, planilha_historico, aba_historico_name, em_envio, restantes,
+                                                         confirmadas, indice, dados_do_mes[0], arquivo_pendente)
+            if conferir_indice:
+                fingerprints_linhas(lote, ocorrencias)
+            confirmadas += len(lote)
+            copiadas += len(enviadas)
+            restantes = restantes[len(lote):]
+
+        # 4. Anti-duplicação: descarta as linhas que já estão no Histórico (índice local, O(linhas novas)).
+        # Continuando um checkpoint, o resto é novo e a contagem de linhas iguais segue a do Histórico.
+        linhas_para_anexar, posicoes, fingerprints_novos = restantes, range(len(restantes)), None
+        if conferir_indice:
+            linhas_para_anexar, fingerprints_novos, posicoes = filtrar_linhas_ineditas(indice, restantes, ocorrencias)
+            if len(restantes) != len(linhas_para_anexar):
+                print(f"{len(restantes) - len(linhas_para_anexar)} linhas de '{aba_origem_name}' já estavam no Histórico e foram ignoradas.")
+        elif indice is not None:
+            indice.semear_ocorrencias(restantes, ocorrencias)
+            fingerprints_novos = fingerprints_linhas(restantes, ocorrencias)
+
+        # 5. Apêndice: Insere os dados no Histórico (direto pela planilha, sem reabrir a aba).
+        # Em 5xx a cauda do Histórico é relida antes de reenviar: o anexo não é idempotente.
+        if linhas_para_anexar:
+            fim_historico = com_retentativa(contar_linhas_aba, planilha_historico, aba_historico_name)
+            marcar_lote_em_envio(chave, confirmadas, hash_ultima, restantes, posicoes, fingerprints_novos, fim_historico)
+            anexar_sem_duplicar(planilha_historico, aba_historico_name, linhas_para_anexar, fim_historico)
+            registrar_lote_gravado(indice, fingerprints_novos, dados_do_mes[0], linhas_para_anexar, planilha_historico.id, aba_historico_name, arquivo_pendente)
+            copiadas += len(linhas_para_anexar)
+        gravar_checkpoint(chave, estado_checkpoint(len(dados_para_copiar), hash_linhas(dados_para_copiar[-1:])))
+
+        if not copiadas:
+            print(f"Nada novo para consolidar em '{aba_historico_name}'.")
+            return 0
+
+        print(f"Backup de {copiadas} linhas concluído e consolidado na aba '{aba_historico_name}'.")
+        if not DEDUPLICAR:
+            print(f"=========================================================================")
+            print(f"!!! ATENÇÃO !!!: A limpeza da aba de origem ('{aba_origem_name}') NÃO FOI FEITA.")
+            print(f"PARA EVITAR DUPLICAÇÃO NO PRÓXIMO MÊS, LIMPE MANUALMENTE esta aba APÓS a confirmação.")
+            print(f"=========================================================================")
 
         # O código de limpeza (batch_clear) foi REMOVIDO daqui.
+        return copiadas
+
+    except gspread.exceptions.WorksheetNotFound as e:
+        print(f"ERRO: A aba '{aba_origem_name}' ou '{aba_historico_name}' não foi encontrada.")
+        raise RuntimeError(f"Falha na validação da Planilha: {e}")
+    except Exception as e:
+        print(f"ERRO GRAVE durante o backup de {aba_origem_name}: {e}")
+        raise
+
+
+def chave_checkpoint(planilha_origem, aba_origem_name, planilha_historico, aba_historico_name):
+    """Chave do checkpoint: uma por par (aba de origem -> aba do Histórico), igual nos dois modos."""
+    return f"{planilha_origem.id}:{aba_origem_name}->{planilha_historico.id}:{aba_historico_name}"
+
+
+def ler_checkpoint(chave):
+    """Lê o checkpoint da chave (origem -> destino). Sem arquivo = começa do zero."""
+    try:
+        with _LOCK_CHECKPOINT, open(ARQUIVO_CHECKPOINT, 'r', encoding='utf-8') as f:
+            return json.load(f).get(chave, {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def gravar_checkpoint(chave, estado):
+    """Grava o checkpoint de forma atômica (arquivo temporário + replace), nunca pela metade."""
+    with _LOCK_CHECKPOINT:
+        try:
+            with open(ARQUIVO_CHECKPOINT, 'r', encoding='utf-8') as f:
+                checkpoints = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            checkpoints = {}
+
+        checkpoints[chave] = estado
+        os.makedirs(os.path.dirname(ARQUIVO_CHECKPOINT) or '.', exist_ok=True)
+        temporario = f"{ARQUIVO_CHECKPOINT}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(checkpoints, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, ARQUIVO_CHECKPOINT)
+
+
+def estado_checkpoint(confirmadas, hash_ultima, em_envio=None):
+    """Conteúdo do checkpoint de uma chave. em_envio: o lote que está sendo anexado agora."""
+    estado = {
+        'linhas_confirmadas': confirmadas,
+        'hash_ultima_linha': hash_ultima,
+        'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+    if em_envio is not None:
+        estado['lote_em_envio'] = em_envio
+    return estado
+
+
+def marcar_lote_em_envio(chave, confirmadas, hash_ultima, lote, posicoes, fingerprints_novos, fim_historico):
+    """
+    Grava no checkpoint, ANTES do anexo, o lote que vai ser enviado: as linhas da origem, quais delas
+    vão (posicoes), os fingerprints e a última linha ocupada do Histórico. O anexo não é idempotente.
+    """
+    em_envio = {
+        'linhas_origem': len(lote),
+        'hash_ultima_linha': hash_linhas(lote[-1:]),
+        'fim_historico': fim_historico,
+        'posicoes': [int(posicao) for posicao in posicoes],
+    }
+    if fingerprints_novos is not None:
+        em_envio['fingerprints'] = [int(fingerprint) for fingerprint in fingerprints_novos]
+    gravar_checkpoint(chave, estado_checkpoint(confirmadas, hash_ultima, em_envio))
+
+
+def confirmar_lote_interrompido(chave, planilha_historico, aba_historico_name, em_envio, linhas_origem, confirmadas, indice, cabecalho, arquivo_pendente):
+    """
+    A execução anterior parou com um lote em envio (entre o anexo e o checkpoint)? Se as linhas da
+    origem ainda são as mesmas e o lote chegou ao fim do Histórico, confirma o lote aqui em vez de
+    reenviá-lo. linhas_origem começa logo depois das confirmadas.
+    Retorna (linhas da origem confirmadas, linhas anexadas) - ([], []) se o lote precisa ser enviado.
+    """
+    lote = linhas_origem[:em_envio['linhas_origem']]
+    if len(lote) != em_envio['linhas_origem'] or hash_linhas(lote[-1:]) != em_envio['hash_ultima_linha']:
+        return [], []
+    enviadas = [lote[posicao] for posicao in em_envio['posicoes']]
+    if not lote_ja_anexado(planilha_historico, aba_historico_name, em_envio['fim_historico'], enviadas):
+        return [], []
+
+    print(f"Alerta: o lote interrompido na execução anterior já estava em '{aba_historico_name}'. Não será reenviado.")
+    fingerprints = np.array(em_envio['fingerprints'], dtype=np.uint64) if 'fingerprints' in em_envio else None
+    registrar_lote_gravado(indice, fingerprints, cabecalho, enviadas, planilha_historico.id, aba_historico_name, arquivo_pendente)
+    gravar_checkpoint(chave, estado_checkpoint(confirmadas + len(lote), hash_linhas(lote[-1:])))
+    return lote, enviadas
+
+
+def registrar_lote_gravado(indice, fingerprints_novos, cabecalho, linhas_anexadas, historico_id, aba_historico_name, arquivo_pendente):
+    """
+    Depois de um lote confirmado no Histórico: soma ao resumo pendente e ao índice diário e guarda os
+    fingerprints no índice de fingerprints.
+    """
+    registrar_resumo_pendente(cabecalho, linhas_anexadas, aba_historico_name, arquivo_pendente)
+    registrar_indice_diario(historico_id, cabecalho, linhas_anexadas, aba_historico_name)
+    if indice is not None and fingerprints_novos is not None:
+        indice.adicionar(fingerprints_novos)
+        indice.salvar()
+
+
+def fazer_backup_streaming(planilha_origem, planilha_historico, aba_origem_name, aba_historico_name, arquivo_pendente=ARQUIVO_RESUMO_PENDENTE):
+    """
+    Backup em streaming: lê a origem em páginas de TAMANHO_PAGINA linhas e anexa no Histórico
+    em lotes de TAMANHO_LOTE, com retentativa (backoff + jitter) em erro de cota.
+    Após cada lote confirmado grava o checkpoint: uma nova execução continua do último lote,
+    sem duplicar nem recomeçar. Se a última linha confirmada mudou na origem (aba limpa para
+    o mês novo), o checkpoint é descartado e a cópia começa do zero.
+    Antes de cada anexo o lote fica marcado no checkpoint (lote_em_envio): se a execução cair
+    sem saber se ele foi gravado, a próxima relê o fim do Histórico em vez de reenviar às cegas.
+    Retorna quantas linhas foram anexadas ao Histórico nesta execução.
+    """
+    print(f"\n--- Iniciando Backup (streaming): {aba_origem_name.upper()} para {aba_historico_name} ---")
+
+    chave = chave_checkpoint(planilha_origem, aba_origem_name, planilha_historico, aba_historico_name)
+    checkpoint = ler_checkpoint(chave)
+    confirmadas = checkpoint.get('linhas_confirmadas', 0)
+    hash_ultima = checkpoint.get('hash_ultima_linha')
+    em_envio = checkpoint.get('lote_em_envio')
+    conferir_checkpoint = confirmadas > 0
+    copiadas_agora = 0
+    ignoradas = 0
+    # Última linha ocupada do Histórico: contada antes do primeiro anexo, depois vem de cada resposta
+    fim_historico = None
+
+    # Retomada com checkpoint válido já garante que as linhas são inéditas: a contagem de linhas
+    # iguais continua a do Histórico (semear_ocorrencias). Partindo do zero (primeira cópia,
+    # checkpoint perdido ou aba limpa) cada lote é conferido no índice, contando desde a linha 1
+    # da origem. Um único Counter atravessa todas as páginas e lotes da aba.
+    indice = obter_indice(planilha_historico, aba_historico_name) if DEDUPLICAR else None
+    conferir_indice = indice is not None and confirmadas == 0
+    ocorrencias = Counter()
+    cabecalho = None
+
+    try:
+        while True:
+            # Linha 1 é o cabeçalho: a linha de dados N fica na linha N + 1 da planilha.
+            # Na primeira página relemos também a última linha confirmada, para conferir o checkpoint,
+            # e o cabeçalho (usado no resumo mensal) vem junto na mesma requisição.
+            linha_inicial = confirmadas + (1 if conferir_checkpoint else 2)
+            linha_final = confirmadas + 1 + TAMANHO_PAGINA
+            faixas = [intervalo(aba_origem_name, f'A{linha_inicial}:ZZ{linha_final}')]
+            if cabecalho is None:
+                faixas.append(intervalo(aba_origem_name, 'A1:ZZ1'))
+
+            blocos = com_retentativa(ler_intervalos, planilha_origem, faixas)
+            pagina = blocos[0]
+            if cabecalho is None:
+                cabecalho = blocos[1][0] if blocos[1] else []
+
+            if conferir_checkpoint:
+                conferir_checkpoint = False
+                if not pagina or hash_linhas(pagina[:1]) != hash_ultima:
+                    print(f"Checkpoint de '{aba_origem_name}' não confere com a origem (aba limpa?). Recomeçando do zero.")
+                    confirmadas, hash_ultima, em_envio = 0, None, None
+                    conferir_indice = indice is not None
+                    continue
+                pagina = pagina[1:]
+            ultima_pagina = len(pagina) < TAMANHO_PAGINA
+
+            if em_envio is not None:
+                # Execução anterior interrompida no meio de um anexo: se ele foi gravado, só confirma aqui
+                lote, enviadas = confirmar_lote_interrompido(chave, planilha_historico, aba_historico_name, em_envio, pagina,
+                                                             confirmadas, indice, cabecalho, arquivo_pendente)
+                if lote:
+                    if conferir_indice:
+                        fingerprints_linhas(lote, ocorrencias)
+                    confirmadas += len(lote)
+                    copiadas_agora += len(enviadas)
+                    hash_ultima = hash_linhas(lote[-1:])
+                    pagina = pagina[len(lote):]
+                em_envio = None
+
+            if not pagina:
+                break
+
+            for inicio in range(0, len(pagina), TAMANHO_LOTE):
+                lote = pagina[inicio:inicio + TAMANHO_LOTE]
+                linhas_para_anexar = lote
+                posicoes = range(len(lote))
+                fingerprints_novos = None
+
+                if conferir_indice:
+                    linhas_para_anexar, fingerprints_novos, posicoes = filtrar_linhas_ineditas(indice, lote, ocorrencias)
+                    ignoradas += len(lote) - len(linhas_para_anexar)
+                elif indice is not None:
+                    indice.semear_ocorrencias(lote, ocorrencias)
+                    fingerprints_novos = fingerprints_linhas(lote, ocorrencias)
+
+                if linhas_para_anexar:
+                    if fim_historico is None:
+                        fim_historico = com_retentativa(contar_linhas_aba, planilha_historico, aba_historico_name)
+                    marcar_lote_em_envio(chave, confirmadas, hash_ultima, lote, posicoes, fingerprints_novos, fim_historico)
+                    fim_historico = anexar_sem_duplicar(planilha_historico, aba_historico_name, linhas_para_anexar, fim_historico)
+                    registrar_lote_gravado(indice, fingerprints_novos, cabecalho, linhas_para_anexar, planilha_historico.id, aba_historico_name, arquivo_pendente)
+
+                confirmadas += len(lote)
+                copiadas_agora += len(linhas_para_anexar)
+                hash_ultima = hash_linhas(lote[-1:])
+                gravar_checkpoint(chave, estado_checkpoint(confirmadas, hash_ultima))
+
+            if ultima_pagina:
+                break
 
     except gspread.exceptions.WorksheetNotFound as e:
         print(f"ERRO: A aba '{aba_origem_name}' ou '{aba_historico_name}' não foi encontrada.")
-        raise RuntimeError(f"Falha na validação da Planilha: {e}") 
+        raise RuntimeError(f"Falha na validação da Planilha: {e}")
     except Exception as e:
         print(f"ERRO GRAVE durante o backup de {aba_origem_name}: {e}")
+        print(f"Checkpoint preservado em {confirmadas} linhas. Rode novamente para continuar de onde parou.")
         raise
 
+    if ignoradas:
+        print(f"{ignoradas} linhas de '{aba_origem_name}' já estavam no Histórico e foram ignoradas.")
+
+    if not copiadas_agora:
+        print(f"Não há novos dados na aba '{aba_origem_name}' para consolidar.")
+        return 0
+
+    print(f"Backup de {copiadas_agora} linhas concluído e consolidado na aba '{aba_historico_name}' ({confirmadas} linhas da origem no checkpoint).")
+    return copiadas_agora
+
+
+def executar_backup(gc, origem_id=PLANILHA_ORIGEM_ID, historico_id=PLANILHA_HISTORICO_ID, map_abas=MAP_ABAS, arquivo_pendente=ARQUIVO_RESUMO_PENDENTE):
+    """
+    Backup de uma loja: Origem -> Histórico para cada aba de map_abas e resumo mensal atualizado.
+    Os padrões são os da loja única; o agendador de lojas.py passa os de cada loja.
+    Retorna {aba_origem: linhas anexadas}.
+    """
+    # 1. Abre as duas planilhas UMA VEZ (em paralelo)
+    with etapa('abrir_planilhas'):
+        planilhas = abrir_planilhas(gc, [origem_id, historico_id])
+    planilha_origem = planilhas[origem_id]
+    planilha_historico = planilhas[historico_id]
+    anexadas = {}
+    
+    # 2. Executa a função de backup para Vendas e Gastos (duas passagens)
+    if MODO_BACKUP == 'streaming':
+        # Streaming (padrão): páginas + lotes + checkpoint, aba por aba
+        for origem, destino in map_abas.items():
+            with etapa(f'backup_{origem}') as registro:
+                anexadas[origem] = fazer_backup_streaming(planilha_origem, planilha_historico, origem, destino, arquivo_pendente)
+                registro['linhas_anexadas'] = anexadas[origem]
+    else:
+        # Simples: lê todas as abas de origem numa única requisição em lote
+        with etapa('leitura_origem') as registro:
+            try:
+                dados_origem = ler_abas(planilha_origem, list(map_abas))
+            except gspread.exceptions.WorksheetNotFound as e:
+                raise RuntimeError(f"Falha na validação da Planilha de origem: {e}")
+            registro['linhas_lidas'] = sum(max(len(linhas) - 1, 0) for linhas in dados_origem.values())
+        
+        for origem, destino in map_abas.items():
+            with etapa(f'backup_{origem}') as registro:
+                registro['linhas_entrada'] = max(len(dados_origem[origem]) - 1, 0)
+                anexadas[origem] = fazer_backup(planilha_origem, planilha_historico, origem, destino, dados_origem[origem], arquivo_pendente)
+                registro['linhas_anexadas'] = anexadas[origem]
+    
+    # 3. Atualiza o resumo mensal materializado (fast path da predição)
+    with etapa('resumo_mensal'):
+        aplicar_resumo_pendente(planilha_historico, list(map_abas.values()), arquivo_pendente)
+    
+    return anexadas
+
 
 def main():
     """Função principal para orquestrar a execução e controlar a governança de tempo."""
     
-    # Verifica se a execução foi forçada manualmente
-    FORCA_EXECUCAO = os.environ.get('FORCA_EXECUCAO_MANUAL', 'false').lower() == 'true'
-    hoje = datetime.now().day
-    
     # -------------------------------------------------------------
     # Controle de Execução: Apenas no dia 1 (OU se for forçado)
     # -------------------------------------------------------------
+    liberado, FORCA_EXECUCAO, hoje = backup_liberado_hoje()
     
-    if hoje != 1 and not FORCA_EXECUCAO:
-        print(f"Hoje é dia {hoje}. O Agente de Backup está dormindo (aguardando o dia 1 do mês).")
+    if not liberado:
+        avisar_backup_dormindo(hoje)
         sys.exit(0) 
 
     # Mensagem de Log
@@ -93,19 +515,26 @@ def main():
     else:
          print(f"\n🚀 AGENTE DE BACKUP ATIVADO - Executando no dia {hoje}...")
     
-    # 1. Autentica UMA VEZ
-    gc = autenticar_gspread()
+    iniciar_execucao('backup_gastos_despesas_mensal')
+    
+    # Autentica UMA VEZ; as planilhas são abertas dentro de executar_backup
+    executar_backup(autenticar_gspread())
     
-    # 2. Executa a função de backup para Vendas e Gastos (duas passagens)
-    for origem, destino in MAP_ABAS.items():
-        fazer_backup(gc, PLANILHA_ORIGEM_ID, PLANILHA_HISTORICO_ID, origem, destino)
-        
     print("\n✅ ORQUESTRAÇÃO DE BACKUP CONCLUÍDA.")
 
 
-if __name__ == "__main__":
+def executar():
+    """Ponto de entrada (script e comando 'backup' do cli.py). Retorna o código de saída do processo."""
     try:
         main()
+        return 0
     except Exception as final_e:
         print(f"\n### FALHA CRÍTICA DO AGENTE ###\n{final_e}")
-        sys.exit(1)
+        return 1
+    finally:
+        # Relatório de execução (com INSTRUMENTACAO=true), inclusive quando o backup falha
+        gravar_relatorio_execucao()
+
+
+if __name__ == "__main__":
+    sys.exit(executar())
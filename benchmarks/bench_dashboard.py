@@ -0,0 +1,77 @@
+"""
+Peso do dashboard por tamanho do histórico: formato 'html' (tudo embutido) x 'dados' (casca + JSON +
+CSS + dashboard_ml.js), em bytes e em bytes gzip, e o diff de uma execução para a seguinte (um mês novo)
+em linhas alteradas. No 'dados' a casca fica do mesmo tamanho e o diff é a linha do mês novo e a da
+data/hora no JSON.
+
+Uso: python benchmarks/bench_dashboard.py [--meses 24 120 600]
+"""
+import os
+import sys
+import gzip
+import difflib
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dashboard_ml import montar_dashboard_ml, arquivos_dashboard
+
+
+def historico_sintetico(qtd_meses, seed=0):
+    rng = np.random.default_rng(seed)
+    vendas = rng.uniform(20_000, 60_000, qtd_meses).round(2)
+    gastos = rng.uniform(15_000, 55_000, qtd_meses).round(2)
+    return pd.DataFrame({
+        'Mes_Ano': pd.date_range(end='2025-12-01', periods=qtd_meses, freq='MS'),
+        'Total_Vendas': vendas,
+        'Total_Gastos': gastos,
+        'Lucro_Liquido': (vendas - gastos).round(2),
+    })
+
+
+def renderizar(df, formato, pasta):
+    destino = os.path.join(pasta, f'{formato}_{len(df)}', 'dashboard.html')
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    ultimo = df['Mes_Ano'].iloc[-1].year
+    montar_dashboard_ml(1000.0, 500.0, float(df['Lucro_Liquido'].iloc[-1]), df, 'A', 'B', 'C', 'D',
+                        ultimo - 1, ultimo, destino=destino, formato=formato)
+    return arquivos_dashboard(destino, formato)
+
+
+def ler(caminhos):
+    conteudos = {}
+    for caminho in caminhos:
+        with open(caminho, 'rb') as f:
+            conteudos[os.path.basename(caminho)] = f.read()
+    return conteudos
+
+
+def linhas_alteradas(antes, depois):
+    total = 0
+    for nome, conteudo in depois.items():
+        diff = difflib.unified_diff(antes.get(nome, b'').decode().splitlines(), conteudo.decode().splitlines(), n=0)
+        total += sum(1 for linha in diff if linha[:1] in '+-' and linha[:3] not in ('+++', '---'))
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peso do dashboard: formato html x dados.")
+    parser.add_argument('--meses', type=int, nargs='+', default=[24, 120, 600])
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='bench_dashboard_')
+    print(f"{'meses':>6} | {'formato':>7} | {'página (KB)':>11} | {'total (KB)':>10} | {'total gz (KB)':>13} | {'diff (linhas)':>13}")
+    for qtd in args.meses:
+        df = historico_sintetico(qtd + 1)
+        for formato in ('html', 'dados'):
+            # Execução anterior (sem o último mês) e a atual: no 'html' a linha de data/hora muda sempre;
+            # no 'dados' ela fica no JSON e a casca só muda se os quadros mudarem
+            antes = ler(renderizar(df.iloc[:-1], formato, pasta))
+            depois = ler(renderizar(df, formato, pasta))
+            pagina = len(depois['dashboard.html']) / 1024
+            total = sum(map(len, depois.values())) / 1024
+            total_gz = sum(len(gzip.compress(c, 9)) for c in depois.values()) / 1024
+            print(f"{qtd:>6} | {formato:>7} | {pagina:>11.1f} | {total:>10.1f} | {total_gz:>13.1f} | {linhas_alteradas(antes, depois):>13}")
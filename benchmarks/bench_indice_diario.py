@@ -0,0 +1,82 @@
+"""
+Consultas de período: filtro pandas sobre as vendas/gastos tratados x índice diário (indice_diario).
+
+Para cada tamanho: tempo de montagem do índice e tempo médio de uma consulta (totais de vendas e gastos
+de um período sorteado, com a comparação com o ano anterior) nos dois caminhos. Os totais são conferidos.
+
+Uso: python benchmarks/bench_indice_diario.py [--linhas 100000 1000000] [--consultas 200]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+# Cache local e estado isolados ANTES de importar os módulos (os diretórios são lidos na importação):
+# o índice diário do bench não pode ir para o estado/ comitado
+DIRETORIO_TEMPORARIO = tempfile.mkdtemp(prefix='bench_indice_')
+os.environ['CACHE_PLANILHAS_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'cache')
+os.environ['ESTADO_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'estado')
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import predicao_ml
+from acesso_planilhas import usar_cliente
+from fontes_dados import ClienteMemoria
+from indice_diario import IndiceDiario, mesmo_periodo_ano_anterior
+from dados_sinteticos import gerar_planilhas
+
+
+def centavos_pandas(df_vendas, df_gastos, inicio, fim):
+    """Caminho antigo: máscara de datas e soma sobre as linhas brutas."""
+    fim_exclusivo = fim + pd.Timedelta(days=1)
+    vendas = df_vendas['Vendas_Centavos'][(df_vendas['Data_Datetime'] >= inicio) & (df_vendas['Data_Datetime'] < fim_exclusivo)].sum()
+    gastos = df_gastos['Gastos_Centavos'][(df_gastos['Data_Datetime'] >= inicio) & (df_gastos['Data_Datetime'] < fim_exclusivo)].sum()
+    return int(vendas), int(gastos)
+
+
+def periodos_sorteados(indice, qtd, seed=0):
+    rng = np.random.default_rng(seed)
+    inicios = indice.inicio + 365 + rng.integers(0, indice.qtd_dias - 365, qtd)
+    return [(inicio, inicio + int(duracao)) for inicio, duracao in zip(inicios, rng.integers(1, 365, qtd))]
+
+
+def medir(qtd_linhas, consultas):
+    historico, _ = gerar_planilhas(qtd_linhas, predicao_ml.ID_PLANILHA_UNICA, 'origem')
+    gc = usar_cliente(ClienteMemoria([historico]))
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        df_vendas, df_gastos = predicao_ml.carregar_tabelas_brutas(gc)
+
+    inicio = time.perf_counter()
+    indice = IndiceDiario.de_frames(df_vendas, df_gastos, predicao_ml.COLUNA_ITEM_VENDIDO)
+    montagem = time.perf_counter() - inicio
+
+    periodos = periodos_sorteados(indice, consultas)
+    periodos_pandas = [(pd.Timestamp(a), pd.Timestamp(b)) for a, b in periodos]
+
+    inicio = time.perf_counter()
+    esperados = [(centavos_pandas(df_vendas, df_gastos, a, b), centavos_pandas(df_vendas, df_gastos, *map(pd.Timestamp, mesmo_periodo_ano_anterior(a, b))))
+                 for a, b in periodos_pandas]
+    tempo_pandas = (time.perf_counter() - inicio) / consultas
+
+    inicio = time.perf_counter()
+    obtidos = [(indice.centavos(a, b), indice.centavos(*mesmo_periodo_ano_anterior(a, b))) for a, b in periodos]
+    tempo_indice = (time.perf_counter() - inicio) / consultas
+
+    assert obtidos == esperados
+    print(f"{qtd_linhas:>10} | {indice.qtd_dias:>5} | {montagem * 1000:>13.1f} | {tempo_pandas * 1000:>11.3f} | "
+          f"{tempo_indice * 1000:>11.4f} | {tempo_pandas / tempo_indice:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consultas de período: filtro pandas x índice diário.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--consultas', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} | {'dias':>5} | {'montagem (ms)':>13} | {'pandas (ms)':>11} | {'índice (ms)':>11} | {'ganho':>9}")
+    for qtd in args.linhas:
+        medir(qtd, args.consultas)
@@ -0,0 +1,85 @@
+"""
+Ingestão em streaming de exportações CSV (ingestao_csv): tempo e pico de memória por tamanho de
+arquivo e de bloco, contra a leitura do arquivo inteiro em memória (lista de listas + agregar_resumo).
+
+O arquivo grande é o de VENDAS sintético repetido N vezes: no streaming o pico (tracemalloc) deve
+ficar igual para 1x e Nx, e crescer só com o tamanho do bloco. Os resumos são conferidos.
+
+Uso: python benchmarks/bench_ingestao.py [--linhas 500000] [--repeticoes 1 4] [--blocos 50000 200000]
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+# Cache local e estado isolados ANTES de importar os módulos (os diretórios são lidos na importação)
+DIRETORIO_TEMPORARIO = tempfile.mkdtemp(prefix='bench_ingestao_')
+os.environ['CACHE_PLANILHAS_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'cache')
+os.environ['ESTADO_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'estado')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ingestao_csv import ingerir_historico_csv
+from resumo_mensal import agregar_resumo, combinar_resumos
+from dados_sinteticos import gerar_vendas, gerar_gastos
+
+
+def gravar_csv(caminho, linhas, repeticoes=1):
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(linhas[0])
+        for _ in range(repeticoes):
+            escritor.writerows(linhas[1:])
+
+
+def resumo_em_memoria(caminho_vendas, caminho_gastos):
+    """Caminho sem streaming: a exportação inteira vira lista de listas antes do resumo."""
+    resumos = []
+    for caminho, aba in ((caminho_vendas, 'VENDAS'), (caminho_gastos, 'GASTOS')):
+        with open(caminho, newline='', encoding='utf-8') as f:
+            linhas = list(csv.reader(f))
+        resumos.append(agregar_resumo(linhas[0], linhas[1:], aba))
+    return combinar_resumos(*resumos)
+
+
+def medir(funcao, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        resultado = funcao(*args)
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, segundos, pico / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo e memória da ingestão de CSV em blocos.")
+    parser.add_argument('--linhas', type=int, default=500_000, help="Vendas do arquivo base")
+    parser.add_argument('--repeticoes', type=int, nargs='+', default=[1, 4], help="Cópias do arquivo base em cada teste")
+    parser.add_argument('--blocos', type=int, nargs='+', default=[50_000, 200_000])
+    args = parser.parse_args()
+
+    pasta = DIRETORIO_TEMPORARIO
+    vendas, gastos = gerar_vendas(args.linhas), gerar_gastos(max(args.linhas // 20, 1))
+    caminho_gastos = os.path.join(pasta, 'GASTOS.csv')
+    gravar_csv(caminho_gastos, gastos)
+
+    print(f"{'linhas':>10} | {'MB':>6} | {'modo':>16} | {'tempo (s)':>9} | {'pico (MB)':>9}")
+    for repeticoes in args.repeticoes:
+        caminho_vendas = os.path.join(pasta, f'VENDAS_{repeticoes}x.csv')
+        gravar_csv(caminho_vendas, vendas, repeticoes)
+        tamanho = os.path.getsize(caminho_vendas) / 2 ** 20
+        qtd = args.linhas * repeticoes
+
+        esperado = None
+        if repeticoes == 1:
+            esperado, segundos, pico = medir(resumo_em_memoria, caminho_vendas, caminho_gastos)
+            print(f"{qtd:>10} | {tamanho:>6.0f} | {'tudo em memória':>16} | {segundos:>9.2f} | {pico:>9.1f}")
+        for bloco in args.blocos:
+            resumo, segundos, pico = medir(ingerir_historico_csv, caminho_vendas, caminho_gastos, bloco)
+            assert esperado is None or resumo.equals(esperado)
+            print(f"{qtd:>10} | {tamanho:>6.0f} | {f'blocos de {bloco}':>16} | {segundos:>9.2f} | {pico:>9.1f}")
@@ -0,0 +1,58 @@
+"""
+Tempo de inicialização do cli.py nos caminhos que não deveriam carregar bibliotecas pesadas.
+
+Cada caso roda num processo novo (como no GitHub Actions). Além do tempo, confere com
+-X importtime que gspread, pandas e numpy NÃO foram importados.
+
+Uso: python benchmarks/bench_inicializacao.py [repeticoes]   (padrão: 10)
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from datetime import datetime
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CLI = os.path.join(RAIZ, 'cli.py')
+MODULOS_PESADOS = ('gspread', 'pandas', 'numpy', 'sklearn')
+
+# Dia de backup diferente de hoje: o comando 'backup' cai no caminho de "dormindo"
+DIA_QUE_NAO_E_HOJE = str(datetime.now().day % 28 + 1)
+
+DIRETORIO_TEMPORARIO = tempfile.mkdtemp(prefix='bench_inicializacao_')
+
+CASOS = {
+    'python -c pass (referência)': [sys.executable, '-c', 'pass'],
+    'cli.py --help': [sys.executable, CLI, '--help'],
+    'cli.py backup (fora do dia)': [sys.executable, CLI, 'backup'],
+    # Comparação: o script direto importa tudo antes de conferir o dia
+    'script de backup (fora do dia)': [sys.executable, os.path.join(RAIZ, 'backup_gastos_despesas_mensal.py')],
+}
+
+
+def executar(comando, importtime=False):
+    # Cache local e estado num diretório temporário: nada do bench vai para o estado/ comitado
+    ambiente = dict(os.environ, BACKUP_DIA_EXECUCAO=DIA_QUE_NAO_E_HOJE, FORCA_EXECUCAO_MANUAL='false',
+                    CACHE_PLANILHAS_DIR=os.path.join(DIRETORIO_TEMPORARIO, 'cache'), ESTADO_DIR=os.path.join(DIRETORIO_TEMPORARIO, 'estado'))
+    prefixo = [comando[0], '-X', 'importtime'] if importtime else [comando[0]]
+    inicio = time.perf_counter()
+    processo = subprocess.run(prefixo + comando[1:], capture_output=True, text=True, env=ambiente, cwd=RAIZ)
+    return time.perf_counter() - inicio, processo
+
+
+def modulos_pesados_importados(stderr):
+    """Nomes de topo importados segundo o -X importtime (última coluna de cada linha)."""
+    importados = {linha.rsplit('|', 1)[-1].strip().split('.')[0] for linha in stderr.splitlines() if '|' in linha}
+    return sorted(importados & set(MODULOS_PESADOS))
+
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print(f"{'caso':<30} | {'melhor (ms)':>11} | {'mediana (ms)':>12} | pesados importados")
+    for nome, comando in CASOS.items():
+        tempos = sorted(executar(comando)[0] * 1000 for _ in range(repeticoes))
+        _, processo = executar(comando, importtime=True)
+        pesados = modulos_pesados_importados(processo.stderr)
+        print(f"{nome:<30} | {tempos[0]:>11.1f} | {tempos[len(tempos) // 2]:>12.1f} | {', '.join(pesados) or 'nenhum'}")
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark do parsing de Valor (R$) e Data: caminho antigo x parsing_brl.
+
+Uso: python benchmarks/bench_parsing.py [linhas ...]   (padrão: 10000 100000 1000000)
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parsing_brl import parsear_tabela
+
+
+def gerar_colunas(qtd_linhas, seed=42):
+    """Gera colunas de Valor e Data no formato exportado pelo Google Sheets."""
+    rng = np.random.default_rng(seed)
+    centavos = rng.integers(100, 500_000, size=qtd_linhas)
+    valores = [f"R$ {c // 100:,},{c % 100:02d}".replace(',', 'X', 1).replace('X', '.') if c >= 100_000 else f"R$ {c // 100},{c % 100:02d}" for c in centavos]
+    inicio = np.datetime64('2020-01-01T00:00:00')
+    segundos = rng.integers(0, 6 * 365 * 24 * 3600, size=qtd_linhas)
+    datas = pd.Series(inicio + segundos.astype('timedelta64[s]')).dt.strftime('%d/%m/%Y %H:%M:%S')
+    return pd.DataFrame({'VALOR': valores, 'DATA E HORA': datas})
+
+
+def caminho_antigo(df):
+    """Reprodução fiel do tratamento original de carregar_dados_de_planilha."""
+    df['temp_valor'] = df['VALOR'].astype(str).str.replace('R$', '', regex=False).str.replace('.', '', regex=False).str.replace(',', '.', regex=True).str.strip()
+    df['Gastos_Float'] = pd.to_numeric(df['temp_valor'], errors='coerce')
+    df['Data_Datetime'] = pd.to_datetime(df['DATA E HORA'], errors='coerce', dayfirst=True)
+    return df.dropna(subset=['Data_Datetime', 'Gastos_Float']).copy()
+
+
+def caminho_novo(df):
+    df_validos, _ = parsear_tabela(df, 'VALOR', 'DATA E HORA', 'Gastos')
+    return df_validos
+
+
+def cronometrar(funcao, df_base, repeticoes=3):
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        df = df_base.copy()
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == "__main__":
+    tamanhos = [int(x) for x in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'linhas':>10} | {'antigo (s)':>10} | {'novo (s)':>10} | {'ganho':>6}")
+    for qtd in tamanhos:
+        df_base = gerar_colunas(qtd)
+        t_antigo, r_antigo = cronometrar(caminho_antigo, df_base)
+        t_novo, r_novo = cronometrar(caminho_novo, df_base)
+
+        # Sanidade: os dois caminhos precisam chegar no mesmo total
+        assert len(r_antigo) == len(r_novo)
+        assert np.isclose(r_antigo['Gastos_Float'].sum(), r_novo['Gastos_Centavos'].sum() / 100)
+
+        print(f"{qtd:>10} | {t_antigo:>10.3f} | {t_novo:>10.3f} | {t_antigo / t_novo:>5.1f}x")
@@ -0,0 +1,154 @@
+"""
+Benchmark do pipeline completo com dados sintéticos e fonte em memória (sem credenciais do Google).
+
+Etapas cronometradas por tamanho: carregar_e_combinar_dados (cache frio e quente), treinar_e_prever,
+previsão por série, analisar_metricas_negocio (cubo + KPIs), renderização do dashboard e
+fazer_backup (simples e streaming).
+
+Uso: python benchmarks/bench_pipeline.py [--tamanhos 10000 1000000 10000000] [--repeticoes 3]
+                                         [--saida resultados.json] [--baseline baseline.json] [--tolerancia 0.25]
+     Com --baseline, compara etapa a etapa e sai com código 1 se alguma ficar mais lenta que a tolerância.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime
+
+# Cache local e diretório de estado isolados ANTES de importar os módulos (lidos na importação):
+# o estado/ do repositório guarda o checkpoint e os índices do Histórico real
+DIRETORIO_TEMPORARIO = tempfile.mkdtemp(prefix='bench_pipeline_')
+os.environ['CACHE_PLANILHAS_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'cache')
+os.environ['ESTADO_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'estado')
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import predicao_ml
+import backup_gastos_despesas_mensal as backup
+from acesso_planilhas import usar_cliente
+from cache_local import DIRETORIO_CACHE, DIRETORIO_ESTADO
+from cubo_vendas import CuboVendas
+from previsao_series import prever_series
+from fontes_dados import ClienteMemoria, PlanilhaMemoria
+from dados_sinteticos import gerar_planilhas
+
+TAMANHOS_PADRAO = [10_000, 1_000_000]
+
+
+def cronometrar(resultados, etapa, funcao, *args, **kwargs):
+    """Executa a etapa (saída do pipeline silenciada) e guarda o tempo em segundos."""
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        inicio = time.perf_counter()
+        retorno = funcao(*args, **kwargs)
+        resultados[etapa] = round(time.perf_counter() - inicio, 4)
+    return retorno
+
+
+def limpar_cache_local():
+    for nome in os.listdir(DIRETORIO_CACHE) if os.path.isdir(DIRETORIO_CACHE) else []:
+        os.remove(os.path.join(DIRETORIO_CACHE, nome))
+
+
+def limpar_estado():
+    """Checkpoint, resumo pendente e índices do backup: cada modo e repetição copia tudo do zero."""
+    for nome in os.listdir(DIRETORIO_ESTADO) if os.path.isdir(DIRETORIO_ESTADO) else []:
+        os.remove(os.path.join(DIRETORIO_ESTADO, nome))
+
+
+def medir_tamanho(historico, origem):
+    resultados = {}
+    gc = usar_cliente(ClienteMemoria([historico]))
+    limpar_cache_local()
+
+    # 1. Carga (primeira execução = cache frio; segunda = cache quente, sem linhas novas)
+    df_mensal, df_vendas_bruto = cronometrar(resultados, 'carregar_dados_frio', predicao_ml.carregar_e_combinar_dados, gc)
+    cronometrar(resultados, 'carregar_dados_quente', predicao_ml.carregar_e_combinar_dados, gc)
+
+    # 2. Modelos
+    previsao, mae, ultimo, leaderboard = cronometrar(resultados, 'treinar_e_prever', predicao_ml.treinar_e_prever, df_mensal)
+
+    # 3. KPIs (o cubo substitui as varreduras por ano)
+    ano_atual = df_vendas_bruto['Data_Datetime'].dt.year.max()
+    def kpis():
+        cubo = CuboVendas.de_vendas_brutas(df_vendas_bruto)
+        return cubo, predicao_ml.analisar_metricas_negocio(cubo, ano_atual), predicao_ml.analisar_metricas_negocio(cubo, ano_atual - 1)
+    cubo, (comprador, sabor), (comprador_ant, sabor_ant) = cronometrar(resultados, 'analisar_metricas_negocio', kpis)
+    df_previsoes = cronometrar(resultados, 'previsao_series', prever_series, cubo)
+
+    # 4. Renderização do dashboard (arquivo temporário)
+    cronometrar(
+        resultados, 'renderizacao', predicao_ml.montar_dashboard_ml,
+        previsao, mae, ultimo, df_mensal, comprador, sabor, comprador_ant, sabor_ant,
+        ano_atual - 1, ano_atual, cubo, leaderboard, df_previsoes,
+        destino=os.path.join(DIRETORIO_TEMPORARIO, 'dashboard.html'),
+    )
+
+    # 5. Backup da Origem para um Histórico vazio (só cabeçalhos), nos dois modos. Os dois usam a
+    # mesma chave de checkpoint: sem limpar o estado, o segundo modo não teria nada a copiar
+    for modo, funcao in (('fazer_backup', backup.fazer_backup), ('fazer_backup_streaming', backup.fazer_backup_streaming)):
+        limpar_cache_local()
+        limpar_estado()
+        destino = PlanilhaMemoria(backup.PLANILHA_HISTORICO_ID, {aba: [linhas[0]] for aba, linhas in historico.abas.items()})
+        def executar():
+            for aba_origem, aba_destino in backup.MAP_ABAS.items():
+                funcao(origem, destino, aba_origem, aba_destino)
+            backup.aplicar_resumo_pendente(destino)
+        cronometrar(resultados, modo, executar)
+
+    return resultados
+
+
+def comparar(atual, baseline, tolerancia):
+    """Imprime a razão atual/baseline por etapa. Retorna True se houve regressão acima da tolerância."""
+    regressao = False
+    print(f"\n{'linhas':>10} | {'etapa':<26} | {'baseline (s)':>12} | {'atual (s)':>10} | {'razão':>6}")
+    for tamanho, etapas in atual['resultados'].items():
+        for etapa, segundos in etapas.items():
+            referencia = baseline.get('resultados', {}).get(tamanho, {}).get(etapa)
+            if not referencia:
+                continue
+            razao = segundos / referencia
+            alerta = "  <- REGRESSÃO" if razao > 1 + tolerancia else ""
+            regressao |= bool(alerta)
+            print(f"{tamanho:>10} | {etapa:<26} | {referencia:>12.3f} | {segundos:>10.3f} | {razao:>5.2f}x{alerta}")
+    return regressao
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline com dados sintéticos.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções por tamanho (vale o menor tempo de cada etapa)")
+    parser.add_argument('--saida', default=None, help="Arquivo JSON para gravar os resultados")
+    parser.add_argument('--baseline', default=None, help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Lentidão aceita antes de acusar regressão (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__, 'maquina': platform.machine()},
+        'resultados': {},
+    }
+
+    for qtd in args.tamanhos:
+        print(f"Medindo {qtd} linhas...")
+        historico, origem = gerar_planilhas(qtd, predicao_ml.ID_PLANILHA_UNICA, backup.PLANILHA_ORIGEM_ID)
+        execucoes = [medir_tamanho(historico, origem) for _ in range(args.repeticoes)]
+        relatorio['resultados'][str(qtd)] = {etapa: min(e[etapa] for e in execucoes) for etapa in execucoes[0]}
+        for etapa, segundos in relatorio['resultados'][str(qtd)].items():
+            print(f"    {etapa:<26} {segundos:>9.3f} s")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            if comparar(relatorio, json.load(f), args.tolerancia):
+                sys.exit(1)
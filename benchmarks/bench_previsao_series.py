@@ -0,0 +1,73 @@
+"""
+Previsão por série (previsao_series.prever_bloco): tempo do bloco vetorizado contra a referência
+série a série (backtest de cada modelo + backtesting.prever_proximo com o modelo de menor MAE),
+e conferência de que os dois dão o mesmo MAE e a mesma previsão em todas as séries.
+
+Sai com código 1 se alguma série divergir. Rode também com --horizonte 2: a origem da previsão
+é o fim da série em qualquer horizonte.
+
+Uso: python benchmarks/bench_previsao_series.py [--series 2000] [--meses 36] [--horizonte 1]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from backtesting import selecionar_modelos, origens_comuns, erros_absolutos, prever_proximo
+from previsao_series import prever_bloco
+
+
+def matriz_series_sintetica(series, meses, seed=1):
+    """Receita mensal por série: nível, tendência e sazonalidade próprios, ruído e meses sem venda."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(meses)
+    nivel = rng.uniform(100, 5_000, (series, 1))
+    tendencia = rng.normal(0, 20, (series, 1))
+    sazonal = rng.uniform(0, 0.3, (series, 1)) * np.sin(t / 12 * 2 * np.pi + rng.uniform(0, 2 * np.pi, (series, 1)))
+    Y = nivel * (1 + sazonal) + tendencia * t + rng.normal(0, 150, (series, meses))
+    Y[rng.random((series, meses)) < 0.1] = 0.0
+    return np.maximum(Y, 0.0).round(2)
+
+
+def prever_serie_a_serie(Y, horizonte):
+    """Referência: cada série sozinha, com as mesmas origens comuns do bloco."""
+    modelos = selecionar_modelos(Y.shape[1], horizonte)
+    origens = origens_comuns(Y.shape[1], horizonte, modelos)
+    escolhidos, maes, previsoes = [], [], []
+    for y in Y:
+        maes_serie = [erros_absolutos(y[np.newaxis, :], nome, horizonte, origens).mean() for nome in modelos]
+        melhor = int(np.argmin(maes_serie))
+        escolhidos.append(modelos[melhor])
+        maes.append(maes_serie[melhor])
+        previsoes.append(prever_proximo(y, modelos[melhor], horizonte))
+    return np.asarray(escolhidos), np.asarray(maes), np.asarray(previsoes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Previsão por série: bloco vetorizado x série a série.")
+    parser.add_argument('--series', type=int, default=2_000)
+    parser.add_argument('--meses', type=int, default=36)
+    parser.add_argument('--horizonte', type=int, default=1)
+    args = parser.parse_args()
+
+    Y = matriz_series_sintetica(args.series, args.meses)
+
+    inicio = time.perf_counter()
+    bloco = prever_bloco(Y, args.horizonte)
+    segundos_bloco = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    referencia = prever_serie_a_serie(Y, args.horizonte)
+    segundos_referencia = time.perf_counter() - inicio
+
+    # Modelos empatados no MAE podem trocar de lugar pelo arredondamento da média: conta o MAE e a previsão
+    divergentes = ~(np.isclose(bloco[1], referencia[1]) & np.isclose(bloco[2], referencia[2]))
+    empates = (bloco[0] != referencia[0]) & ~divergentes
+    print(f"{args.series} séries x {args.meses} meses, horizonte {args.horizonte}")
+    print(f"  bloco:         {segundos_bloco:8.3f} s")
+    print(f"  série a série: {segundos_referencia:8.3f} s ({segundos_referencia / max(segundos_bloco, 1e-9):.0f}x)")
+    print(f"  divergentes:   {int(divergentes.sum())} de {args.series} (outro modelo empatado no MAE: {int(empates.sum())})")
+    sys.exit(1 if divergentes.any() else 0)
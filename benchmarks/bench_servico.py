@@ -0,0 +1,105 @@
+"""
+Latência do serviço do dashboard (servico_dashboard) com dados sintéticos e fonte em memória.
+
+Mede, em processo e sem credenciais:
+  1. partida a frio: N requisições simultâneas -> UMA carga (single-flight);
+  2. cache quente: latência p50/p99 de requisições sequenciais;
+  3. TTL vencido: N requisições simultâneas durante a recarga -> respondidas com os dados
+     anteriores (stale-while-revalidate), também com UMA carga.
+
+Uso: python benchmarks/bench_servico.py [--linhas 10000 1000000] [--requisicoes 200] [--simultaneas 50]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+# Cache local e estado isolados ANTES de importar os módulos (os diretórios são lidos na importação):
+# o índice diário do bench não pode ir para o estado/ comitado
+DIRETORIO_TEMPORARIO = tempfile.mkdtemp(prefix='bench_servico_')
+os.environ['CACHE_PLANILHAS_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'cache')
+os.environ['ESTADO_DIR'] = os.path.join(DIRETORIO_TEMPORARIO, 'estado')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import predicao_ml
+import servico_dashboard
+from acesso_planilhas import usar_cliente
+from fontes_dados import ClienteMemoria
+from dados_sinteticos import gerar_planilhas
+
+
+async def requisitar(porta, rota='/api/resumo'):
+    """GET simples; retorna (status, bytes do corpo, segundos)."""
+    inicio = time.perf_counter()
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+    escritor.write(f"GET {rota} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await escritor.drain()
+    resposta = await leitor.read()
+    escritor.close()
+    status = int(resposta.split(b" ", 2)[1])
+    return status, len(resposta.split(b"\r\n\r\n", 1)[1]), time.perf_counter() - inicio
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def medir(qtd_linhas, requisicoes, simultaneas):
+    historico, _ = gerar_planilhas(qtd_linhas, predicao_ml.ID_PLANILHA_UNICA, 'origem')
+    gc = usar_cliente(ClienteMemoria([historico]))
+    cargas = []
+
+    def carregar():
+        inicio = time.perf_counter()
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            argumentos = predicao_ml.carregar_argumentos_dashboard(gc)
+        cargas.append(time.perf_counter() - inicio)
+        return argumentos
+
+    pronto = asyncio.get_running_loop().create_future()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        servidor = asyncio.create_task(servico_dashboard.servir(carregar, '127.0.0.1', 0, ttl=3600, pronto=lambda cache, porta: pronto.set_result((cache, porta))))
+        cache, porta = await pronto
+
+        # 1. Partida a frio
+        inicio = time.perf_counter()
+        frias = await asyncio.gather(*(requisitar(porta) for _ in range(simultaneas)))
+        tempo_frio = time.perf_counter() - inicio
+        assert all(status == 200 for status, _, _ in frias) and len(cargas) == 1
+
+        # 2. Cache quente (página inteira e API)
+        tamanho_pagina = (await requisitar(porta, '/'))[1]
+        quentes = [(await requisitar(porta, '/' if i % 2 else '/api/resumo'))[2] for i in range(requisicoes)]
+
+        # 3. TTL vencido: servir o antigo enquanto recarrega
+        cache.ttl = 0
+        durante = await asyncio.gather(*(requisitar(porta) for _ in range(simultaneas)))
+        cache.ttl = 3600
+        await asyncio.sleep(0)
+        while cache.saude()['atualizando']:
+            await asyncio.sleep(0.05)
+        assert all(status == 200 for status, _, _ in durante) and len(cargas) == 2
+
+        servidor.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await servidor
+
+    print(f"{qtd_linhas:>10} linhas | carga {cargas[0]:.2f}s | {simultaneas} simultâneas a frio: {tempo_frio:.2f}s, cargas: 1 | "
+          f"página {tamanho_pagina / 1024:.0f} KiB")
+    print(f"{'':>10}        | quente p50 {percentil(quentes, 50) * 1000:.2f} ms, p99 {percentil(quentes, 99) * 1000:.2f} ms | "
+          f"durante a recarga: p99 {percentil([t for _, _, t in durante], 99) * 1000:.2f} ms, cargas: 1")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência do serviço do dashboard.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--requisicoes', type=int, default=200)
+    parser.add_argument('--simultaneas', type=int, default=50)
+    args = parser.parse_args()
+
+    for qtd in args.linhas:
+        asyncio.run(medir(qtd, args.requisicoes, args.simultaneas))
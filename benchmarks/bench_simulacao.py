@@ -0,0 +1,59 @@
+"""
+Cenários de lucro (simulacao_lucro): tempo e pico de memória por quantidade de caminhos, tamanho
+de lote e processos, sobre um frame mensal sintético de 5 anos.
+
+O pico (tracemalloc) deve ficar perto do tamanho da matriz de saída (caminhos x horizonte em float32)
+somado a um termo fixo por lote, que não cresce com a quantidade de caminhos.
+
+Uso: python benchmarks/bench_simulacao.py [--caminhos 100000 1000000] [--horizonte 12]
+                                          [--lotes 5000 20000] [--processos 1 4]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from simulacao_lucro import simular_caminhos
+
+
+def frame_mensal_sintetico(meses=60, seed=1):
+    """Vendas com sazonalidade anual e gastos com ruído, no formato de carregar_e_combinar_dados."""
+    rng = np.random.default_rng(seed)
+    vendas = 20_000 + 3_000 * np.sin(np.arange(meses) / 12 * 2 * np.pi) + rng.normal(0, 2_000, meses)
+    gastos = 18_000 + rng.normal(0, 1_500, meses)
+    return pd.DataFrame({
+        'Total_Vendas': vendas.round(2), 'Total_Gastos': gastos.round(2), 'Lucro_Liquido': (vendas - gastos).round(2),
+        'Mes_Ano': pd.date_range('2021-01-31', periods=meses, freq='ME'),
+    })
+
+
+def medir(df_mensal, caminhos, horizonte, lote, processos):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    lucros = simular_caminhos(df_mensal, qtd_caminhos=caminhos, horizonte=horizonte, caminhos_por_lote=lote, processos=processos)
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return segundos, pico / 2 ** 20, lucros.nbytes / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo e memória dos cenários de lucro.")
+    parser.add_argument('--caminhos', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--horizonte', type=int, default=12)
+    parser.add_argument('--lotes', type=int, nargs='+', default=[5_000, 20_000])
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    df_mensal = frame_mensal_sintetico()
+    print(f"{'caminhos':>10} | {'lote':>6} | {'proc':>4} | {'tempo (s)':>9} | {'pico (MB)':>9} | {'saída (MB)':>10}")
+    for caminhos in args.caminhos:
+        for lote in args.lotes:
+            for processos in args.processos:
+                segundos, pico, saida = medir(df_mensal, caminhos, args.horizonte, lote, processos)
+                print(f"{caminhos:>10} | {lote:>6} | {processos:>4} | {segundos:>9.2f} | {pico:>9.1f} | {saida:>10.1f}")
@@ -0,0 +1,109 @@
+"""
+Gerador de abas VENDAS/GASTOS sintéticas no formato exportado pelo Google Sheets (pt-BR).
+
+Uso: python benchmarks/dados_sinteticos.py LINHAS [--formato csv|parquet|sqlite] [--destino dados_offline]
+     Grava o Histórico (VENDAS/GASTOS) e a Origem do mês (vendas/gastos) para rodar os scripts com
+     FONTE_DADOS=<formato> FONTE_DADOS_DIR=<destino>, sem credenciais do Google.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parsing_brl import COLUNA_DATA, COLUNA_COMPRADOR, COLUNA_ITEM_VENDIDO, COLUNA_VALOR_VENDA, COLUNA_VALOR_GASTO, FORMATO_DATA
+from renderizacao import formatar_brl_serie
+from fontes_dados import PlanilhaMemoria, exportar_planilha, FORMATOS_ARQUIVO
+
+CABECALHO_VENDAS = [COLUNA_DATA, COLUNA_COMPRADOR, COLUNA_ITEM_VENDIDO, COLUNA_VALOR_VENDA]
+CABECALHO_GASTOS = [COLUNA_DATA, 'DESCRIÇÃO', COLUNA_VALOR_GASTO]
+
+SABORES = [
+    'Morango', 'Chocolate', 'Coco', 'Maracujá', 'Limão', 'Uva', 'Abacaxi', 'Paçoca', 'Ninho',
+    'Ninho com Nutella', 'Leite Condensado', 'Manga', 'Goiaba', 'Açaí', 'Amendoim', 'Café',
+    'Doce de Leite', 'Prestígio', 'Oreo', 'Cupuaçu',
+]
+DESCRICOES_GASTOS = ['Embalagens', 'Leite', 'Açúcar', 'Frutas', 'Energia', 'Gás', 'Transporte', 'Chocolate em pó', 'Freezer (manutenção)']
+
+# Fração de linhas com valor inválido (célula vazia ou "R$ -"), como na planilha real
+FRACAO_INVALIDAS = 0.001
+
+
+def _datas_ordenadas(rng, qtd, anos, fim):
+    """Datas/horas crescentes (ordem de lançamento) espalhadas pelos últimos `anos` anos."""
+    janela = int(anos * 365 * 24 * 3600)
+    segundos = np.sort(rng.integers(0, janela, size=qtd))
+    inicio = np.datetime64(fim, 's') - np.timedelta64(janela, 's')
+    return pd.Series(inicio + segundos.astype('timedelta64[s]')).dt.strftime(FORMATO_DATA).to_numpy()
+
+
+def _valores_brl(rng, centavos):
+    valores = formatar_brl_serie(centavos / 100)
+    invalidas = rng.random(len(valores)) < FRACAO_INVALIDAS
+    valores[invalidas] = rng.choice(['', 'R$ -'], size=int(invalidas.sum()))
+    return valores
+
+
+def gerar_vendas(qtd_linhas, anos=5, fim='2025-12-31', seed=42):
+    """Linhas da aba VENDAS (com cabeçalho): compradores com popularidade Zipf, preço por sabor."""
+    rng = np.random.default_rng(seed)
+    qtd_compradores = max(50, qtd_linhas // 200)
+    compradores = np.array([f"Cliente {i:06d}" for i in range(qtd_compradores)], dtype=object)
+    indices_compradores = np.minimum(rng.zipf(1.3, size=qtd_linhas) - 1, qtd_compradores - 1)
+
+    indices_sabores = rng.integers(0, len(SABORES), size=qtd_linhas)
+    preco_sabor = rng.integers(300, 1200, size=len(SABORES))
+    centavos = preco_sabor[indices_sabores] * rng.integers(1, 11, size=qtd_linhas)
+
+    colunas = (
+        _datas_ordenadas(rng, qtd_linhas, anos, fim),
+        compradores[indices_compradores],
+        np.array(SABORES, dtype=object)[indices_sabores],
+        _valores_brl(rng, centavos),
+    )
+    return [CABECALHO_VENDAS] + [list(linha) for linha in zip(*colunas)]
+
+
+def gerar_gastos(qtd_linhas, anos=5, fim='2025-12-31', seed=43):
+    """Linhas da aba GASTOS (com cabeçalho)."""
+    rng = np.random.default_rng(seed)
+    colunas = (
+        _datas_ordenadas(rng, qtd_linhas, anos, fim),
+        np.array(DESCRICOES_GASTOS, dtype=object)[rng.integers(0, len(DESCRICOES_GASTOS), size=qtd_linhas)],
+        _valores_brl(rng, rng.integers(2_000, 200_000, size=qtd_linhas)),
+    )
+    return [CABECALHO_GASTOS] + [list(linha) for linha in zip(*colunas)]
+
+
+def gerar_planilhas(qtd_vendas, id_historico, id_origem, seed=42):
+    """
+    Histórico com qtd_vendas vendas (+ 1 gasto a cada 20 vendas) e Origem com o mês seguinte
+    (~2% do volume, abas em minúsculas como na planilha real do mês).
+    """
+    qtd_gastos = max(qtd_vendas // 20, 1)
+    qtd_mes = max(qtd_vendas // 50, 1)
+    historico = PlanilhaMemoria(id_historico, {
+        'VENDAS': gerar_vendas(qtd_vendas, seed=seed),
+        'GASTOS': gerar_gastos(qtd_gastos, seed=seed + 1),
+    })
+    origem = PlanilhaMemoria(id_origem, {
+        'vendas': gerar_vendas(qtd_mes, anos=1 / 12, fim='2026-01-31', seed=seed + 2),
+        'gastos': gerar_gastos(max(qtd_mes // 20, 1), anos=1 / 12, fim='2026-01-31', seed=seed + 3),
+    })
+    return historico, origem
+
+
+if __name__ == "__main__":
+    from backup_gastos_despesas_mensal import PLANILHA_ORIGEM_ID, PLANILHA_HISTORICO_ID
+
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas para as fontes offline.")
+    parser.add_argument('linhas', type=int, help="Quantidade de vendas no Histórico (ex.: 10000, 1000000, 10000000)")
+    parser.add_argument('--formato', choices=FORMATOS_ARQUIVO, default='csv')
+    parser.add_argument('--destino', default='dados_offline')
+    args = parser.parse_args()
+
+    for planilha in gerar_planilhas(args.linhas, PLANILHA_HISTORICO_ID, PLANILHA_ORIGEM_ID):
+        exportar_planilha(planilha, args.destino, args.formato)
+        print(f"Planilha {planilha.id}: {', '.join(f'{aba} ({len(linhas) - 1} linhas)' for aba, linhas in planilha.abas.items())}")
@@ -0,0 +1,116 @@
+import os
+import json
+import uuid
+import hashlib
+
+import pandas as pd
+
+# --- CONFIGURAÇÕES DO CACHE LOCAL (PARQUET) ---
+# Diretório onde ficam os frames já tratados (um Parquet + um JSON de metadados por aba)
+DIRETORIO_CACHE = os.environ.get('CACHE_PLANILHAS_DIR', '.cache_planilhas')
+
+# Estado que precisa sobreviver de um mês para o outro (checkpoint do backup etc.). O cache acima é
+# descartável (o actions/cache expira em 7 dias sem uso); este diretório é comitado pelos workflows.
+DIRETORIO_ESTADO = os.environ.get('ESTADO_DIR', 'estado')
+
+# Quantidade de linhas finais usadas na "marca d'água" (hash da cauda)
+LINHAS_CAUDA_WATERMARK = 50
+
+# Versão do formato do cache. Mudou o tratamento dos dados? Incrementa aqui e o cache é refeito.
+VERSAO_CACHE = 2
+# --------------------------------------------------------------------------------
+
+
+def _caminhos_frame(nome):
+    """Monta os caminhos do Parquet e dos metadados de um frame do cache."""
+    base = os.path.join(DIRETORIO_CACHE, nome)
+    return f"{base}.parquet", f"{base}.json"
+
+
+def _caminhos_cache(sheet_id, aba_nome):
+    """Caminhos do frame tratado da chave (planilha, aba)."""
+    return _caminhos_frame(f"{sheet_id}__{aba_nome}")
+
+
+def normalizar_linhas(linhas, largura):
+    """Completa/corta cada linha para a largura do cabeçalho (a API omite células vazias no fim)."""
+    return [(list(linha) + [''] * largura)[:largura] for linha in linhas]
+
+
+def hash_linhas(linhas):
+    """Hash estável (SHA-256) de uma lista de linhas da planilha."""
+    conteudo = json.dumps(linhas, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def ler_meta_frame(nome):
+    """Só os metadados (JSON) de um frame do cache, sem abrir o Parquet. None se ausente ou de versão antiga."""
+    caminho_parquet, caminho_meta = _caminhos_frame(nome)
+    if not (os.path.exists(caminho_parquet) and os.path.exists(caminho_meta)):
+        return None
+
+    try:
+        with open(caminho_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except Exception as e:
+        print(f"Alerta: metadados do cache local '{nome}' ilegíveis ({e}). Reconstruindo do zero.")
+        return None
+
+    return meta if meta.get('versao') == VERSAO_CACHE else None
+
+
+def ler_frame(nome):
+    """
+    Lê um frame do cache e seus metadados. Retorna (None, None) se não houver
+    cache válido (arquivo ausente, versão antiga ou pyarrow indisponível).
+    """
+    meta = ler_meta_frame(nome)
+    if meta is None:
+        return None, None
+
+    try:
+        df = pd.read_parquet(_caminhos_frame(nome)[0])
+    except Exception as e:
+        print(f"Alerta: cache local '{nome}' ilegível ({e}). Reconstruindo do zero.")
+        return None, None
+
+    return df, meta
+
+
+def gravar_frame(nome, df, meta):
+    """Persiste um frame no cache (Parquet) com seus metadados (JSON, com a versão do cache)."""
+    caminho_parquet, caminho_meta = _caminhos_frame(nome)
+    try:
+        os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+        df.to_parquet(caminho_parquet, index=False)
+        with open(caminho_meta, 'w', encoding='utf-8') as f:
+            json.dump({'versao': VERSAO_CACHE, **meta}, f, ensure_ascii=False)
+    except Exception as e:
+        # Cache é otimização: se não der para gravar (ex.: sem pyarrow), segue o fluxo normal
+        print(f"Alerta: não foi possível gravar o cache local '{nome}' ({e}).")
+
+
+def ler_meta_cache(sheet_id, aba_nome):
+    """Marca d'água da aba (metadados do cache), sem ler o frame tratado."""
+    return ler_meta_frame(f"{sheet_id}__{aba_nome}")
+
+
+def ler_cache(sheet_id, aba_nome):
+    """Lê o frame tratado e a marca d'água da aba. Retorna (None, None) se não houver cache válido."""
+    return ler_frame(f"{sheet_id}__{aba_nome}")
+
+
+def gravar_cache(sheet_id, aba_nome, df, cabecalho, total_linhas, linhas_cauda, geracao=None):
+    """
+    Persiste o frame tratado e a marca d'água: total de linhas de dados lidas da aba
+    (inclusive as descartadas no tratamento) e o hash das últimas linhas.
+    A geração identifica o frame enquanto ele só recebe linhas no fim: uma reconstrução
+    completa (geracao=None) gera outra, e quem derivou dados do frame antigo sabe que precisa refazer.
+    """
+    gravar_frame(f"{sheet_id}__{aba_nome}", df, {
+        'cabecalho': cabecalho,
+        'total_linhas': total_linhas,
+        'linhas_cauda': len(linhas_cauda),
+        'hash_cauda': hash_linhas(linhas_cauda),
+        'geracao': geracao or uuid.uuid4().hex,
+    })
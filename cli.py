@@ -0,0 +1,181 @@
+"""
+Ponto de entrada único dos agentes de vendas.
+
+    python cli.py backup [--forcar]      Backup mensal da Origem para o Histórico (só no dia agendado)
+    python cli.py predict                Carga, previsão, KPIs e dashboard
+    python cli.py render [--snapshot ARQ] [--saida ARQ]
+                                         Regera o dashboard a partir do último snapshot, sem a planilha
+    python cli.py serve [--host H] [--porta P] [--ttl SEG]
+                                         Serviço HTTP local: dashboard e API JSON servidos da memória,
+                                         recarregados em segundo plano a cada TTL
+    python cli.py lojas [tudo|backup|predict] [--forcar] [--config ARQ] [--simultaneas N]
+                                         Várias lojas (registro lojas.json) em paralelo, com um limite
+                                         de requisições ao Sheets compartilhado, e o painel consolidado
+    python cli.py consulta [--de AAAA-MM-DD] [--ate AAAA-MM-DD] [--ultimos N] [--comparar] [--sabores N]
+                           [--planilha ID] [--recarregar] [--sem-conferir]
+                                         Totais de qualquer período (padrão: acumulado do ano) lidos do
+                                         índice diário, conferido antes com o resumo mensal (remontado
+                                         das abas brutas se estiver desatualizado); --sem-conferir lê
+                                         só o índice salvo, sem tocar na planilha
+    python cli.py ingerir VENDAS.csv GASTOS.csv [--saida ARQ] [--publicar ID] [--linhas-por-bloco N]
+                                         Exportações CSV de qualquer tamanho (loja nova) lidas em blocos
+                                         e reduzidas ao resumo mensal, com memória constante
+
+Só a biblioteca padrão é importada aqui: gspread, pandas e numpy carregam dentro do comando
+escolhido, e o backup fora do dia agendado termina antes de importar qualquer um deles.
+"""
+import os
+import sys
+import argparse
+
+from config_planilhas import PLANILHA_HISTORICO_ID
+
+
+def comando_backup(args):
+    if args.forcar:
+        os.environ['FORCA_EXECUCAO_MANUAL'] = 'true'
+
+    from agendamento import backup_liberado_hoje, avisar_backup_dormindo
+    liberado, _, hoje = backup_liberado_hoje()
+    if not liberado:
+        avisar_backup_dormindo(hoje)
+        return 0
+
+    import backup_gastos_despesas_mensal
+    return backup_gastos_despesas_mensal.executar()
+
+
+def comando_predict(args):
+    import predicao_ml
+    predicao_ml.main()
+    return 0
+
+
+def comando_render(args):
+    from dashboard_ml import renderizar_snapshot
+    if not os.path.exists(args.snapshot):
+        print(f"Snapshot '{args.snapshot}' não encontrado. Rode 'python cli.py predict' primeiro.")
+        return 1
+    renderizar_snapshot(args.snapshot, args.saida)
+    print(f"Dashboard regerado a partir de '{args.snapshot}'.")
+    return 0
+
+
+def comando_serve(args):
+    import servico_dashboard
+    servico_dashboard.main(args.host, args.porta, args.ttl)
+    return 0
+
+
+def comando_lojas(args):
+    fazer_backup = args.etapas in ('tudo', 'backup')
+    fazer_predicao = args.etapas in ('tudo', 'predict')
+
+    if fazer_backup:
+        if args.forcar:
+            os.environ['FORCA_EXECUCAO_MANUAL'] = 'true'
+        from agendamento import backup_liberado_hoje, avisar_backup_dormindo
+        liberado, _, hoje = backup_liberado_hoje()
+        if not liberado:
+            avisar_backup_dormindo(hoje)
+            if not fazer_predicao:
+                return 0
+            print("Seguindo só com a predição das lojas.")
+            fazer_backup = False
+
+    import lojas
+    return lojas.main(args.config, fazer_backup, fazer_predicao, args.simultaneas)
+
+
+def comando_consulta(args):
+    if args.recarregar or not args.sem_conferir:
+        import predicao_ml
+        if args.recarregar:
+            predicao_ml.recarregar_indice_diario(args.planilha)
+        else:
+            predicao_ml.conferir_indice_diario(args.planilha)
+
+    import indice_diario
+    return indice_diario.main(args.planilha, args.de, args.ate, args.ultimos, args.comparar, args.sabores)
+
+
+def comando_ingerir(args):
+    import ingestao_csv
+    return ingestao_csv.main(args.vendas, args.gastos, args.saida or ingestao_csv.ARQUIVO_RESUMO_INGESTAO,
+                             args.publicar, args.linhas_por_bloco)
+
+
+def criar_parser():
+    # Padrões do render repetidos aqui para o --help não importar pandas via dashboard_ml
+    snapshot_padrao = os.environ.get('SNAPSHOT_DASHBOARD', 'snapshot_dashboard.json')
+    # Idem para o serve (servico_dashboard importa pandas)
+    host_padrao = os.environ.get('SERVICO_HOST', '127.0.0.1')
+    porta_padrao = int(os.environ.get('SERVICO_PORTA', '8050'))
+    ttl_padrao = float(os.environ.get('SERVICO_TTL_SEGUNDOS', '900'))
+    # Idem para o lojas (importa os dois agentes)
+    lojas_padrao = os.environ.get('LOJAS_CONFIG', 'lojas.json')
+    simultaneas_padrao = int(os.environ.get('LOJAS_SIMULTANEAS', '4'))
+    # Idem para o consulta (predicao_ml importa gspread): o ID vem de config_planilhas, só biblioteca padrão
+    planilha_padrao = PLANILHA_HISTORICO_ID
+    # Idem para o ingerir
+    linhas_por_bloco_padrao = int(os.environ.get('INGESTAO_LINHAS_POR_BLOCO', '200000'))
+
+    parser = argparse.ArgumentParser(prog='cli.py', description="Agentes de backup e previsão de vendas.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    backup = comandos.add_parser('backup', help="Backup mensal da Origem para o Histórico")
+    backup.add_argument('--forcar', action='store_true', help="Executa mesmo fora do dia agendado")
+    backup.set_defaults(funcao=comando_backup)
+
+    predict = comandos.add_parser('predict', help="Previsão de lucro e dashboard de ML")
+    predict.set_defaults(funcao=comando_predict)
+
+    render = comandos.add_parser('render', help="Regera o dashboard a partir do snapshot (sem planilha)")
+    render.add_argument('--snapshot', default=snapshot_padrao, help=f"Snapshot gravado pelo predict (padrão: {snapshot_padrao})")
+    render.add_argument('--saida', default=None, help="Arquivo HTML de saída (padrão: dashboard_ml_insights.html)")
+    render.set_defaults(funcao=comando_render)
+
+    serve = comandos.add_parser('serve', help="Serviço HTTP local do dashboard com cache em memória")
+    serve.add_argument('--host', default=host_padrao, help=f"Endereço de escuta (padrão: {host_padrao})")
+    serve.add_argument('--porta', type=int, default=porta_padrao, help=f"Porta (padrão: {porta_padrao}; 0 = qualquer livre)")
+    serve.add_argument('--ttl', type=float, default=ttl_padrao, help=f"Segundos até recarregar os dados (padrão: {ttl_padrao:.0f})")
+    serve.set_defaults(funcao=comando_serve)
+
+    lojas = comandos.add_parser('lojas', help="Backup e/ou previsão de várias lojas em paralelo + painel consolidado")
+    lojas.add_argument('etapas', nargs='?', choices=('tudo', 'backup', 'predict'), default='tudo',
+                       help="O que rodar em cada loja (padrão: tudo = backup, se for o dia, e depois a previsão)")
+    lojas.add_argument('--forcar', action='store_true', help="Backup mesmo fora do dia agendado")
+    lojas.add_argument('--config', default=lojas_padrao, help=f"Registro de lojas (padrão: {lojas_padrao}; sem o arquivo, só a loja única)")
+    lojas.add_argument('--simultaneas', type=int, default=simultaneas_padrao, help=f"Lojas processadas ao mesmo tempo (padrão: {simultaneas_padrao})")
+    lojas.set_defaults(funcao=comando_lojas)
+
+    consulta = comandos.add_parser('consulta', help="Totais de um período (e contra o ano anterior) pelo índice diário, conferido com o resumo mensal")
+    consulta.add_argument('--de', help="Primeiro dia, AAAA-MM-DD (padrão: início do índice; sem período nenhum, o acumulado do ano)")
+    consulta.add_argument('--ate', help="Último dia, AAAA-MM-DD (padrão: último dia do índice)")
+    consulta.add_argument('--ultimos', type=int, help="Últimos N dias até --ate (ignora --de)")
+    consulta.add_argument('--comparar', action='store_true', help="Compara com o mesmo período do ano anterior")
+    consulta.add_argument('--sabores', type=int, default=0, help="Lista os N sabores de maior receita no período")
+    consulta.add_argument('--planilha', default=planilha_padrao, help="Histórico consultado (padrão: o da loja única)")
+    consulta.add_argument('--recarregar', action='store_true', help="Remonta o índice das abas brutas antes de consultar")
+    consulta.add_argument('--sem-conferir', action='store_true', help="Usa o índice salvo sem conferir com o resumo mensal (não acessa a planilha)")
+    consulta.set_defaults(funcao=comando_consulta)
+
+    ingerir = comandos.add_parser('ingerir', help="Resumo mensal de exportações CSV grandes de VENDAS/GASTOS, lidas em blocos")
+    ingerir.add_argument('vendas', help="CSV de VENDAS (mesmo layout da aba do Histórico)")
+    ingerir.add_argument('gastos', help="CSV de GASTOS (mesmo layout da aba do Histórico)")
+    ingerir.add_argument('--saida', default=None, help="Arquivo do resumo (padrão: <cache local>/resumo_ingestao.json)")
+    ingerir.add_argument('--publicar', metavar='ID', default=None, help="Grava o resumo na aba RESUMO_MENSAL deste Histórico")
+    ingerir.add_argument('--linhas-por-bloco', type=int, default=linhas_por_bloco_padrao,
+                         help=f"Linhas lidas por vez (padrão: {linhas_por_bloco_padrao})")
+    ingerir.set_defaults(funcao=comando_ingerir)
+
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
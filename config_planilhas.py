@@ -0,0 +1,8 @@
+import os
+
+# --- IDS DAS PLANILHAS (LOJA ÚNICA) ---
+# Fonte única dos IDs (APENAS o ID) para backup, predição e CLI. Só biblioteca padrão: o cli.py lê
+# daqui os padrões do --help sem importar gspread/pandas. Com várias lojas, ver lojas.py (lojas.json)
+PLANILHA_ORIGEM_ID = os.environ.get('PLANILHA_ORIGEM_ID', "1LuqYrfR8ry_MqCS93Mpj9_7Vu0i9RUTomJU2n69bEug")  # Vendas e Gastos (Origem do mês)
+PLANILHA_HISTORICO_ID = os.environ.get('PLANILHA_HISTORICO_ID', "1XWdRbHqY6DWOlSO-oJbBSyOsXmYhM_NEA2_yvWbfq2Y")  # HISTORICO DE VENDAS E GASTOS (Destino)
+# --------------------------------------------------------------------------------
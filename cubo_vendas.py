@@ -0,0 +1,113 @@
+import pandas as pd
+
+from parsing_brl import COLUNA_COMPRADOR, COLUNA_ITEM_VENDIDO
+from resumo_mensal import DIMENSAO_COMPRADOR, DIMENSAO_SABOR
+
+# --- CUBO DE RECEITA (ANO x MÊS x COMPRADOR x SABOR) ---
+# Construído UMA vez por execução; os KPIs (top-N de qualquer ano/mês) saem das marginais,
+# que têm poucas linhas, sem novas varreduras dos dados brutos.
+NIVEIS_MARGINAL = ['ano', 'mes', 'chave']
+NIVEIS_CUBO = ['ano', 'mes', DIMENSAO_COMPRADOR, DIMENSAO_SABOR]
+COLUNA_POR_DIMENSAO = {DIMENSAO_COMPRADOR: COLUNA_COMPRADOR, DIMENSAO_SABOR: COLUNA_ITEM_VENDIDO}
+# --------------------------------------------------------------------------------
+
+
+class CuboVendas:
+    """Receita agregada por ano/mês e por comprador e sabor."""
+
+    def __init__(self, marginais, cubo=None, colunas_faltantes=False):
+        # marginais: {dimensao: Series de receita (R$) indexada por (ano, mes, chave)}
+        self.marginais = marginais
+        self.cubo = cubo
+        self.colunas_faltantes = colunas_faltantes
+
+    @staticmethod
+    def _agrupar_centavos(df_vendas_bruto, coluna_valor):
+        """Uma única passada de groupby sobre as vendas brutas: centavos por (ano, mês, comprador, sabor)."""
+        datas = df_vendas_bruto['Data_Datetime']
+        return df_vendas_bruto[coluna_valor].groupby(
+            [datas.dt.year.rename('ano'), datas.dt.month.rename('mes'),
+             df_vendas_bruto[COLUNA_COMPRADOR].rename(DIMENSAO_COMPRADOR),
+             df_vendas_bruto[COLUNA_ITEM_VENDIDO].rename(DIMENSAO_SABOR)],
+            observed=True, sort=False,
+        ).sum()
+
+    @classmethod
+    def de_cubo(cls, cubo):
+        """Monta o cubo a partir da Series de centavos indexada por NIVEIS_CUBO (ex.: lida do cache)."""
+        # Marginais derivadas do cubo (que já é bem menor que os dados brutos), em R$ só no fim
+        marginais = {
+            dimensao: cubo.groupby(level=['ano', 'mes', dimensao], observed=True).sum().div(100).rename_axis(NIVEIS_MARGINAL)
+            for dimensao in COLUNA_POR_DIMENSAO
+        }
+        return cls(marginais, cubo=cubo)
+
+    @classmethod
+    def de_vendas_brutas(cls, df_vendas_bruto, coluna_valor='Vendas_Centavos'):
+        """Cubo das vendas brutas. Soma centavos (exato); as marginais saem em R$."""
+        if COLUNA_COMPRADOR not in df_vendas_bruto.columns or COLUNA_ITEM_VENDIDO not in df_vendas_bruto.columns:
+            return cls({}, colunas_faltantes=True)
+        return cls.de_cubo(cls._agrupar_centavos(df_vendas_bruto, coluna_valor))
+
+    def somar_vendas(self, df_vendas_novas, coluna_valor='Vendas_Centavos'):
+        """
+        Novo cubo com as vendas novas somadas a este. Só as células (ano, mês, comprador, sabor)
+        das linhas novas mudam; o resto do cubo não é reagregado a partir dos dados brutos.
+        """
+        if self.cubo is None or COLUNA_COMPRADOR not in df_vendas_novas.columns or COLUNA_ITEM_VENDIDO not in df_vendas_novas.columns:
+            return CuboVendas.de_vendas_brutas(df_vendas_novas, coluna_valor)
+        if df_vendas_novas.empty:
+            return self
+
+        novas = self._agrupar_centavos(df_vendas_novas, coluna_valor)
+        cubo = pd.concat([self.cubo, novas]).groupby(level=NIVEIS_CUBO, sort=False).sum()
+        return CuboVendas.de_cubo(cubo)
+
+    @classmethod
+    def de_resumo(cls, df_resumo):
+        """Monta as marginais a partir dos subtotais do resumo mensal (sem cruzamento comprador x sabor)."""
+        periodo = pd.PeriodIndex(df_resumo['MES_ANO'], freq='M')
+        marginais = {}
+        for dimensao in COLUNA_POR_DIMENSAO:
+            filtro = (df_resumo['DIMENSAO'] == dimensao).to_numpy()
+            receita = pd.Series(
+                df_resumo.loc[filtro, 'VENDAS_CENTAVOS'].to_numpy() / 100,
+                index=pd.MultiIndex.from_arrays(
+                    [periodo.year[filtro], periodo.month[filtro], df_resumo.loc[filtro, 'CHAVE'].to_numpy()],
+                    names=NIVEIS_MARGINAL,
+                ),
+            )
+            marginais[dimensao] = receita.groupby(level=NIVEIS_MARGINAL).sum()
+        return cls(marginais)
+
+    def _fatia(self, dimensao, ano=None, mes=None):
+        serie = self.marginais.get(dimensao, pd.Series(dtype='float64'))
+        if serie.empty:
+            return serie
+        filtro = pd.Series(True, index=serie.index)
+        if ano is not None:
+            filtro &= serie.index.get_level_values('ano') == ano
+        if mes is not None:
+            filtro &= serie.index.get_level_values('mes') == mes
+        return serie[filtro.to_numpy()]
+
+    def top(self, dimensao, n=10, ano=None, mes=None):
+        """Top-N chaves da dimensão por receita (seleção parcial com nlargest, sem ordenar tudo)."""
+        fatia = self._fatia(dimensao, ano, mes)
+        if fatia.empty:
+            return fatia
+        return fatia.groupby(level='chave', observed=True).sum().nlargest(n)
+
+    def lideres_por_mes(self, dimensao, ano):
+        """Para cada mês do ano: a chave líder e a receita dela. DataFrame (mes, chave, receita)."""
+        fatia = self._fatia(dimensao, ano)
+        if fatia.empty:
+            return pd.DataFrame(columns=['mes', 'chave', 'receita'])
+        por_mes = fatia.droplevel('ano')
+        lideres = por_mes.groupby(level='mes').idxmax()
+        return pd.DataFrame({
+            'mes': lideres.index,
+            'chave': [chave for _, chave in lideres],
+            'receita': por_mes.loc[lideres.to_list()].to_numpy(),
+        })
+
@@ -0,0 +1,124 @@
+// Renderizador do dashboard no formato 'dados' (dashboard_ml.py, DASHBOARD_FORMATO=dados).
+// A página traz só os quadros de tamanho fixo; o histórico mensal vem do JSON ao lado e vira
+// tabela aqui: balanços dos dois anos e auditoria dos meses recentes na carga, e os anos
+// anteriores da auditoria só quando o <details> do ano é aberto pela primeira vez. Data/hora da
+// geração e saúde do pipeline também vêm do JSON (a casca não muda de uma execução para outra).
+(function () {
+  'use strict';
+
+  var script = document.currentScript;
+  var MESES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+
+  // Mesmo texto de format_brl: "R$ -1.234,56"
+  function brl(centavos) {
+    var absoluto = Math.abs(centavos);
+    var inteiro = Math.floor(absoluto / 100).toString().replace(/\B(?=(\d{3})+(?!\d))/g, '.');
+    var decimais = String(absoluto % 100).padStart(2, '0');
+    return 'R$ ' + (centavos < 0 ? '-' : '') + inteiro + ',' + decimais;
+  }
+
+  function elemento(tag, atributos, filhos) {
+    var el = document.createElement(tag);
+    Object.keys(atributos || {}).forEach(function (nome) { el.setAttribute(nome, atributos[nome]); });
+    (filhos || []).forEach(function (filho) {
+      el.appendChild(typeof filho === 'string' ? document.createTextNode(filho) : filho);
+    });
+    return el;
+  }
+
+  function tabela(cabecalhos, linhas) {
+    var thead = elemento('thead', {}, [elemento('tr', {}, cabecalhos.map(function (c) {
+      return typeof c === 'string' ? elemento('th', {}, [c]) : elemento('th', c.atributos, [c.texto]);
+    }))]);
+    return elemento('table', {}, [thead, elemento('tbody', {}, linhas)]);
+  }
+
+  // Linha do JSON: [mes 'AAAA-MM', vendas_centavos, gastos_centavos]
+  function lucro(mes) { return mes[1] - mes[2]; }
+  function ano(mes) { return Number(mes[0].slice(0, 4)); }
+
+  function tabelaAuditoria(meses) {
+    return tabela(['Mês/Ano', 'Vendas Totais', 'Gastos Totais', 'Lucro Líquido (Vendas - Gastos)'], meses.map(function (mes) {
+      var classe = lucro(mes) >= 0 ? 'lucro-positivo-dark' : 'lucro-negativo-dark';
+      return elemento('tr', { 'class': classe }, [mes[0], brl(mes[1]), brl(mes[2]), brl(lucro(mes))].map(function (texto) {
+        return elemento('td', {}, [texto]);
+      }));
+    }));
+  }
+
+  function balanco(container, meses, anoFoco) {
+    var doAno = meses.filter(function (mes) { return ano(mes) === anoFoco; });
+    if (!doAno.length) {
+      container.appendChild(elemento('p', {}, ['Não há dados de Lucro Mensal para o Ano de ' + anoFoco + '.']));
+      return;
+    }
+    var maximo = Math.max.apply(null, doAno.map(function (mes) { return Math.abs(lucro(mes)); }));
+    container.appendChild(tabela([{ texto: 'Mês/Ano', atributos: { style: 'width: 20%;' } }, 'Lucro Líquido (Visualização)'], doAno.map(function (mes) {
+      var valor = lucro(mes);
+      var largura = maximo > 0 ? Math.abs(valor) / maximo * 100 : 0;
+      var barra = elemento('div', { 'class': 'barra ' + (valor >= 0 ? 'barra-positiva' : 'barra-negativa'), style: 'width: ' + largura.toFixed(1) + '%;' }, [brl(valor)]);
+      var rotulo = MESES[Number(mes[0].slice(5, 7)) - 1] + '/' + mes[0].slice(0, 4);
+      return elemento('tr', {}, [elemento('td', {}, [rotulo]), elemento('td', {}, [elemento('div', { 'class': 'barra-fundo' }, [barra])])]);
+    })));
+  }
+
+  function auditoria(container, meses, visiveis) {
+    var anteriores = visiveis ? meses.slice(0, Math.max(meses.length - visiveis, 0)) : [];
+    container.appendChild(tabelaAuditoria(meses.slice(anteriores.length)));
+    if (!anteriores.length) { return; }
+
+    var externo = elemento('details', { 'class': 'auditoria-anterior' }, [elemento('summary', {}, ['Meses anteriores (' + anteriores.length + ' meses)'])]);
+    var anos = anteriores.map(ano).filter(function (a, i, todos) { return todos.indexOf(a) === i; }).reverse();
+    anos.forEach(function (anoFoco) {
+      var doAno = anteriores.filter(function (mes) { return ano(mes) === anoFoco; });
+      var detalhe = elemento('details', {}, [elemento('summary', {}, [anoFoco + ' (' + doAno.length + ' meses)'])]);
+      // A tabela do ano só é montada na primeira abertura
+      detalhe.addEventListener('toggle', function () {
+        if (detalhe.open && detalhe.children.length === 1) { detalhe.appendChild(tabelaAuditoria(doAno)); }
+      });
+      externo.appendChild(detalhe);
+    });
+    container.appendChild(externo);
+  }
+
+  // Mesmo painel de gerar_html_saude_pipeline (dashboard_ml.py)
+  function saude(container, dados) {
+    if (!dados) { return; }
+    function celula(valor) { return valor === null || valor === undefined ? '-' : String(valor); }
+    var resumo = '🩺 Saúde do Pipeline: ' + dados.segundos_total.toFixed(1) + ' s, pico de ' + dados.pico_memoria_mb.toFixed(0) +
+      ' MB, ' + dados.chamadas + ' chamadas à API (' + dados.megabytes.toFixed(1) + ' MB)';
+    container.appendChild(elemento('details', { 'class': 'info-box' }, [
+      elemento('summary', {}, [resumo]),
+      tabela(['Etapa', 'Tempo', 'Pico de Memória', 'Linhas (Entrada)', 'Linhas (Saída)'], dados.etapas.map(function (e) {
+        return elemento('tr', {}, [e.etapa, e.segundos.toFixed(2) + ' s', e.pico_memoria_mb.toFixed(1) + ' MB', celula(e.linhas_entrada), celula(e.linhas_saida)].map(function (texto) {
+          return elemento('td', {}, [texto]);
+        }));
+      }))
+    ]));
+  }
+
+  fetch(script.getAttribute('data-dados'))
+    .then(function (resposta) {
+      if (!resposta.ok) { throw new Error('HTTP ' + resposta.status); }
+      return resposta.json();
+    })
+    .then(function (dados) {
+      document.querySelectorAll('[data-gerado-em]').forEach(function (container) {
+        container.textContent = dados.gerado_em || '';
+      });
+      document.querySelectorAll('[data-saude]').forEach(function (container) {
+        saude(container, dados.saude);
+      });
+      document.querySelectorAll('[data-balanco]').forEach(function (container) {
+        balanco(container, dados.meses, Number(container.getAttribute('data-balanco')));
+      });
+      document.querySelectorAll('[data-auditoria]').forEach(function (container) {
+        auditoria(container, dados.meses, dados.meses_visiveis);
+      });
+    })
+    .catch(function (erro) {
+      document.querySelectorAll('[data-balanco], [data-auditoria]').forEach(function (container) {
+        container.appendChild(elemento('p', {}, ['Não foi possível carregar os dados do dashboard (' + erro.message + '). Abra a página por um servidor HTTP.']));
+      });
+    });
+})();
@@ -0,0 +1,710 @@
+import os
+import html
+import json
+import gzip
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from resumo_mensal import DIMENSAO_COMPRADOR, DIMENSAO_SABOR
+from cubo_vendas import CuboVendas, NIVEIS_MARGINAL
+from renderizacao import format_brl, escrever_tabela_auditoria, gerar_html_balanco_grafico, MESES_AUDITORIA_VISIVEIS
+from instrumentacao import resumo_execucao
+from backtesting import MODELO_BASELINE
+from previsao_series import maiores_variacoes
+from simulacao_lucro import COLUNAS_QUANTIS
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem o pacote, só as cópias .gz
+    brotli = None
+
+# --- DASHBOARD DE ML (HTML) ---
+# Separado da carga/treino: o comando 'render' do cli.py regera a página a partir do snapshot
+# sem importar gspread nem tocar na planilha.
+OUTPUT_HTML = "dashboard_ml_insights.html"
+URL_DASHBOARD = "https://acmsilva1.github.io/analise-de-vendas/dashboard_ml_insights.html" 
+MARCADOR_AUDITORIA = "<!--TABELA_AUDITORIA-->"
+
+# LIMITE DE GOVERNANÇA DE IA - 15% de tolerância de erro médio absoluto
+TOLERANCIA_MAE_PERCENTUAL = 0.15 
+
+# Entradas do último dashboard (JSON), gravadas pela predição e lidas pelo 'render'
+ARQUIVO_SNAPSHOT = os.environ.get('SNAPSHOT_DASHBOARD', 'snapshot_dashboard.json')
+
+# Painel consolidado de várias lojas (lojas.py), com um link para o dashboard de cada loja
+OUTPUT_HTML_LOJAS = os.environ.get('DASHBOARD_LOJAS', 'dashboard_lojas.html')
+# Formato da página: 'html' (tudo embutido: histórico, barras e estilos) ou 'dados' (casca HTML só com os
+# quadros de tamanho fixo + histórico mensal em JSON desenhado no navegador pelo dashboard_ml.js + .css).
+# No 'dados' a página não cresce com o histórico e o JSON ganha uma linha por mês novo (diff pequeno).
+FORMATO_DASHBOARD = os.environ.get('DASHBOARD_FORMATO', 'html').lower()
+SCRIPT_DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard_ml.js')
+
+# Cópias pré-comprimidas (.gz, e .br com o pacote brotli) dos arquivos do formato 'dados'
+COMPRIMIR_DASHBOARD = os.environ.get('DASHBOARD_COMPRIMIR', 'true').lower() == 'true'
+
+ROTULOS_SITUACAO = {'concluida': '✅ Atualizada', 'pulada': '⏭️ Sem mudança', 'sem_dados': '⚠️ Sem dados', 'falha': '🚨 Falha'}
+# --------------------------------------------------------------------------------
+
+def estilos_css(cor_destaque, cor_texto_destaque="white"):
+    """Folha de estilo (dark mode) das páginas; cor_destaque é o fundo do quadro principal (.metric-box)."""
+    return f"""<style>{regras_css(cor_destaque, cor_texto_destaque)}</style>"""
+
+def regras_css(cor_destaque, cor_texto_destaque="white"):
+    """Regras de estilos_css sem a tag <style> (arquivo .css do formato 'dados')."""
+    return f"""
+            /* --- ESTILOS DARK MODE EXCLUSIVO --- */
+            body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #121212; color: #e0e0e0; }}
+            .container {{ max-width: 900px; margin: auto; background: #1e1e1e; padding: 20px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.5); }}
+            h2 {{ color: #bb86fc; border-bottom: 2px solid #bb86fc; padding-bottom: 10px; }}
+            h3 {{ color: #03dac6; margin-top: 25px; }}
+            
+            .metric-box {{ padding: 20px; margin-bottom: 20px; border-radius: 8px; background-color: {cor_destaque}; color: {cor_texto_destaque}; text-align: center; }}
+            .metric-box h3 {{ margin-top: 0; font-size: 1.5em; }}
+            .metric-box p {{ font-size: 2.5em; font-weight: bold; }}
+            
+            .info-box {{ padding: 10px; border: 1px dashed #444; background-color: #2c2c2c; margin-top: 15px; }}
+            
+            table {{ width: 100%; border-collapse: collapse; margin-top: 15px; }}
+            th, td {{ padding: 10px; border: 1px solid #333; text-align: left; }}
+            th {{ background-color: #3700b3; color: white; }}
+            
+            .lucro-positivo-dark {{ background-color: #1f311f; color: #c7ecc7; }} 
+            .lucro-negativo-dark {{ background-color: #3b1f1f; color: #ffbaba; }} 
+            
+            .barra-fundo {{ background-color: #2c2c2c; border-radius: 4px; overflow: hidden; height: 20px; text-align: left; }}
+            .barra {{ height: 100%; text-align: right; line-height: 20px; color: white; padding-right: 5px; box-sizing: border-box; }}
+            .barra-positiva {{ background-color: #006400; }}
+            .barra-negativa {{ background-color: #9c0000; }}
+            details summary {{ cursor: pointer; color: #03dac6; margin-top: 10px; }}
+            
+            .metric-card {{ background: #2c2c2c; padding: 15px; border-radius: 6px; box-shadow: 0 2px 4px rgba(0,0,0,0.2); margin-top: 10px; }}
+            .metric-card h4 {{ color: #03dac6; margin-top: 0; }}
+            .metric-card p {{ font-size: 1.1em; font-weight: bold; color: #e0e0e0; }}
+            .grid-2 {{ display: grid; grid-template-columns: repeat(2, 1fr); gap: 20px; margin-top: 20px; }}
+            a {{ color: #bb86fc; }}
+        """
+
+def gerar_html_top_n(cubo, ano_foco, n=10):
+    """Gera as listas Top-N de compradores e sabores do ano (lado a lado)."""
+    cards = ""
+    for dimensao, titulo in ((DIMENSAO_COMPRADOR, "Compradores"), (DIMENSAO_SABOR, "Sabores")):
+        ranking = cubo.top(dimensao, n=n, ano=ano_foco)
+        itens = "".join(f"<li>{html.escape(str(chave))} - {format_brl(receita)}</li>" for chave, receita in ranking.items())
+        cards += f"""
+        <div class="metric-card">
+            <h4>Top {n} {titulo} ({ano_foco})</h4>
+            <ol>{itens or '<li>Sem dados</li>'}</ol>
+        </div>
+        """
+    return f'<div class="grid-2">{cards}</div>'
+
+def gerar_html_lideres_mensais(cubo, ano_foco):
+    """Gera a tabela mês a mês com o comprador e o sabor líderes em receita."""
+    compradores = cubo.lideres_por_mes(DIMENSAO_COMPRADOR, ano_foco).set_index('mes')
+    sabores = cubo.lideres_por_mes(DIMENSAO_SABOR, ano_foco).set_index('mes')
+    meses = sorted(set(compradores.index) | set(sabores.index))
+    if not meses:
+        return f"<p>Não há dados mensais de compradores/sabores para {ano_foco}.</p>"
+    
+    def celula(df, mes):
+        return f"{html.escape(str(df.at[mes, 'chave']))} ({format_brl(df.at[mes, 'receita'])})" if mes in df.index else "-"
+    
+    linhas = "".join(
+        f"<tr><td>{ano_foco}-{int(mes):02d}</td><td>{celula(compradores, mes)}</td><td>{celula(sabores, mes)}</td></tr>"
+        for mes in meses
+    )
+    return f"""
+    <table>
+        <thead><tr><th>Mês</th><th>Comprador Líder</th><th>Sabor Líder</th></tr></thead>
+        <tbody>{linhas}</tbody>
+    </table>
+    """
+
+def gerar_html_leaderboard(leaderboard):
+    """Gera a tabela do backtest (MAE fora da amostra por horizonte); o modelo escolhido fica destacado."""
+    colunas_mae = [c for c in leaderboard.columns if c.startswith('MAE_h')]
+    cabecalho = "".join(f"<th>MAE h+{c.removeprefix('MAE_h')}</th>" for c in colunas_mae)
+    
+    linhas = ""
+    for posicao, (modelo, linha) in enumerate(leaderboard.iterrows()):
+        classe = ' class="lucro-positivo-dark"' if posicao == 0 else ''
+        maes = "".join(f"<td>{format_brl(linha[c]) if pd.notna(linha[c]) else '-'}</td>" for c in colunas_mae)
+        linhas += f"<tr{classe}><td>{modelo}</td>{maes}<td>{int(linha['Origens'])}</td></tr>"
+    
+    return f"""
+    <table>
+        <thead><tr><th>Modelo</th>{cabecalho}<th>Origens</th></tr></thead>
+        <tbody>{linhas}</tbody>
+    </table>
+    """
+
+def gerar_html_maiores_variacoes(df_previsoes, n=10):
+    """Gera as tabelas de top movers (maior variação prevista de receita) por sabor e por comprador."""
+    cards = ""
+    for dimensao, titulo in ((DIMENSAO_SABOR, "Sabores"), (DIMENSAO_COMPRADOR, "Compradores")):
+        movers = maiores_variacoes(df_previsoes, dimensao, n)
+        linhas = "".join(
+            f'<tr class="{"lucro-positivo-dark" if variacao >= 0 else "lucro-negativo-dark"}">'
+            f"<td>{html.escape(str(chave))}</td><td>{format_brl(ultimo)}</td><td>{format_brl(previsao)}</td><td>{format_brl(variacao)}</td></tr>"
+            for chave, ultimo, previsao, variacao in movers[['CHAVE', 'ULTIMO_MES', 'PREVISAO', 'VARIACAO']].itertuples(index=False)
+        )
+        cards += f"""
+        <div>
+            <h4>{titulo}</h4>
+            <table>
+                <thead><tr><th>Chave</th><th>Último Mês</th><th>Previsão</th><th>Variação</th></tr></thead>
+                <tbody>{linhas or '<tr><td colspan="4">Sem dados</td></tr>'}</tbody>
+            </table>
+        </div>
+        """
+    return f'<div class="grid-2">{cards}</div>'
+
+def gerar_html_cenarios(df_cenarios):
+    """Tabela dos cenários de lucro: faixa de 90% e de 50%, mediana e barra da probabilidade de prejuízo por mês."""
+    p_baixo, p_q1, p_mediana, p_q3, p_alto = COLUNAS_QUANTIS
+    linhas = ""
+    for cenario in df_cenarios.itertuples(index=False):
+        probabilidade = cenario.Prob_Prejuizo * 100
+        classe = "barra-negativa" if probabilidade >= 50 else "barra-positiva"
+        linhas += (
+            f"<tr><td>{cenario.Mes_Ano.strftime('%b/%Y')}</td>"
+            f"<td>{format_brl(getattr(cenario, p_baixo))} a {format_brl(getattr(cenario, p_alto))}</td>"
+            f"<td>{format_brl(getattr(cenario, p_q1))} a {format_brl(getattr(cenario, p_q3))}</td>"
+            f"<td>{format_brl(getattr(cenario, p_mediana))}</td>"
+            f'<td><div class="barra-fundo"><div class="barra {classe}" style="width: {max(probabilidade, 8):.1f}%;">{probabilidade:.0f}%</div></div></td></tr>\n'
+        )
+    return f"""
+    <table>
+        <thead><tr><th>Mês</th><th>Faixa de 90%</th><th>Faixa de 50%</th><th>Mediana</th><th style="width: 25%;">P(Prejuízo)</th></tr></thead>
+        <tbody>{linhas}</tbody>
+    </table>
+    """
+
+def gerar_html_comparativo_anual(comparativo_anual):
+    """Tabela de cada janela (acumulado do ano, últimos dias) contra a mesma janela do ano anterior."""
+    def data_br(texto):
+        return datetime.strptime(texto, '%Y-%m-%d').strftime('%d/%m/%Y')
+
+    linhas = ""
+    for janela in comparativo_anual:
+        atual, anterior, variacao = janela['atual'], janela['anterior'], janela['variacao']
+        linhas += (f'<tr><th colspan="4">{janela["rotulo"]}: {data_br(janela["inicio"])} a {data_br(janela["fim"])} '
+                   f'vs. {data_br(janela["inicio_anterior"])} a {data_br(janela["fim_anterior"])}</th></tr>\n')
+        for coluna, rotulo in (('Total_Vendas', 'Vendas'), ('Total_Gastos', 'Gastos'), ('Lucro_Liquido', 'Lucro Líquido')):
+            percentual = f" ({variacao[coluna] / abs(anterior[coluna]):+.1%})".replace('.', ',') if anterior[coluna] else ""
+            # Para gastos, subir é ruim
+            melhorou = variacao[coluna] <= 0 if coluna == 'Total_Gastos' else variacao[coluna] >= 0
+            cor = "#03dac6" if melhorou else "#cf6679"
+            linhas += (
+                f"<tr><td>{rotulo}</td><td>{format_brl(atual[coluna])}</td><td>{format_brl(anterior[coluna])}</td>"
+                f'<td style="color: {cor};">{format_brl(variacao[coluna])}{percentual}</td></tr>\n'
+            )
+    return f"""
+    <table>
+        <thead><tr><th>Total</th><th>Período Atual</th><th>Ano Anterior</th><th>Variação</th></tr></thead>
+        <tbody>{linhas}</tbody>
+    </table>
+    """
+
+def dados_saude_pipeline(relatorio):
+    """Números do painel de saúde do pipeline (vão no JSON do formato 'dados': mudam a cada execução)."""
+    return {
+        'segundos_total': relatorio['segundos_total'],
+        'pico_memoria_mb': relatorio['pico_memoria_mb'],
+        'chamadas': sum(c['chamadas'] for c in relatorio['api'].values()),
+        'megabytes': sum(c['bytes'] for c in relatorio['api'].values()) / 2 ** 20,
+        'etapas': [
+            {'etapa': e['etapa'], 'segundos': e['segundos'], 'pico_memoria_mb': e['pico_memoria_mb'],
+             'linhas_entrada': e.get('linhas_entrada'), 'linhas_saida': e.get('linhas_saida', e.get('linhas_lidas'))}
+            for e in relatorio['etapas']
+        ],
+    }
+
+def gerar_html_saude_pipeline(relatorio):
+    """Painel compacto de saúde do pipeline: tempo, memória, linhas e chamadas à API por etapa."""
+    saude = dados_saude_pipeline(relatorio)
+    
+    def celula(valor):
+        return '-' if valor is None else valor
+    
+    linhas = "".join(
+        f"<tr><td>{e['etapa']}</td><td>{e['segundos']:.2f} s</td><td>{e['pico_memoria_mb']:.1f} MB</td>"
+        f"<td>{celula(e['linhas_entrada'])}</td><td>{celula(e['linhas_saida'])}</td></tr>"
+        for e in saude['etapas']
+    )
+    return f"""
+    <details class="info-box">
+        <summary>🩺 Saúde do Pipeline: {saude['segundos_total']:.1f} s, pico de {saude['pico_memoria_mb']:.0f} MB, {saude['chamadas']} chamadas à API ({saude['megabytes']:.1f} MB)</summary>
+        <table>
+            <thead><tr><th>Etapa</th><th>Tempo</th><th>Pico de Memória</th><th>Linhas (Entrada)</th><th>Linhas (Saída)</th></tr></thead>
+            <tbody>{linhas}</tbody>
+        </table>
+    </details>
+    """
+
+def montar_dashboard_ml(previsao, mae, ultimo_valor_real, df_historico, melhor_comprador_atual, produto_mais_vendido_atual, melhor_comprador_ant, produto_mais_vendido_ant, ano_ant, ano_atual, cubo=None, leaderboard=None, df_previsoes_series=None, df_cenarios=None, comparativo_anual=None, destino=None, formato=None):
+    """
+    Monta o dashboard e escreve em destino (caminho ou arquivo texto aberto; padrão OUTPUT_HTML).
+    formato (padrão FORMATO_DASHBOARD) 'dados' grava também os arquivos de arquivos_dashboard;
+    com destino em arquivo aberto (serviço) a página é sempre a completa.
+    """
+    destino = OUTPUT_HTML if destino is None else destino
+    formato_dados = (FORMATO_DASHBOARD if formato is None else formato) == 'dados' and isinstance(destino, str)
+    
+    # Lógica de Insight da Previsão
+    diferenca = previsao - ultimo_valor_real
+    if previsao < 0:
+        insight = f"🚨 **Previsão de PREJUÍZO!** Lucro negativo de {format_brl(abs(previsao))} esperado. Hora de cortar o cafezinho."
+        cor = "#9c0000" 
+    elif diferenca > (ultimo_valor_real * 0.10):
+        insight = f"🚀 **Crescimento de Lucro Esperado!** Aumento de {format_brl(diferenca)}. Suas vendas estão no *hype*!"
+        cor = "#006400" 
+    elif diferenca < -(ultimo_valor_real * 0.10):
+        insight = f"⚠️ **Risco de Queda de Lucro!** Retração de {format_brl(abs(diferenca))} esperada. Analise seus custos ou chame o Batman!"
+        cor = "#b8860b" 
+    else:
+        insight = f"➡️ **Estabilidade Esperada.** Lucro projetado próximo ao mês passado. Nem frio, nem quente."
+        cor = "#005a8d" 
+    
+    texto_box_cor = "white"
+
+    # --- GOVERNANÇA DE IA: ANÁLISE DO MAE (O Sargento do Controle) ---
+    lucro_liquido_medio = df_historico['Lucro_Liquido'].mean()
+    limite_mae = abs(lucro_liquido_medio * TOLERANCIA_MAE_PERCENTUAL)
+    
+    # Lógica de Alerta
+    if mae > limite_mae:
+        mae_status = f"🚨 **MAE ALTO!** O erro médio ({format_brl(mae)}) é maior que a tolerância de {format_brl(limite_mae)}. O modelo está apenas dando um palpite chique."
+        mae_cor = "red" 
+    else:
+        mae_status = f"✅ **MAE ACEITÁVEL.** O erro médio está dentro da margem de {format_brl(limite_mae)}. Siga usando, mas monitore!"
+        mae_cor = "#006400" 
+    
+    # --- GERAÇÃO DOS GRÁFICOS DE BALANÇO ---
+    if formato_dados:
+        # Desenhados no navegador a partir do JSON (dashboard_ml.js)
+        html_balanco_anterior = f'<div data-balanco="{ano_ant}"></div>'
+        html_balanco_atual = f'<div data-balanco="{ano_atual}"></div>'
+        caminho_dados, caminho_css, caminho_script = arquivos_dashboard(destino, 'dados')[1:]
+        html_estilos = f"""<link rel="stylesheet" href="{os.path.basename(caminho_css)}">
+        <script src="{os.path.basename(caminho_script)}" data-dados="{os.path.basename(caminho_dados)}" defer></script>"""
+    else:
+        df_balanco_anterior = df_historico[df_historico['Mes_Ano'].dt.year == ano_ant].copy()
+        html_balanco_anterior = gerar_html_balanco_grafico(df_balanco_anterior, f"o Ano de {ano_ant}")
+
+        df_balanco_atual = df_historico[df_historico['Mes_Ano'].dt.year == ano_atual].copy()
+        html_balanco_atual = gerar_html_balanco_grafico(df_balanco_atual, f"o Ano de {ano_atual}")
+        html_estilos = estilos_css(cor, texto_box_cor)
+    
+    # --- RANKINGS E LÍDERES MENSAIS (servidos pelo cubo de receita) ---
+    if cubo is not None and not cubo.colunas_faltantes:
+        html_rankings = f"""
+            <h3>Rankings de Receita ({ano_atual})</h3>
+            {gerar_html_top_n(cubo, ano_atual)}
+            <h3>Líderes Mês a Mês ({ano_atual})</h3>
+            {gerar_html_lideres_mensais(cubo, ano_atual)}
+        """
+    else:
+        html_rankings = ""
+    
+    # --- LEADERBOARD DO BACKTEST (qual modelo foi escolhido e por quê) ---
+    modelo_escolhido = leaderboard.index[0] if leaderboard is not None else MODELO_BASELINE
+    if leaderboard is not None:
+        html_leaderboard = f"""
+            <h3>Leaderboard do Backtest (Origem Móvel)</h3>
+            <p>MAE fora da amostra de cada modelo; o vencedor no horizonte de 1 mês gera a previsão.</p>
+            {gerar_html_leaderboard(leaderboard)}
+        """
+    else:
+        html_leaderboard = ""
+    
+    # --- TOP MOVERS (previsão por sabor e por comprador) ---
+    if df_previsoes_series is not None and not df_previsoes_series.empty:
+        html_movers = f"""
+            <h3>Top Movers do Próximo Mês (Receita por Sabor e Comprador)</h3>
+            <p>Maiores variações previstas em relação ao último mês, cada série com o seu melhor modelo no backtest.</p>
+            {gerar_html_maiores_variacoes(df_previsoes_series)}
+        """
+    else:
+        html_movers = ""
+    
+    # --- CENÁRIOS DE LUCRO (Monte Carlo): risco de prejuízo, não só a previsão pontual ---
+    if df_cenarios is not None and not df_cenarios.empty:
+        proximo = df_cenarios.iloc[0]
+        p_baixo, p_alto = COLUNAS_QUANTIS[0], COLUNAS_QUANTIS[-1]
+        insight_risco = (f"<p>🎲 Probabilidade de prejuízo no próximo mês: **{proximo['Prob_Prejuizo']:.0%}** "
+                         f"(90% dos cenários entre {format_brl(proximo[p_baixo])} e {format_brl(proximo[p_alto])}).</p>")
+        html_cenarios = f"""
+            <h3>🎲 Cenários de Lucro dos Próximos {len(df_cenarios)} Meses (Monte Carlo)</h3>
+            <p>Caminhos simulados sorteando, em blocos de meses consecutivos, as variações históricas de Vendas e Gastos a partir do último mês.</p>
+            {gerar_html_cenarios(df_cenarios)}
+        """
+    else:
+        insight_risco = ""
+        html_cenarios = ""
+    
+    # --- COMPARATIVO COM O ANO ANTERIOR (índice diário: mesma janela de datas, não o ano inteiro) ---
+    if comparativo_anual:
+        html_comparativo = f"""
+            <h3>📅 Comparativo com o Mesmo Período do Ano Anterior</h3>
+            {gerar_html_comparativo_anual(comparativo_anual)}
+        """
+    else:
+        html_comparativo = """
+            <h3>📅 Comparativo com o Mesmo Período do Ano Anterior</h3>
+            <p>Indisponível nesta execução: o índice diário não confere com o resumo mensal (veja os alertas do log do predict).</p>
+        """
+    
+    # --- SAÚDE DO PIPELINE (só com INSTRUMENTACAO=true; etapas até a renderização) ---
+    # No formato 'dados' a data/hora e a saúde vão no JSON: a casca fica igual byte a byte entre execuções
+    relatorio_execucao = resumo_execucao()
+    gerado_em = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+    if formato_dados:
+        html_saude = '<div data-saude></div>'
+        html_gerado_em = '<span data-gerado-em></span>'
+    else:
+        html_saude = gerar_html_saude_pipeline(relatorio_execucao) if relatorio_execucao else ""
+        html_gerado_em = gerado_em
+    
+    
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Dashboard ML Insights - Previsão de Lucro Líquido</title>
+         {html_estilos}
+    </head>
+    <body>
+        <div class="container">
+            <h2>🔮 Insights de Machine Learning e Negócios</h2>
+            <p>Modelo: **{modelo_escolhido}** - Escolhido por Backtest. Data: {html_gerado_em}. Foco do ML: Previsão de {ano_atual}.</p>
+            
+            <div class="metric-box">
+                <h3>Lucro Líquido Projetado para o Próximo Mês</h3>
+                <p>{format_brl(previsao)}</p>
+            </div>
+            
+            <div class="info-box">
+                <h4>Insight da Previsão:</h4>
+                <p>{insight}</p>
+                {insight_risco}
+            </div>
+
+            <div class="info-box" style="border: 1px dashed {mae_cor};">
+                <h4>Métricas de Qualidade (Governança de IA)</h4>
+                <p>Lucro Real Mês Passado: **{format_brl(ultimo_valor_real)}**</p>
+                <p>Erro Absoluto Médio Histórico (MAE): **{format_brl(mae)}**</p> 
+                <p style="color: {mae_cor}; font-weight: bold;">Status da Governança: {mae_status}</p>
+            </div>
+            
+            {html_cenarios}
+            
+            {html_leaderboard}
+            
+            <hr style="margin-top: 30px; border-color: #3700b3;">
+
+            <h2>🏺 Baú de Memórias - Performance de {ano_ant}</h2>
+            
+            <h3>Resumo de KPIs Chave ({ano_ant})</h3>
+            <div class="grid-2">
+                 <div class="metric-card">
+                    <h4>Melhor Comprador Histórico ({ano_ant})</h4>
+                    <p>{html.escape(str(melhor_comprador_ant))}</p>
+                </div>
+                 <div class="metric-card">
+                    <h4>Sabor Mais Vendido Histórico ({ano_ant})</h4>
+                    <p>{html.escape(str(produto_mais_vendido_ant))}</p>
+                </div>
+            </div>
+            
+            <h3>Balanço Mensal Detalhado de Lucro Líquido ({ano_ant})</h3>
+            {html_balanco_anterior}
+            
+            <hr style="margin-top: 30px; border-color: #3700b3;">
+
+            
+            <h2>🏆 Principais Indicadores de Negócio ({ano_atual})</h2>
+            <p>Métricas de negócio baseadas nos dados brutos do ano corrente, essenciais para tomada de decisão AGORA.</p>
+            <div class="grid-2">
+                 <div class="metric-card">
+                    <h4>Melhor Comprador (Receita Gerada)</h4>
+                    <p>{html.escape(str(melhor_comprador_atual))}</p>
+                </div>
+                 <div class="metric-card">
+                    <h4>Sabor Mais Vendido (Receita Gerada)</h4>
+                    <p>{html.escape(str(produto_mais_vendido_atual))}</p>
+                </div>
+            </div>
+
+            {html_comparativo}
+
+            {html_rankings}
+            
+            {html_movers}
+
+            <h2>📈 Análise de Lucro Mensal (Foco em {ano_atual})</h2>
+            {html_balanco_atual}
+            
+            <h2>📊 Tabela de Auditoria Histórica (Base do ML)</h2>
+            <p>Estes são os dados consolidados de Vendas e Gastos utilizados para treinar o modelo de previsão.</p>
+            {MARCADOR_AUDITORIA}
+
+            {html_saude}
+
+            <p style="margin-top: 20px; font-size: 0.9em; color: #777;">Dashboard hospedado em: <a href="{URL_DASHBOARD}" target="_blank">{URL_DASHBOARD}</a></p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    if formato_dados:
+        gravar_dashboard_dados(html_content.replace(MARCADOR_AUDITORIA, '<div data-auditoria></div>'), df_historico,
+                               regras_css(cor, texto_box_cor), destino, gerado_em,
+                               dados_saude_pipeline(relatorio_execucao) if relatorio_execucao else None)
+        return
+    
+    # Escrita em streaming: a tabela de auditoria vai direto para o arquivo, bloco a bloco
+    antes_auditoria, depois_auditoria = html_content.split(MARCADOR_AUDITORIA)
+    
+    def escrever(f):
+        f.write(antes_auditoria)
+        escrever_tabela_auditoria(f, df_historico)
+        f.write(depois_auditoria)
+    
+    if isinstance(destino, str):
+        with open(destino, 'w', encoding='utf-8') as f:
+            escrever(f)
+    else:
+        escrever(destino)
+
+
+# --- FORMATO 'DADOS' (CASCA HTML + JSON + SCRIPT) ---
+
+def arquivos_dashboard(destino=OUTPUT_HTML, formato=None):
+    """Arquivos gravados por montar_dashboard_ml no formato: [página] ou [página, dados JSON, estilos, script]."""
+    if (FORMATO_DASHBOARD if formato is None else formato) != 'dados':
+        return [destino]
+    base = os.path.splitext(destino)[0]
+    pasta = os.path.dirname(destino)
+    return [destino, f"{base}.dados.json", f"{base}.css", os.path.join(pasta, os.path.basename(SCRIPT_DASHBOARD))]
+
+def dados_dashboard_json(df_historico, meses_visiveis=MESES_AUDITORIA_VISIVEIS, gerado_em=None, saude=None):
+    """
+    Histórico mensal para o dashboard_ml.js: [mês, vendas, gastos] em centavos (o lucro sai da
+    diferença, exato), um mês por linha para o diff de cada execução ser só o mês novo. Data/hora
+    da geração e saúde do pipeline (dados_saude_pipeline ou None) ficam numa linha cada.
+    """
+    vendas = (df_historico['Total_Vendas'] * 100).round().astype('int64')
+    gastos = (df_historico['Total_Gastos'] * 100).round().astype('int64')
+    meses = df_historico['Mes_Ano'].dt.strftime('%Y-%m')
+    linhas = ",\n".join(json.dumps([mes, int(v), int(g)]) for mes, v, g in zip(meses, vendas, gastos))
+    return (f'{{"versao": 2, "meses_visiveis": {int(meses_visiveis)}, "colunas": ["mes", "vendas_centavos", "gastos_centavos"],\n'
+            f'"gerado_em": {json.dumps(gerado_em)},\n'
+            f'"saude": {json.dumps(saude, ensure_ascii=False)},\n'
+            f'"meses": [\n{linhas}\n]}}\n')
+
+def gravar_comprimidos(caminho):
+    """Cópias .gz (sem data no cabeçalho: mesmo conteúdo, mesmos bytes) e .br ao lado do arquivo."""
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    with open(f"{caminho}.gz", 'wb') as f:
+        f.write(gzip.compress(conteudo, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(f"{caminho}.br", 'wb') as f:
+            f.write(brotli.compress(conteudo, quality=11))
+
+def gravar_dashboard_dados(html_casca, df_historico, css, destino, gerado_em=None, saude=None):
+    """Grava a casca, o JSON do histórico, a folha de estilos e o script (copiado se a página está em outra pasta)."""
+    _, caminho_dados, caminho_css, caminho_script = arquivos_dashboard(destino, 'dados')
+    dados = dados_dashboard_json(df_historico, gerado_em=gerado_em, saude=saude)
+    for caminho, conteudo in ((destino, html_casca), (caminho_dados, dados), (caminho_css, css)):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+    if os.path.abspath(caminho_script) != SCRIPT_DASHBOARD:
+        shutil.copyfile(SCRIPT_DASHBOARD, caminho_script)
+
+    if COMPRIMIR_DASHBOARD:
+        for caminho in (destino, caminho_dados, caminho_css, caminho_script):
+            gravar_comprimidos(caminho)
+
+
+# --- SNAPSHOT DAS ENTRADAS DO DASHBOARD ---
+
+def _frame_para_json(df):
+    return None if df is None else json.loads(df.to_json(orient='split', date_format='iso', double_precision=15))
+
+def _frame_de_json(dados):
+    return None if dados is None else pd.DataFrame(dados['data'], index=dados['index'], columns=dados['columns'])
+
+def snapshot_dashboard(previsao, mae, ultimo_valor_real, df_historico, melhor_comprador_atual, produto_mais_vendido_atual, melhor_comprador_ant, produto_mais_vendido_ant, ano_ant, ano_atual, cubo=None, leaderboard=None, df_previsoes_series=None, df_cenarios=None, comparativo_anual=None):
+    """Tudo o que montar_dashboard_ml recebe, como dict serializável em JSON."""
+    return {
+        'previsao': float(previsao), 'mae': float(mae), 'ultimo_valor_real': float(ultimo_valor_real),
+        'df_historico': _frame_para_json(df_historico),
+        'melhor_comprador_atual': melhor_comprador_atual, 'produto_mais_vendido_atual': produto_mais_vendido_atual,
+        'melhor_comprador_ant': melhor_comprador_ant, 'produto_mais_vendido_ant': produto_mais_vendido_ant,
+        'ano_ant': int(ano_ant), 'ano_atual': int(ano_atual),
+        'cubo': None if cubo is None else {
+            'colunas_faltantes': cubo.colunas_faltantes,
+            'marginais': {dimensao: _frame_para_json(serie.rename('receita').reset_index()) for dimensao, serie in cubo.marginais.items()},
+        },
+        'leaderboard': _frame_para_json(leaderboard),
+        'df_previsoes_series': _frame_para_json(df_previsoes_series),
+        'df_cenarios': _frame_para_json(df_cenarios),
+        'comparativo_anual': comparativo_anual,
+    }
+
+def gravar_snapshot_dashboard(*args, caminho=ARQUIVO_SNAPSHOT, **kwargs):
+    """Grava (atômico) o snapshot_dashboard das entradas, para regerar a página offline."""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(snapshot_dashboard(*args, **kwargs), f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def ler_snapshot_dashboard(caminho=ARQUIVO_SNAPSHOT):
+    """Lê o snapshot e devolve os argumentos de montar_dashboard_ml."""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    
+    snapshot['df_historico'] = _frame_de_json(snapshot['df_historico'])
+    snapshot['df_historico']['Mes_Ano'] = pd.to_datetime(snapshot['df_historico']['Mes_Ano'])
+    snapshot['leaderboard'] = _frame_de_json(snapshot['leaderboard'])
+    if snapshot['leaderboard'] is not None:
+        snapshot['leaderboard'].index.name = 'Modelo'
+    snapshot['df_previsoes_series'] = _frame_de_json(snapshot['df_previsoes_series'])
+    # Snapshots anteriores aos cenários não têm a chave
+    snapshot['df_cenarios'] = _frame_de_json(snapshot.get('df_cenarios'))
+    if snapshot['df_cenarios'] is not None:
+        snapshot['df_cenarios']['Mes_Ano'] = pd.to_datetime(snapshot['df_cenarios']['Mes_Ano'])
+    
+    if snapshot['cubo'] is not None:
+        marginais = {
+            dimensao: _frame_de_json(dados).set_index(NIVEIS_MARGINAL)['receita']
+            for dimensao, dados in snapshot['cubo']['marginais'].items()
+        }
+        snapshot['cubo'] = CuboVendas(marginais, colunas_faltantes=snapshot['cubo']['colunas_faltantes'])
+    return snapshot
+
+def renderizar_snapshot(caminho=ARQUIVO_SNAPSHOT, destino=None):
+    """Regera o dashboard a partir do último snapshot (sem planilha, sem gspread)."""
+    montar_dashboard_ml(**ler_snapshot_dashboard(caminho), destino=destino)
+
+
+# --- PAINEL CONSOLIDADO DAS LOJAS ---
+
+def historico_consolidado(historicos):
+    """Soma, mês a mês, os frames mensais (Total_Vendas, Total_Gastos, Lucro_Liquido) de várias lojas."""
+    colunas = ['Total_Vendas', 'Total_Gastos', 'Lucro_Liquido']
+    df = pd.concat([h[['Mes_Ano', *colunas]] for h in historicos], ignore_index=True)
+    return df.groupby('Mes_Ano')[colunas].sum().round(2).reset_index()
+
+def gerar_html_tabela_lojas(lojas):
+    """Uma linha por loja: situação da execução, lucro do último mês, previsão, MAE e modelo."""
+    linhas = ""
+    for loja in lojas:
+        snapshot = loja['snapshot']
+        situacao = html.escape(ROTULOS_SITUACAO.get(loja['situacao'], loja['situacao']))
+        if loja.get('erro'):
+            situacao += f"<br><small>{html.escape(str(loja['erro']))}</small>"
+        nome = html.escape(loja['nome'])
+        if loja.get('link'):
+            nome = f'<a href="{html.escape(loja["link"])}">{nome}</a>'
+        if snapshot is None:
+            linhas += f'<tr class="lucro-negativo-dark"><td>{nome}</td><td>{situacao}</td><td colspan="4">Sem dashboard gerado</td><td>{loja["segundos"]:.1f} s</td></tr>'
+            continue
+        modelo = snapshot['leaderboard'].index[0] if snapshot['leaderboard'] is not None else MODELO_BASELINE
+        classe = "lucro-positivo-dark" if snapshot['previsao'] >= 0 else "lucro-negativo-dark"
+        linhas += (
+            f'<tr class="{classe}"><td>{nome}</td><td>{situacao}</td><td>{format_brl(snapshot["ultimo_valor_real"])}</td>'
+            f'<td>{format_brl(snapshot["previsao"])}</td><td>{format_brl(snapshot["mae"])}</td><td>{modelo}</td><td>{loja["segundos"]:.1f} s</td></tr>'
+        )
+    return f"""
+    <table>
+        <thead><tr><th>Loja</th><th>Execução</th><th>Lucro Mês Passado</th><th>Previsão Próximo Mês</th><th>MAE</th><th>Modelo</th><th>Tempo</th></tr></thead>
+        <tbody>{linhas}</tbody>
+    </table>
+    """
+
+def gerar_html_ranking_lojas(lojas, ano_foco):
+    """Vendas, gastos e lucro de cada loja no ano, do maior para o menor lucro."""
+    totais = []
+    for loja in lojas:
+        if loja['snapshot'] is None:
+            continue
+        historico = loja['snapshot']['df_historico']
+        ano = historico[historico['Mes_Ano'].dt.year == ano_foco]
+        totais.append((loja['nome'], ano['Total_Vendas'].sum(), ano['Total_Gastos'].sum(), ano['Lucro_Liquido'].sum()))
+    
+    linhas = "".join(
+        f'<tr class="{"lucro-positivo-dark" if lucro >= 0 else "lucro-negativo-dark"}"><td>{html.escape(nome)}</td>'
+        f"<td>{format_brl(vendas)}</td><td>{format_brl(gastos)}</td><td>{format_brl(lucro)}</td></tr>"
+        for nome, vendas, gastos, lucro in sorted(totais, key=lambda t: t[3], reverse=True)
+    )
+    return f"""
+    <table>
+        <thead><tr><th>Loja</th><th>Vendas</th><th>Gastos</th><th>Lucro Líquido</th></tr></thead>
+        <tbody>{linhas or '<tr><td colspan="4">Sem dados</td></tr>'}</tbody>
+    </table>
+    """
+
+def montar_dashboard_lojas(lojas, destino=None):
+    """
+    Painel da rede a partir dos snapshots de cada loja. lojas: lista de dicts com nome, situacao,
+    erro, segundos, link (dashboard da loja) e snapshot (ler_snapshot_dashboard ou None).
+    Escreve em destino (caminho ou arquivo texto aberto; padrão OUTPUT_HTML_LOJAS).
+    """
+    com_dados = [loja for loja in lojas if loja['snapshot'] is not None]
+    falhas = sum(loja['situacao'] == 'falha' for loja in lojas)
+    previsao_rede = sum(loja['snapshot']['previsao'] for loja in com_dados)
+    cor = "#006400" if previsao_rede >= 0 else "#9c0000"
+    
+    if com_dados:
+        ano_atual = max(loja['snapshot']['ano_atual'] for loja in com_dados)
+        df_rede = historico_consolidado([loja['snapshot']['df_historico'] for loja in com_dados])
+        html_rede = f"""
+            <h2>📈 Balanço Mensal da Rede ({ano_atual})</h2>
+            {gerar_html_balanco_grafico(df_rede[df_rede['Mes_Ano'].dt.year == ano_atual], f"o Ano de {ano_atual}")}
+            
+            <h2>🏆 Lucro por Loja ({ano_atual})</h2>
+            {gerar_html_ranking_lojas(com_dados, ano_atual)}
+        """
+    else:
+        html_rede = "<p>Nenhuma loja gerou dashboard ainda.</p>"
+    
+    aviso_falhas = f'<p style="color: #ffbaba; font-weight: bold;">🚨 {falhas} loja(s) falharam nesta execução: os números delas são do último dashboard gerado (se houver).</p>' if falhas else ""
+    
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Dashboard ML Insights - Painel Consolidado das Lojas</title>
+         {estilos_css(cor)}
+    </head>
+    <body>
+        <div class="container">
+            <h2>🏬 Painel Consolidado das Lojas</h2>
+            <p>{len(lojas)} loja(s), {len(com_dados)} com dashboard. Data: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}.</p>
+            {aviso_falhas}
+            
+            <div class="metric-box">
+                <h3>Lucro Líquido Projetado da Rede para o Próximo Mês</h3>
+                <p>{format_brl(previsao_rede)}</p>
+            </div>
+            
+            <h3>Lojas</h3>
+            {gerar_html_tabela_lojas(lojas)}
+            
+            {html_rede}
+        </div>
+    </body>
+    </html>
+    """
+    
+    destino = OUTPUT_HTML_LOJAS if destino is None else destino
+    if isinstance(destino, str):
+        with open(destino, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+    else:
+        destino.write(html_content)
@@ -0,0 +1,256 @@
+import os
+import re
+import csv
+import sqlite3
+
+import pandas as pd
+from gspread.exceptions import APIError, SpreadsheetNotFound
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+# --- FONTES DE DADOS OFFLINE (SEM GOOGLE SHEETS) ---
+# Implementam o mesmo pedaço da API de Spreadsheet que acesso_planilhas usa (values_batch_get,
+# values_append, values_clear, add_worksheet, id), então o resto do código não muda.
+# Cada planilha é uma pasta (CSV/Parquet: um arquivo por aba) ou um banco SQLite (uma tabela por aba).
+FORMATOS_ARQUIVO = ('csv', 'parquet', 'sqlite')
+
+# Intervalo em notação A1 gerado por gspread.utils.absolute_range_name: 'ABA'!A1:ZZ10
+PADRAO_INTERVALO = re.compile(r"^'(?P<aba>(?:[^']|'')+)'(?:!(?P<col_ini>[A-Z]+)(?P<lin_ini>\d*)(?::(?P<col_fim>[A-Z]+)(?P<lin_fim>\d*))?)?$")
+# --------------------------------------------------------------------------------
+
+
+class _RespostaErro:
+    """Resposta HTTP mínima para construir um APIError igual ao da API real."""
+
+    def __init__(self, codigo, mensagem):
+        self.status_code = codigo
+        self.text = mensagem
+
+    def json(self):
+        return {'error': {'code': self.status_code, 'message': self.text, 'status': 'INVALID_ARGUMENT'}}
+
+
+def _coluna_para_indice(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - ord('A') + 1
+    return indice - 1
+
+
+def _aparar_linha(linha):
+    """A API omite as células vazias no fim de cada linha."""
+    fim = len(linha)
+    while fim and linha[fim - 1] in ('', None):
+        fim -= 1
+    return linha[:fim]
+
+
+class PlanilhaMemoria:
+    """Planilha em memória: {aba: lista de linhas}. Base das fontes offline e dos benchmarks."""
+
+    def __init__(self, sheet_id, abas=None):
+        self.id = sheet_id
+        self.abas = {aba: [list(linha) for linha in linhas] for aba, linhas in (abas or {}).items()}
+
+    # --- Persistência (as fontes em arquivo sobrescrevem) ---
+    def _persistir_anexo(self, aba, linhas):
+        pass
+
+    def _persistir_aba(self, aba):
+        pass
+
+    # --- Notação A1 ---
+    def _resolver(self, intervalo_a1):
+        """Retorna (aba, linha_ini, linha_fim, col_ini, col_fim) com fins exclusivos."""
+        encontrado = PADRAO_INTERVALO.match(intervalo_a1)
+        aba = encontrado.group('aba').replace("''", "'") if encontrado else None
+        if aba not in self.abas:
+            raise APIError(_RespostaErro(400, f"Unable to parse range: {intervalo_a1}"))
+
+        if not encontrado.group('col_ini'):
+            return aba, 0, None, 0, None
+
+        linha_ini = int(encontrado.group('lin_ini') or 1) - 1
+        col_ini = _coluna_para_indice(encontrado.group('col_ini'))
+        if encontrado.group('col_fim') is None:
+            return aba, linha_ini, linha_ini + 1, col_ini, col_ini + 1
+
+        linha_fim = int(encontrado.group('lin_fim')) if encontrado.group('lin_fim') else None
+        return aba, linha_ini, linha_fim, col_ini, _coluna_para_indice(encontrado.group('col_fim')) + 1
+
+    # --- API usada por acesso_planilhas ---
+    def values_batch_get(self, ranges, params=None):
+        formatado = (params or {}).get('valueRenderOption', 'FORMATTED_VALUE') != 'UNFORMATTED_VALUE'
+        faixas = []
+        for intervalo_a1 in ranges:
+            aba, linha_ini, linha_fim, col_ini, col_fim = self._resolver(intervalo_a1)
+            valores = [_aparar_linha(linha[col_ini:col_fim]) for linha in self.abas[aba][linha_ini:linha_fim]]
+            if formatado:
+                valores = [[c if isinstance(c, str) else str(c) for c in linha] for linha in valores]
+            while valores and not valores[-1]:
+                valores.pop()
+            faixas.append({'range': intervalo_a1, 'values': valores} if valores else {'range': intervalo_a1})
+        return {'spreadsheetId': self.id, 'valueRanges': faixas}
+
+    def values_append(self, range, params=None, body=None):
+        aba = self._resolver(range)[0]
+        linhas = [list(linha) for linha in (body or {}).get('values', [])]
+        inicio = len(self.abas[aba]) + 1
+        self.abas[aba].extend(linhas)
+        self._persistir_anexo(aba, linhas)
+        # Como a API real: updatedRange diz onde as linhas foram parar
+        largura = max((len(linha) for linha in linhas), default=1) or 1
+        faixa = absolute_range_name(aba, f"A{inicio}:{rowcol_to_a1(inicio + max(len(linhas), 1) - 1, largura)}")
+        return {'spreadsheetId': self.id, 'updates': {'updatedRange': faixa, 'updatedRows': len(linhas)}}
+
+    def values_clear(self, range):
+        aba = self._resolver(range)[0]
+        self.abas[aba] = []
+        self._persistir_aba(aba)
+        return {'spreadsheetId': self.id, 'clearedRange': range}
+
+    def add_worksheet(self, title, rows=1000, cols=26, index=None):
+        if title in self.abas:
+            raise APIError(_RespostaErro(400, f'A sheet with the name "{title}" already exists.'))
+        self.abas[title] = []
+        self._persistir_aba(title)
+
+
+class PlanilhaCSV(PlanilhaMemoria):
+    """Uma pasta por planilha, um CSV por aba (todas as células como texto)."""
+
+    def __init__(self, diretorio, sheet_id):
+        self.pasta = os.path.join(diretorio, sheet_id)
+        abas = {}
+        if os.path.isdir(self.pasta):
+            for nome in sorted(os.listdir(self.pasta)):
+                if nome.endswith('.csv'):
+                    with open(os.path.join(self.pasta, nome), newline='', encoding='utf-8') as f:
+                        abas[nome[:-len('.csv')]] = list(csv.reader(f))
+        super().__init__(sheet_id, abas)
+
+    def _caminho(self, aba):
+        return os.path.join(self.pasta, f"{aba}.csv")
+
+    def _persistir_anexo(self, aba, linhas):
+        # CSV aceita anexar no fim do arquivo sem reescrever a aba
+        with open(self._caminho(aba), 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(linhas)
+
+    def _persistir_aba(self, aba):
+        os.makedirs(self.pasta, exist_ok=True)
+        with open(self._caminho(aba), 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(self.abas[aba])
+
+
+class PlanilhaParquet(PlanilhaMemoria):
+    """Uma pasta por planilha, um Parquet por aba: a primeira linha da aba vira o nome das colunas."""
+
+    def __init__(self, diretorio, sheet_id):
+        self.pasta = os.path.join(diretorio, sheet_id)
+        abas = {}
+        if os.path.isdir(self.pasta):
+            for nome in sorted(os.listdir(self.pasta)):
+                if nome.endswith('.parquet'):
+                    df = pd.read_parquet(os.path.join(self.pasta, nome))
+                    abas[nome[:-len('.parquet')]] = [list(df.columns)] + df.fillna('').astype(str).to_numpy().tolist() if len(df.columns) else []
+        super().__init__(sheet_id, abas)
+
+    def _persistir_anexo(self, aba, linhas):
+        # Parquet não anexa no lugar: regrava a aba (use CSV/SQLite para escrita intensiva)
+        self._persistir_aba(aba)
+
+    def _persistir_aba(self, aba):
+        os.makedirs(self.pasta, exist_ok=True)
+        linhas = self.abas[aba]
+        cabecalho = [str(c) for c in linhas[0]] if linhas else []
+        largura = len(cabecalho)
+        dados = [[str(c) for c in (list(linha) + [''] * largura)[:largura]] for linha in linhas[1:]]
+        pd.DataFrame(dados, columns=cabecalho, dtype=str).to_parquet(os.path.join(self.pasta, f"{aba}.parquet"), index=False)
+
+
+class PlanilhaSQLite(PlanilhaMemoria):
+    """Um banco SQLite por planilha, uma tabela por aba (colunas c0..cN, a primeira linha é o cabeçalho)."""
+
+    def __init__(self, diretorio, sheet_id):
+        os.makedirs(diretorio, exist_ok=True)
+        # Aberta na thread de abrir_planilhas e usada na principal (uma escrita por vez)
+        self.conexao = sqlite3.connect(os.path.join(diretorio, f"{sheet_id}.sqlite"), check_same_thread=False)
+        abas = {}
+        tabelas = self.conexao.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        for (tabela,) in tabelas:
+            abas[tabela] = [list(linha) for linha in self.conexao.execute(f'SELECT * FROM "{tabela}" ORDER BY rowid')]
+        self.larguras = {aba: len(linhas[0]) if linhas else 0 for aba, linhas in abas.items()}
+        super().__init__(sheet_id, abas)
+
+    def _criar_tabela(self, aba, largura):
+        colunas = ", ".join(f'c{i} TEXT' for i in range(max(largura, 1)))
+        self.conexao.execute(f'DROP TABLE IF EXISTS "{aba}"')
+        self.conexao.execute(f'CREATE TABLE "{aba}" ({colunas})')
+        self.larguras[aba] = max(largura, 1)
+
+    def _inserir(self, aba, linhas):
+        largura = self.larguras[aba]
+        marcadores = ", ".join('?' * largura)
+        self.conexao.executemany(
+            f'INSERT INTO "{aba}" VALUES ({marcadores})',
+            ([str(c) for c in (list(linha) + [''] * largura)[:largura]] for linha in linhas),
+        )
+
+    def _persistir_anexo(self, aba, linhas):
+        largura = max((len(linha) for linha in linhas), default=0)
+        if largura > self.larguras.get(aba, 0):
+            # Linha mais larga que a tabela: recria com todas as linhas da aba
+            self._persistir_aba(aba)
+            return
+        self._inserir(aba, linhas)
+        self.conexao.commit()
+
+    def _persistir_aba(self, aba):
+        linhas = self.abas[aba]
+        self._criar_tabela(aba, max((len(linha) for linha in linhas), default=0))
+        self._inserir(aba, linhas)
+        self.conexao.commit()
+
+
+CLASSES_POR_FORMATO = {'csv': PlanilhaCSV, 'parquet': PlanilhaParquet, 'sqlite': PlanilhaSQLite}
+
+
+class ClienteMemoria:
+    """Substituto do gspread.Client: open_by_key devolve a planilha registrada com aquele ID."""
+
+    def __init__(self, planilhas=None):
+        self.planilhas = {planilha.id: planilha for planilha in (planilhas or [])}
+
+    def open_by_key(self, key):
+        if key not in self.planilhas:
+            raise SpreadsheetNotFound(key)
+        return self.planilhas[key]
+
+
+class ClienteArquivos:
+    """Cliente para planilhas gravadas em disco (CSV, Parquet ou SQLite) dentro de um diretório."""
+
+    def __init__(self, diretorio, formato):
+        if formato not in CLASSES_POR_FORMATO:
+            raise ValueError(f"Formato '{formato}' desconhecido. Use um de: {FORMATOS_ARQUIVO}.")
+        self.diretorio = diretorio
+        self.classe_planilha = CLASSES_POR_FORMATO[formato]
+
+    def open_by_key(self, key):
+        return self.classe_planilha(self.diretorio, key)
+
+
+def criar_cliente(fonte, diretorio):
+    """Cliente para a fonte configurada em FONTE_DADOS (exceto 'gspread', que é o padrão)."""
+    if fonte == 'memoria':
+        return ClienteMemoria()
+    return ClienteArquivos(diretorio, fonte)
+
+
+def exportar_planilha(planilha, diretorio, formato):
+    """Copia todas as abas de uma planilha (em memória) para o formato em disco. Útil para montar fixtures."""
+    destino = CLASSES_POR_FORMATO[formato](diretorio, planilha.id)
+    for aba, linhas in planilha.abas.items():
+        destino.abas[aba] = [list(linha) for linha in linhas]
+        destino._persistir_aba(aba)
+    return destino
@@ -0,0 +1,307 @@
+import os
+from datetime import date
+
+import numpy as np
+
+from cache_local import DIRETORIO_ESTADO
+from parsing_brl import (
+    parsear_tabela, selecionar_colunas, ABA_VENDAS, COLUNA_VALOR_VENDA, COLUNA_VALOR_GASTO, COLUNA_ITEM_VENDIDO, COLUNA_DATA,
+)
+from renderizacao import format_brl
+
+# --- ÍNDICE DIÁRIO DE SOMAS ACUMULADAS (CONSULTAS DE PERÍODO EM O(1)) ---
+# Vendas, gastos e receita por sabor somados por dia e acumulados em arrays contíguos (centavos,
+# int64, com um zero na frente): o total de qualquer período [inicio, fim] é C[fim + 1] - C[inicio].
+# Construído na carga das abas brutas e atualizado pelo backup a cada lote anexado; fica no diretório
+# de estado (comitado pelos workflows). 'python cli.py consulta' confere com o resumo mensal e lê o .npz.
+VERSAO_INDICE_DIARIO = 1
+
+# Janela recente do comparativo com o ano anterior no dashboard (além do acumulado do ano)
+DIAS_COMPARATIVO_RECENTE = int(os.environ.get('INDICE_DIAS_RECENTES', '90'))
+# --------------------------------------------------------------------------------
+
+
+def caminho_indice_diario(sheet_id):
+    return os.path.join(DIRETORIO_ESTADO, f"{sheet_id}__INDICE_DIARIO.npz")
+
+
+def _dia(valor):
+    """date, 'AAAA-MM-DD', datetime/Timestamp ou datetime64 -> numpy.datetime64 do dia."""
+    return np.datetime64(valor, 'D') if not isinstance(valor, str) else np.datetime64(valor[:10], 'D')
+
+
+def _somas_por_dia(dias, centavos, inicio, qtd_dias):
+    """Soma dos centavos de cada dia (0 nos dias sem lançamento). Exata: parciais inteiras abaixo de 2^53."""
+    posicoes = (dias - inicio).astype('int64')
+    return np.bincount(posicoes, weights=centavos, minlength=qtd_dias).round().astype('int64')
+
+
+def _acumular(somas_diarias):
+    """Soma acumulada ao longo dos dias com uma linha de zeros na frente (eixo 0)."""
+    zeros = np.zeros((1, *somas_diarias.shape[1:]), dtype='int64')
+    return np.ascontiguousarray(np.concatenate([zeros, np.cumsum(somas_diarias, axis=0)]))
+
+
+def _em_reais(vendas, gastos):
+    """Totais em centavos -> dict em R$ (lucro subtraído ainda em centavos)."""
+    return {'Total_Vendas': vendas / 100, 'Total_Gastos': gastos / 100, 'Lucro_Liquido': (vendas - gastos) / 100}
+
+
+def mesmo_periodo_ano_anterior(inicio, fim):
+    """O período deslocado um ano para trás (29/02 vira 28/02)."""
+    def ano_antes(dia):
+        dia = dia.astype(date)
+        try:
+            return np.datetime64(dia.replace(year=dia.year - 1), 'D')
+        except ValueError:
+            return np.datetime64(dia.replace(year=dia.year - 1, day=28), 'D')
+    return ano_antes(_dia(inicio)), ano_antes(_dia(fim))
+
+
+class IndiceDiario:
+    """Somas acumuladas diárias de vendas, gastos e receita por sabor, do dia `inicio` em diante."""
+
+    def __init__(self, inicio, vendas, gastos, sabores=None, nomes_sabores=()):
+        self.inicio = _dia(inicio)
+        self.vendas = vendas          # (dias + 1,) centavos acumulados
+        self.gastos = gastos          # (dias + 1,)
+        self.sabores = sabores        # (dias + 1, sabores) ou None sem a coluna de sabor
+        self.nomes_sabores = list(nomes_sabores)
+
+    @property
+    def qtd_dias(self):
+        return len(self.vendas) - 1
+
+    @property
+    def fim(self):
+        return self.inicio + np.timedelta64(self.qtd_dias - 1, 'D')
+
+    @classmethod
+    def de_frames(cls, df_vendas, df_gastos, coluna_sabor=None):
+        """
+        Monta o índice a partir dos frames tratados da carga (Vendas_Centavos / Gastos_Centavos e
+        Data_Datetime; coluna_sabor categórica). Uma passada (bincount) por série, sem groupby.
+        """
+        dias_vendas = df_vendas['Data_Datetime'].to_numpy().astype('datetime64[D]')
+        dias_gastos = df_gastos['Data_Datetime'].to_numpy().astype('datetime64[D]')
+        todos = np.concatenate([dias_vendas, dias_gastos])
+        if not len(todos):
+            raise ValueError("Sem lançamentos para montar o índice diário.")
+        inicio, fim = todos.min(), todos.max()
+        qtd_dias = int((fim - inicio).astype('int64')) + 1
+
+        centavos_vendas = df_vendas['Vendas_Centavos'].to_numpy()
+        vendas = _acumular(_somas_por_dia(dias_vendas, centavos_vendas, inicio, qtd_dias))
+        gastos = _acumular(_somas_por_dia(dias_gastos, df_gastos['Gastos_Centavos'].to_numpy(), inicio, qtd_dias))
+
+        sabores, nomes_sabores = None, ()
+        if coluna_sabor is not None and coluna_sabor in df_vendas.columns:
+            categorias = df_vendas[coluna_sabor].astype('category').cat
+            codigos = categorias.codes.to_numpy().astype('int64')
+            validos = codigos >= 0
+            qtd_sabores = len(categorias.categories)
+            # Dia e sabor numa posição só: uma bincount devolve a matriz (dias x sabores) inteira
+            posicoes = (dias_vendas[validos] - inicio).astype('int64') * qtd_sabores + codigos[validos]
+            somas = np.bincount(posicoes, weights=centavos_vendas[validos], minlength=qtd_dias * qtd_sabores)
+            sabores = _acumular(somas.round().astype('int64').reshape(qtd_dias, qtd_sabores))
+            nomes_sabores = [str(nome) for nome in categorias.categories]
+
+        return cls(inicio, vendas, gastos, sabores, nomes_sabores)
+
+    def _estender(self, inicio, fim):
+        """Amplia o índice para cobrir [inicio, fim]: zeros antes do início, o último acumulado repetido depois do fim."""
+        antes = max(int((self.inicio - inicio).astype('int64')), 0)
+        depois = max(int((fim - self.fim).astype('int64')), 0)
+        if not antes and not depois:
+            return
+
+        def estendido(acumulados):
+            zeros = np.zeros((antes, *acumulados.shape[1:]), dtype='int64')
+            repetidos = np.repeat(acumulados[-1:], depois, axis=0)
+            return np.ascontiguousarray(np.concatenate([zeros, acumulados, repetidos]))
+
+        self.vendas, self.gastos = estendido(self.vendas), estendido(self.gastos)
+        if self.sabores is not None:
+            self.sabores = estendido(self.sabores)
+        self.inicio = self.inicio - np.timedelta64(antes, 'D')
+
+    def adicionar_linhas(self, cabecalho, linhas, aba_nome):
+        """
+        Soma ao índice as linhas brutas recém-anexadas a uma aba do Histórico (backup, lote a lote), com o
+        mesmo tratamento da carga: linhas com valor ou data inválidos ficam de fora. Sabores novos ganham coluna.
+        """
+        vendas = aba_nome == ABA_VENDAS
+        coluna_valor = COLUNA_VALOR_VENDA if vendas else COLUNA_VALOR_GASTO
+        categoricas = (COLUNA_ITEM_VENDIDO,) if vendas and self.sabores is not None else ()
+        df = selecionar_colunas(cabecalho, linhas, [coluna_valor, COLUNA_DATA, *categoricas])
+        df_validos, _ = parsear_tabela(df, coluna_valor, COLUNA_DATA, 'Indice', categoricas)
+        if df_validos.empty:
+            return
+
+        dias = df_validos['Data_Datetime'].to_numpy().astype('datetime64[D]')
+        self._estender(dias.min(), dias.max())
+        centavos = df_validos['Indice_Centavos'].to_numpy()
+        somas = _acumular(_somas_por_dia(dias, centavos, self.inicio, self.qtd_dias))
+        if vendas:
+            self.vendas = self.vendas + somas
+        else:
+            self.gastos = self.gastos + somas
+
+        if categoricas and COLUNA_ITEM_VENDIDO in df_validos.columns:
+            categorias = df_validos[COLUNA_ITEM_VENDIDO].cat
+            nomes = [str(nome) for nome in categorias.categories]
+            novos = [nome for nome in dict.fromkeys(nomes) if nome not in self.nomes_sabores]
+            if novos:
+                self.sabores = np.concatenate([self.sabores, np.zeros((len(self.sabores), len(novos)), dtype='int64')], axis=1)
+                self.nomes_sabores += novos
+            colunas = {nome: i for i, nome in enumerate(self.nomes_sabores)}
+            mapa = np.array([colunas[nome] for nome in nomes], dtype='int64')
+            codigos = categorias.codes.to_numpy().astype('int64')
+            validos = codigos >= 0
+            qtd_sabores = len(self.nomes_sabores)
+            posicoes = (dias[validos] - self.inicio).astype('int64') * qtd_sabores + mapa[codigos[validos]]
+            diarias = np.bincount(posicoes, weights=centavos[validos], minlength=self.qtd_dias * qtd_sabores)
+            self.sabores = self.sabores + _acumular(diarias.round().astype('int64').reshape(self.qtd_dias, qtd_sabores))
+
+    # --- CONSULTAS (duas leituras por série, qualquer tamanho de período) ---
+
+    def _posicoes(self, inicio, fim):
+        """Posições [a, b) nos acumulados para o período [inicio, fim] (datas fora do índice são cortadas)."""
+        a = int((_dia(inicio) - self.inicio).astype('int64'))
+        b = int((_dia(fim) - self.inicio).astype('int64')) + 1
+        a, b = min(max(a, 0), self.qtd_dias), min(max(b, 0), self.qtd_dias)
+        return a, max(a, b)
+
+    def centavos(self, inicio, fim):
+        """(vendas, gastos) do período em centavos, datas inclusivas."""
+        a, b = self._posicoes(inicio, fim)
+        return int(self.vendas[b] - self.vendas[a]), int(self.gastos[b] - self.gastos[a])
+
+    def totais(self, inicio, fim):
+        """Total_Vendas, Total_Gastos e Lucro_Liquido (R$) do período, datas inclusivas."""
+        return _em_reais(*self.centavos(inicio, fim))
+
+    def receita_sabores(self, inicio, fim, n=None):
+        """[(sabor, receita R$)] do período, da maior para a menor receita (top n)."""
+        if self.sabores is None:
+            return []
+        a, b = self._posicoes(inicio, fim)
+        receitas = self.sabores[b] - self.sabores[a]
+        ordem = np.argsort(-receitas, kind='stable')[:n]
+        return [(self.nomes_sabores[i], receitas[i] / 100) for i in ordem if receitas[i] != 0]
+
+    def comparar_ano_anterior(self, inicio, fim):
+        """Totais do período e do mesmo período um ano antes, com a variação de cada total."""
+        inicio, fim = _dia(inicio), _dia(fim)
+        inicio_ant, fim_ant = mesmo_periodo_ano_anterior(inicio, fim)
+        (vendas, gastos), (vendas_ant, gastos_ant) = self.centavos(inicio, fim), self.centavos(inicio_ant, fim_ant)
+        return {
+            'inicio': str(inicio), 'fim': str(fim), 'inicio_anterior': str(inicio_ant), 'fim_anterior': str(fim_ant),
+            'atual': _em_reais(vendas, gastos), 'anterior': _em_reais(vendas_ant, gastos_ant),
+            'variacao': _em_reais(vendas - vendas_ant, gastos - gastos_ant),
+        }
+
+    def ultimos_dias(self, qtd_dias, referencia=None):
+        """(inicio, fim) dos últimos qtd_dias até referencia (padrão: o último dia do índice)."""
+        fim = self.fim if referencia is None else _dia(referencia)
+        return fim - np.timedelta64(qtd_dias - 1, 'D'), fim
+
+    def acumulado_do_ano(self, referencia=None):
+        """(inicio, fim) de 1º de janeiro até referencia (padrão: o último dia do índice)."""
+        fim = self.fim if referencia is None else _dia(referencia)
+        return np.datetime64(f"{fim.astype(date).year}-01-01", 'D'), fim
+
+    def confere_com_mensal(self, df_mensal):
+        """
+        True se os totais de cada mês do frame mensal (Total_Vendas, Total_Gastos, Mes_Ano) batem até o
+        centavo com o índice: um índice salvo antes de novos lançamentos não passa. Meses inteiros antes
+        do início do índice não contam (histórico importado de CSV, que não está nas abas brutas).
+        """
+        primeiro_mes = self.inicio.astype('datetime64[M]')
+        for mes in df_mensal[['Mes_Ano', 'Total_Vendas', 'Total_Gastos']].itertuples(index=False):
+            mes_numpy = _dia(mes.Mes_Ano).astype('datetime64[M]')
+            if mes_numpy < primeiro_mes:
+                continue
+            inicio, fim = mes_numpy.astype('datetime64[D]'), (mes_numpy + 1).astype('datetime64[D]') - 1
+            if self.centavos(inicio, fim) != (round(mes.Total_Vendas * 100), round(mes.Total_Gastos * 100)):
+                return False
+        return True
+
+    # --- PERSISTÊNCIA ---
+
+    def salvar(self, caminho):
+        """Grava o índice (.npz comprimido: comitado em estado/ a cada execução; dias sem venda viram zeros), de forma atômica."""
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        temporario = f"{caminho}.tmp.npz"
+        arrays = {'versao': np.array(VERSAO_INDICE_DIARIO), 'inicio': np.array(self.inicio), 'vendas': self.vendas, 'gastos': self.gastos}
+        if self.sabores is not None:
+            arrays.update(sabores=self.sabores, nomes_sabores=np.array(self.nomes_sabores, dtype=str))
+        np.savez_compressed(temporario, **arrays)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Lê o índice salvo. None se não existir ou for de outra versão (precisa ser reconstruído)."""
+        if not os.path.exists(caminho):
+            return None
+        with np.load(caminho) as dados:
+            if int(dados['versao']) != VERSAO_INDICE_DIARIO:
+                return None
+            sabores = dados['sabores'] if 'sabores' in dados else None
+            nomes = dados['nomes_sabores'].tolist() if 'nomes_sabores' in dados else ()
+            return cls(dados['inicio'], dados['vendas'], dados['gastos'], sabores, nomes)
+
+
+def comparativos_anuais(indice, dias_recentes=DIAS_COMPARATIVO_RECENTE):
+    """
+    Comparações com o ano anterior do dashboard: acumulado do ano e últimos dias_recentes dias, cada
+    um contra a mesma janela um ano antes. Lista de dicts serializáveis (vai também para o snapshot).
+    """
+    return [
+        {'rotulo': 'Acumulado do Ano', **indice.comparar_ano_anterior(*indice.acumulado_do_ano())},
+        {'rotulo': f'Últimos {dias_recentes} Dias', **indice.comparar_ano_anterior(*indice.ultimos_dias(dias_recentes))},
+    ]
+
+
+def imprimir_totais(titulo, totais):
+    print(f"{titulo}")
+    for coluna, rotulo in (('Total_Vendas', 'Vendas'), ('Total_Gastos', 'Gastos'), ('Lucro_Liquido', 'Lucro Líquido')):
+        print(f"  {rotulo:<14} {format_brl(totais[coluna]):>18}")
+
+
+def main(sheet_id, de=None, ate=None, ultimos=None, comparar=False, sabores=0):
+    """
+    Consulta de período no índice salvo (comando 'consulta' do cli.py): totais, opcionalmente contra
+    o mesmo período do ano anterior e com os sabores de maior receita. Padrão: acumulado do ano.
+    Retorna o código de saída.
+    """
+    caminho = caminho_indice_diario(sheet_id)
+    indice = IndiceDiario.carregar(caminho)
+    if indice is None:
+        print(f"Índice diário '{caminho}' não encontrado. Rode 'python cli.py predict' (abas brutas) ou 'consulta --recarregar'.")
+        return 1
+
+    if ultimos:
+        inicio, fim = indice.ultimos_dias(ultimos, ate)
+    elif de or ate:
+        inicio, fim = _dia(de) if de else indice.inicio, _dia(ate) if ate else indice.fim
+    else:
+        inicio, fim = indice.acumulado_do_ano()
+    if fim < inicio:
+        print(f"Período inválido: {inicio} a {fim}.")
+        return 1
+
+    print(f"Índice diário: {indice.inicio} a {indice.fim} ({indice.qtd_dias} dias).\n")
+    if comparar:
+        comparativo = indice.comparar_ano_anterior(inicio, fim)
+        imprimir_totais(f"{inicio} a {fim}", comparativo['atual'])
+        imprimir_totais(f"{comparativo['inicio_anterior']} a {comparativo['fim_anterior']} (ano anterior)", comparativo['anterior'])
+        imprimir_totais("Variação", comparativo['variacao'])
+    else:
+        imprimir_totais(f"{inicio} a {fim}", indice.totais(inicio, fim))
+
+    if sabores:
+        print(f"\nSabores de maior receita ({inicio} a {fim}):")
+        for sabor, receita in indice.receita_sabores(inicio, fim, sabores):
+            print(f"  {sabor:<30} {format_brl(receita):>18}")
+    return 0
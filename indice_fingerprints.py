@@ -0,0 +1,115 @@
+import os
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from cache_local import DIRETORIO_CACHE
+
+# --- ÍNDICE LOCAL DE FINGERPRINTS (ANTI-DUPLICAÇÃO DO BACKUP) ---
+# Um array ordenado de hashes de 64 bits por aba de destino: busca binária em O(log n) por linha
+# nova, sem precisar reler o Histórico inteiro a cada execução. Fica no cache local, fora do git:
+# são 8 bytes aleatórios (incompressíveis) por linha do Histórico, regravados todo mês. O workflow
+# mantém o cache vivo (manter_cache.yml); sem ele, o backup reconstrói o índice lendo o Histórico.
+SEPARADOR_CELULAS = '\x1f'
+SEPARADOR_OCORRENCIA = '\x1e'
+# --------------------------------------------------------------------------------
+
+
+def _caminho_indice(sheet_id, aba_nome):
+    return os.path.join(DIRETORIO_CACHE, f"fingerprints__{sheet_id}__{aba_nome}.npy")
+
+
+def _conteudo_linha(linha):
+    """Conteúdo normalizado da linha: a API omite células vazias no fim, então elas não contam."""
+    celulas = [str(c) for c in linha]
+    while celulas and celulas[-1] == '':
+        celulas.pop()
+    return SEPARADOR_CELULAS.join(celulas)
+
+
+def _fingerprint(conteudo, ocorrencia):
+    chave = f"{conteudo}{SEPARADOR_OCORRENCIA}{ocorrencia}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(chave, digest_size=8).digest(), 'little')
+
+
+def fingerprints_linhas(linhas, ocorrencias=None):
+    """
+    Fingerprint de 64 bits por linha (conteúdo + nº da ocorrência daquele conteúdo).
+    A ocorrência preserva linhas idênticas legítimas (duas vendas iguais no mesmo segundo)
+    sem confundi-las com reenvio. Passe o MESMO Counter em todas as páginas e lotes da cópia
+    de uma aba: recomeçar do zero no meio numeraria de novo linhas iguais já vistas.
+    """
+    ocorrencias = Counter() if ocorrencias is None else ocorrencias
+    resultado = np.empty(len(linhas), dtype=np.uint64)
+
+    for i, linha in enumerate(linhas):
+        conteudo = _conteudo_linha(linha)
+        resultado[i] = _fingerprint(conteudo, ocorrencias[conteudo])
+        ocorrencias[conteudo] += 1
+
+    return resultado
+
+
+class IndiceFingerprints:
+    """Conjunto ordenado de fingerprints das linhas já gravadas em uma aba de destino."""
+
+    def __init__(self, sheet_id, aba_nome, fingerprints=None):
+        self.sheet_id = sheet_id
+        self.aba_nome = aba_nome
+        self.fingerprints = np.unique(fingerprints) if fingerprints is not None else np.array([], dtype=np.uint64)
+
+    @classmethod
+    def carregar(cls, sheet_id, aba_nome):
+        """Lê o índice salvo. Retorna None se ainda não existir (precisa ser construído)."""
+        caminho = _caminho_indice(sheet_id, aba_nome)
+        if not os.path.exists(caminho):
+            return None
+        indice = cls(sheet_id, aba_nome)
+        indice.fingerprints = np.load(caminho)
+        return indice
+
+    @classmethod
+    def construir(cls, sheet_id, aba_nome, linhas_historico):
+        """Constrói o índice a partir das linhas de dados do Histórico (varredura única)."""
+        return cls(sheet_id, aba_nome, fingerprints_linhas(linhas_historico))
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def contem(self, fingerprints):
+        """Máscara booleana: quais fingerprints já estão no índice (busca binária vetorizada)."""
+        if not len(self.fingerprints):
+            return np.zeros(len(fingerprints), dtype=bool)
+        posicoes = np.searchsorted(self.fingerprints, fingerprints)
+        posicoes = np.minimum(posicoes, len(self.fingerprints) - 1)
+        return self.fingerprints[posicoes] == fingerprints
+
+    def semear_ocorrencias(self, linhas, ocorrencias):
+        """
+        Para linhas sabidamente novas (depois do trecho já confirmado no checkpoint): cada conteúdo
+        ainda fora de `ocorrencias` passa a contar a partir das cópias que o Histórico já tem
+        (sonda as ocorrências 0, 1, 2... no índice até a primeira ausente, todos os conteúdos de uma vez).
+        Assim os fingerprints gravados são os mesmos que construir() calcularia relendo o Histórico.
+        """
+        conteudos = list(dict.fromkeys(c for c in map(_conteudo_linha, linhas) if c not in ocorrencias))
+        ocorrencia = 0
+        while conteudos:
+            presentes = self.contem(np.array([_fingerprint(c, ocorrencia) for c in conteudos], dtype=np.uint64))
+            for conteudo in (c for c, presente in zip(conteudos, presentes) if not presente):
+                ocorrencias[conteudo] = ocorrencia
+            conteudos = [c for c, presente in zip(conteudos, presentes) if presente]
+            ocorrencia += 1
+        return ocorrencias
+
+    def adicionar(self, fingerprints):
+        """Inclui novos fingerprints mantendo o array ordenado e sem repetição."""
+        self.fingerprints = np.union1d(self.fingerprints, np.asarray(fingerprints, dtype=np.uint64))
+
+    def salvar(self):
+        """Grava o índice de forma atômica (arquivo temporário + replace)."""
+        caminho = _caminho_indice(self.sheet_id, self.aba_nome)
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        temporario = f"{caminho}.tmp.npy"
+        np.save(temporario, self.fingerprints)
+        os.replace(temporario, caminho)
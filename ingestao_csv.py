@@ -0,0 +1,122 @@
+import os
+import csv
+import time
+
+import pandas as pd
+
+from acesso_planilhas import autenticar_gspread, abrir_planilha, com_retentativa, sobrescrever_aba
+from cache_local import DIRETORIO_CACHE
+from parsing_brl import ABA_VENDAS, ABA_GASTOS, COLUNA_DATA
+from resumo_mensal import (
+    ABA_RESUMO, ABA_RESUMO_IMPORTADO, colunas_da_aba, resumir_tabela, combinar_resumos, resumo_vazio, resumo_para_linhas,
+    gravar_resumo_arquivo, mensal_do_resumo, cobertura_resumo, sem_cobertura, resumo_do_historico,
+)
+from instrumentacao import iniciar_execucao, etapa, gravar_relatorio_execucao
+from predicao_ml import treinar_e_prever
+
+# --- INGESTÃO EM STREAMING DE EXPORTAÇÕES CSV (HISTÓRICO DE LOJA NOVA) ---
+# Exportações VENDAS/GASTOS com o layout do Histórico, de qualquer tamanho: cada bloco de linhas é
+# lido, tipado e reduzido ao resumo mensal (total, comprador e sabor), e os parciais são somados.
+# A memória fica limitada a um bloco + o resumo acumulado, que cresce com meses x chaves, não com linhas.
+LINHAS_POR_BLOCO_CSV = int(os.environ.get('INGESTAO_LINHAS_POR_BLOCO', '200000'))
+
+# Resumo resultante, no mesmo formato do resumo pendente do backup (JSON de linhas)
+ARQUIVO_RESUMO_INGESTAO = os.path.join(DIRETORIO_CACHE, 'resumo_ingestao.json')
+# --------------------------------------------------------------------------------
+
+
+def cabecalho_csv(caminho):
+    """Primeira linha do CSV (nomes das colunas), sem ler o resto do arquivo."""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def blocos_csv(caminho, colunas, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """
+    Gera DataFrames de até linhas_por_bloco linhas, só com as colunas pedidas, células como texto
+    (object, vazias = ''), como selecionar_colunas monta a partir da API.
+    """
+    leitor = pd.read_csv(caminho, usecols=colunas, dtype=object, na_filter=False, encoding='utf-8-sig', chunksize=linhas_por_bloco)
+    with leitor:
+        yield from leitor
+
+
+def resumo_de_csv(caminho, aba_nome, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """
+    Resumo mensal de uma exportação (VENDAS ou GASTOS) lida em blocos: cada bloco vira um resumo
+    parcial, somado ao acumulado antes do próximo ser lido. Com a linha de controle (linhas brutas
+    lidas, válidas ou não), como agregar_resumo.
+    """
+    coluna_valor, categoricas = colunas_da_aba(aba_nome)
+    cabecalho = cabecalho_csv(caminho)
+    faltantes = [coluna for coluna in (coluna_valor, COLUNA_DATA) if coluna not in cabecalho]
+    if faltantes:
+        raise ValueError(f"'{caminho}' não tem as colunas de {aba_nome}: {', '.join(faltantes)}.")
+    colunas = [coluna for coluna in (coluna_valor, COLUNA_DATA, *categoricas) if coluna in cabecalho]
+
+    resumo = resumo_vazio()
+    totais = {'linhas_lidas': 0, 'valor_invalido': 0, 'data_invalida': 0, 'rejeitadas': 0}
+    with etapa(f'ingestao_{aba_nome}') as registro:
+        parciais = (resumir_tabela(bloco, aba_nome) for bloco in blocos_csv(caminho, colunas, linhas_por_bloco))
+        for blocos, (parcial, relatorio) in enumerate(parciais, start=1):
+            resumo = combinar_resumos(resumo, parcial)
+            for chave in totais:
+                totais[chave] += relatorio[chave]
+            print(f"  {aba_nome}: {totais['linhas_lidas']} linhas lidas ({blocos} blocos), resumo com {len(resumo)} linhas.")
+        registro.update(linhas_entrada=totais['linhas_lidas'], linhas_saida=len(resumo),
+                        valor_invalido=totais['valor_invalido'], data_invalida=totais['data_invalida'])
+
+    if totais['rejeitadas']:
+        print(f"Alerta: {totais['rejeitadas']} de {totais['linhas_lidas']} linhas rejeitadas em {aba_nome} "
+              f"(valor inválido: {totais['valor_invalido']}, data inválida: {totais['data_invalida']}).")
+    return combinar_resumos(resumo, cobertura_resumo(aba_nome, totais['linhas_lidas']))
+
+
+def ingerir_historico_csv(caminho_vendas, caminho_gastos, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """Resumo mensal (formato da aba RESUMO_MENSAL) das exportações de VENDAS e GASTOS de uma loja."""
+    return combinar_resumos(
+        resumo_de_csv(caminho_vendas, ABA_VENDAS, linhas_por_bloco),
+        resumo_de_csv(caminho_gastos, ABA_GASTOS, linhas_por_bloco),
+    )
+
+
+def main(caminho_vendas, caminho_gastos, saida=ARQUIVO_RESUMO_INGESTAO, historico_id=None, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """
+    Ingestão de uma loja nova: resumo mensal das exportações gravado em `saida`, frame mensal e
+    previsão (treinar_e_prever) conferidos, e, com historico_id, o resumo publicado na aba
+    RESUMO_MENSAL desse Histórico: a partir daí o 'predict' usa o fast path sem reler as abas brutas.
+    Retorna o código de saída.
+    """
+    iniciar_execucao('ingestao_csv')
+    try:
+        inicio = time.perf_counter()
+        try:
+            df_resumo = ingerir_historico_csv(caminho_vendas, caminho_gastos, linhas_por_bloco)
+        except (OSError, ValueError) as e:
+            print(f"ERRO na ingestão: {e}")
+            return 1
+        gravar_resumo_arquivo(saida, df_resumo)
+        df_mensal = mensal_do_resumo(df_resumo)
+        print(f"\nResumo mensal: {len(df_mensal)} meses, {len(df_resumo)} linhas em '{saida}' ({time.perf_counter() - inicio:.1f}s).")
+
+        if len(df_mensal) < 2:
+            print("Alerta: menos de 2 meses consolidados; nada a prever nem a publicar.")
+            return 1
+
+        with etapa('treinar_e_prever') as registro:
+            previsao, mae, ultimo_lucro_real, leaderboard = treinar_e_prever(df_mensal)
+            registro['linhas_entrada'] = len(df_mensal)
+        print(f"Último lucro real: {ultimo_lucro_real:.2f}. Previsão do próximo mês ({leaderboard.index[0]}): {previsao:.2f} (MAE {mae:.2f}).")
+
+        if historico_id:
+            # As linhas do CSV não estão nas abas brutas: RESUMO_IMPORTADO fica sem linhas de controle, e
+            # RESUMO_MENSAL soma a ele as abas brutas atuais com as delas (backup e predict conferem e seguem)
+            planilha = abrir_planilha(autenticar_gspread(), historico_id)
+            importado = sem_cobertura(df_resumo)
+            com_retentativa(sobrescrever_aba, planilha, ABA_RESUMO_IMPORTADO, resumo_para_linhas(importado))
+            resumo_historico = resumo_do_historico(planilha, (ABA_VENDAS, ABA_GASTOS), importado)
+            com_retentativa(sobrescrever_aba, planilha, ABA_RESUMO, resumo_para_linhas(resumo_historico))
+            print(f"Resumo publicado nas abas '{ABA_RESUMO_IMPORTADO}' e '{ABA_RESUMO}' do Histórico {historico_id}.")
+        return 0
+    finally:
+        gravar_relatorio_execucao()
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# --- INSTRUMENTAÇÃO DO PIPELINE (DESLIGADA POR PADRÃO) ---
+# Com INSTRUMENTACAO=true cada etapa registra tempo, pico de memória (tracemalloc) e linhas
+# de entrada/saída, e cada chamada ao Sheets registra contagem e bytes. Desligada, etapa()
+# devolve um contexto nulo e registrar_chamada_api() retorna na primeira linha.
+INSTRUMENTACAO_ATIVA = os.environ.get('INSTRUMENTACAO', 'false').lower() == 'true'
+DIRETORIO_RELATORIOS = os.environ.get('RELATORIO_EXECUCAO_DIR', '.')
+
+_EXECUCAO = {'script': None, 'inicio': None, 'etapas': [], 'api': {}, 'pico_bytes': 0}
+
+# Várias lojas em paralelo (lojas.py): cada thread marca as suas etapas com o id da loja
+_CONTEXTO = threading.local()
+_LOCK_API = threading.Lock()
+# --------------------------------------------------------------------------------
+
+
+def iniciar_execucao(script):
+    """Marca o início da execução e liga o tracemalloc (só com a instrumentação ativa)."""
+    if not INSTRUMENTACAO_ATIVA:
+        return
+    _EXECUCAO.update(script=script, inicio=time.perf_counter(), data=datetime.now().isoformat(timespec='seconds'), etapas=[], api={}, pico_bytes=0)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextmanager
+def rotular_etapas(loja):
+    """As etapas abertas nesta thread dentro do contexto levam registro['loja'] = loja."""
+    anterior = getattr(_CONTEXTO, 'loja', None)
+    _CONTEXTO.loja = loja
+    try:
+        yield
+    finally:
+        _CONTEXTO.loja = anterior
+
+
+@contextmanager
+def _medir_etapa(nome):
+    """
+    Etapas de uma loja são sequenciais: o pico do tracemalloc é zerado no início de cada uma.
+    Com lojas em paralelo o tracemalloc é do processo, então o pico de uma etapa inclui o das outras threads.
+    """
+    registro = {'etapa': nome}
+    loja = getattr(_CONTEXTO, 'loja', None)
+    if loja is not None:
+        registro['loja'] = loja
+    tracemalloc.reset_peak()
+    memoria_inicial = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['segundos'] = round(time.perf_counter() - inicio, 4)
+        pico = tracemalloc.get_traced_memory()[1]
+        registro['pico_memoria_mb'] = round((pico - memoria_inicial) / 2 ** 20, 2)
+        _EXECUCAO['pico_bytes'] = max(_EXECUCAO['pico_bytes'], pico)
+        _EXECUCAO['etapas'].append(registro)
+
+
+def etapa(nome):
+    """
+    Contexto de uma etapa do pipeline. O dicionário devolvido aceita contagens extras
+    (ex.: registro['linhas_entrada'] = ...). Desligado, é um contexto nulo com um dict descartável.
+    """
+    if not INSTRUMENTACAO_ATIVA:
+        return nullcontext({})
+    return _medir_etapa(nome)
+
+
+def registrar_chamada_api(metodo, carga=None):
+    """Conta uma chamada ao Sheets e os bytes (JSON) enviados ou recebidos."""
+    if not INSTRUMENTACAO_ATIVA:
+        return
+    tamanho = 0 if carga is None else len(json.dumps(carga, ensure_ascii=False, default=str).encode('utf-8'))
+    with _LOCK_API:
+        contagem = _EXECUCAO['api'].setdefault(metodo, {'chamadas': 0, 'bytes': 0})
+        contagem['chamadas'] += 1
+        contagem['bytes'] += tamanho
+
+
+def resumo_execucao():
+    """
+    Relatório da execução até agora (dict serializável) ou None com a instrumentação desligada.
+    Dentro de rotular_etapas só entram as etapas daquela loja (as chamadas à API são do processo).
+    """
+    if not INSTRUMENTACAO_ATIVA or _EXECUCAO['inicio'] is None:
+        return None
+    loja = getattr(_CONTEXTO, 'loja', None)
+    etapas = _EXECUCAO['etapas'] if loja is None else [e for e in _EXECUCAO['etapas'] if e.get('loja') == loja]
+    return {
+        'script': _EXECUCAO['script'],
+        'data': _EXECUCAO['data'],
+        'segundos_total': round(time.perf_counter() - _EXECUCAO['inicio'], 4),
+        'pico_memoria_mb': round(max(_EXECUCAO['pico_bytes'], tracemalloc.get_traced_memory()[1]) / 2 ** 20, 2),
+        'api': _EXECUCAO['api'],
+        'etapas': etapas,
+    }
+
+
+def gravar_relatorio_execucao():
+    """Grava o relatório em relatorio_execucao_<script>.json (atômico). Sem instrumentação, não faz nada."""
+    relatorio = resumo_execucao()
+    if relatorio is None:
+        return
+    os.makedirs(DIRETORIO_RELATORIOS, exist_ok=True)
+    caminho = os.path.join(DIRETORIO_RELATORIOS, f"relatorio_execucao_{relatorio['script']}.json")
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+    print(f"Relatório de execução gravado em {caminho}.")
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from acesso_planilhas import autenticar_gspread, limitador_requisicoes
+from cache_local import DIRETORIO_ESTADO
+from instrumentacao import iniciar_execucao, rotular_etapas, gravar_relatorio_execucao
+from backup_gastos_despesas_mensal import PLANILHA_ORIGEM_ID, PLANILHA_HISTORICO_ID, MAP_ABAS, executar_backup
+from predicao_ml import executar_predicao, gravar_pagina_erro
+from dashboard_ml import OUTPUT_HTML, ARQUIVO_SNAPSHOT, OUTPUT_HTML_LOJAS, montar_dashboard_lojas, ler_snapshot_dashboard
+from previsao_series import ARQUIVO_PREVISOES_SERIES
+
+# --- REGISTRO DE LOJAS E AGENDADOR (VÁRIAS LOJAS EM PARALELO) ---
+# Cada loja tem a sua Origem e o seu Histórico. O registro (JSON) lista as lojas:
+#   [{"id": "centro", "nome": "Loja Centro", "planilha_origem": "<ID>", "planilha_historico": "<ID>",
+#     "abas": {"vendas": "VENDAS", "gastos": "GASTOS"}}]      ("abas" é opcional: padrão MAP_ABAS)
+# Sem o arquivo, vale a loja única dos scripts (PLANILHA_ORIGEM_ID / PLANILHA_HISTORICO_ID).
+ARQUIVO_LOJAS = os.environ.get('LOJAS_CONFIG', 'lojas.json')
+ID_LOJA_UNICA = 'principal'
+
+# Lojas processadas ao mesmo tempo (threads). Todas dividem o limite de requisições do
+# acesso_planilhas (SHEETS_REQUISICOES_POR_MINUTO): mais lojas simultâneas não estouram a cota.
+MAX_LOJAS_SIMULTANEAS = int(os.environ.get('LOJAS_SIMULTANEAS', '4'))
+
+# Saídas de cada loja em <LOJAS_SAIDA_DIR>/<id>/ (dashboard, snapshot, previsões por série);
+# manifesto e resumo pendente ficam no diretório de estado, um arquivo por loja.
+DIRETORIO_SAIDA_LOJAS = os.environ.get('LOJAS_SAIDA_DIR', 'lojas')
+ARQUIVO_RESULTADOS_LOJAS = os.path.join(DIRETORIO_SAIDA_LOJAS, 'resultados_lojas.json')
+
+# O id vira nome de pasta e de arquivo
+FORMATO_ID_LOJA = re.compile(r'^[A-Za-z0-9_-]+$')
+# --------------------------------------------------------------------------------
+
+
+class Loja:
+    """Uma loja do registro: as duas planilhas, o mapeamento de abas e os arquivos locais dela."""
+
+    def __init__(self, id_loja, nome, planilha_origem, planilha_historico, abas=None):
+        self.id = id_loja
+        self.nome = nome or id_loja
+        self.planilha_origem = planilha_origem
+        self.planilha_historico = planilha_historico
+        self.abas = dict(abas) if abas else dict(MAP_ABAS)
+
+        self.diretorio_saida = os.path.join(DIRETORIO_SAIDA_LOJAS, id_loja)
+        self.saida_html = os.path.join(self.diretorio_saida, os.path.basename(OUTPUT_HTML))
+        self.arquivo_snapshot = os.path.join(self.diretorio_saida, os.path.basename(ARQUIVO_SNAPSHOT))
+        self.arquivo_previsoes = os.path.join(self.diretorio_saida, os.path.basename(ARQUIVO_PREVISOES_SERIES))
+        self.arquivo_manifesto = os.path.join(DIRETORIO_ESTADO, f'manifesto_predicao__{id_loja}.json')
+        self.arquivo_resumo_pendente = os.path.join(DIRETORIO_ESTADO, f'resumo_pendente__{id_loja}.json')
+
+    def __repr__(self):
+        return f"Loja({self.id!r})"
+
+
+def carregar_lojas(caminho=ARQUIVO_LOJAS):
+    """Lê o registro de lojas. Sem arquivo, devolve só a loja única configurada nos scripts."""
+    if not os.path.exists(caminho):
+        print(f"Registro '{caminho}' não encontrado: usando a loja única ({ID_LOJA_UNICA}).")
+        return [Loja(ID_LOJA_UNICA, 'Loja Principal', PLANILHA_ORIGEM_ID, PLANILHA_HISTORICO_ID)]
+
+    with open(caminho, 'r', encoding='utf-8') as f:
+        registro = json.load(f)
+
+    lojas = []
+    for posicao, item in enumerate(registro, start=1):
+        faltantes = [campo for campo in ('id', 'planilha_origem', 'planilha_historico') if not item.get(campo)]
+        if faltantes:
+            raise ValueError(f"Loja nº {posicao} de '{caminho}' sem {', '.join(faltantes)}.")
+        if not FORMATO_ID_LOJA.match(item['id']):
+            raise ValueError(f"Id de loja inválido em '{caminho}': '{item['id']}' (use letras, números, '-' e '_').")
+        lojas.append(Loja(item['id'], item.get('nome'), item['planilha_origem'], item['planilha_historico'], item.get('abas')))
+
+    ids = [loja.id for loja in lojas]
+    repetidos = sorted({id_loja for id_loja in ids if ids.count(id_loja) > 1})
+    if repetidos:
+        raise ValueError(f"Ids de loja repetidos em '{caminho}': {', '.join(repetidos)}.")
+    historicos = [loja.planilha_historico for loja in lojas]
+    if len(set(historicos)) != len(historicos):
+        raise ValueError(f"Duas lojas de '{caminho}' apontam para o mesmo Histórico (cache, índice e resumo seriam misturados).")
+    if not lojas:
+        raise ValueError(f"Registro '{caminho}' não tem nenhuma loja.")
+    return lojas
+
+
+def backup_loja(gc, loja):
+    """Backup Origem -> Histórico da loja. Retorna {aba_origem: linhas anexadas}."""
+    return executar_backup(gc, loja.planilha_origem, loja.planilha_historico, loja.abas, loja.arquivo_resumo_pendente)
+
+
+def predicao_loja(gc, loja):
+    """Predição e dashboard da loja nos arquivos dela. Em erro, grava a página de erro e relança."""
+    os.makedirs(loja.diretorio_saida, exist_ok=True)
+    try:
+        return executar_predicao(gc, loja.planilha_historico, loja.saida_html, loja.arquivo_snapshot,
+                                 loja.arquivo_previsoes, loja.arquivo_manifesto)
+    except Exception as e:
+        gravar_pagina_erro(e, loja.saida_html, loja.arquivo_manifesto)
+        raise
+
+
+def processar_loja(gc, loja, fazer_backup=True, fazer_predicao=True):
+    """
+    Backup e depois predição de uma loja (a predição lê o resumo que o backup acabou de atualizar).
+    Se o backup falha, a predição da loja não roda: o dashboard continuaria com dados incompletos.
+    """
+    resultado = {}
+    if fazer_backup:
+        resultado['backup'] = backup_loja(gc, loja)
+    if fazer_predicao:
+        resultado['predicao'] = predicao_loja(gc, loja)
+        resultado['situacao'] = resultado['predicao']['situacao']
+    return resultado
+
+
+def executar_lojas(lojas, tarefa, max_simultaneas=MAX_LOJAS_SIMULTANEAS):
+    """
+    Roda tarefa(loja) para todas as lojas num pool de no máximo max_simultaneas threads.
+    Uma loja que falha não interrompe as outras: a exceção vira o resultado dela.
+    Retorna {id da loja: resultado}, na ordem do registro.
+    """
+    def executar(loja):
+        inicio = time.perf_counter()
+        with rotular_etapas(loja.id):
+            try:
+                resultado = {'situacao': 'concluida', **(tarefa(loja) or {})}
+            except Exception as e:
+                print(f"Alerta: loja '{loja.id}' falhou ({type(e).__name__}: {e}). As outras seguem.")
+                resultado = {'situacao': 'falha', 'erro': f"{type(e).__name__}: {e}"}
+        resultado.update(loja=loja.id, nome=loja.nome, segundos=round(time.perf_counter() - inicio, 2))
+        return resultado
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_simultaneas, len(lojas)))) as executor:
+        return {resultado['loja']: resultado for resultado in executor.map(executar, lojas)}
+
+
+def gravar_resultados_lojas(resultados, caminho=ARQUIVO_RESULTADOS_LOJAS):
+    """Resultado de cada loja (situação, erro, linhas anexadas, previsão) em JSON, gravado de forma atômica."""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'gerado_em': datetime.now().isoformat(timespec='seconds'), 'lojas': resultados}, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(temporario, caminho)
+
+
+def montar_painel_lojas(lojas, resultados, destino=OUTPUT_HTML_LOJAS):
+    """Painel consolidado a partir do snapshot de cada loja (lojas puladas ou com falha usam o último gerado)."""
+    pasta_destino = os.path.dirname(os.path.abspath(destino))
+    entradas = []
+    for loja in lojas:
+        resultado = resultados[loja.id]
+        snapshot = None
+        if os.path.exists(loja.arquivo_snapshot):
+            try:
+                snapshot = ler_snapshot_dashboard(loja.arquivo_snapshot)
+            except Exception as e:
+                print(f"Alerta: snapshot da loja '{loja.id}' ilegível ({e}).")
+        entradas.append({
+            'nome': loja.nome,
+            'situacao': resultado['situacao'],
+            'erro': resultado.get('erro'),
+            'segundos': resultado['segundos'],
+            'link': os.path.relpath(os.path.abspath(loja.saida_html), pasta_destino) if os.path.exists(loja.saida_html) else None,
+            'snapshot': snapshot,
+        })
+    montar_dashboard_lojas(entradas, destino)
+
+
+def main(caminho_registro=ARQUIVO_LOJAS, fazer_backup=True, fazer_predicao=True, max_simultaneas=MAX_LOJAS_SIMULTANEAS):
+    """
+    Backup e/ou predição de todas as lojas do registro, em paralelo, e o painel consolidado.
+    Retorna o código de saída: 1 se alguma loja falhou (as demais terminam normalmente).
+    """
+    iniciar_execucao('lojas')
+    try:
+        lojas = carregar_lojas(caminho_registro)
+        gc = autenticar_gspread()
+        print(f"\n🏬 {len(lojas)} loja(s), até {max_simultaneas} em paralelo: {', '.join(loja.id for loja in lojas)}.")
+
+        inicio = time.perf_counter()
+        resultados = executar_lojas(lojas, lambda loja: processar_loja(gc, loja, fazer_backup, fazer_predicao), max_simultaneas)
+        gravar_resultados_lojas(resultados)
+        if fazer_predicao:
+            montar_painel_lojas(lojas, resultados)
+    finally:
+        gravar_relatorio_execucao()
+
+    falhas = [r for r in resultados.values() if r['situacao'] == 'falha']
+    limitador = limitador_requisicoes()
+    espera = f", {limitador.espera_total:.1f}s aguardando a cota do Sheets" if limitador is not None else ""
+    print(f"\nLojas concluídas em {time.perf_counter() - inicio:.1f}s{espera}.")
+    for resultado in resultados.values():
+        detalhe = [f"{aba}: +{qtd}" for aba, qtd in resultado.get('backup', {}).items()]
+        if 'previsao' in resultado.get('predicao', {}):
+            detalhe.append(f"previsão {resultado['predicao']['previsao']:.2f}")
+        detalhe = resultado.get('erro') or ', '.join(detalhe)
+        print(f"  {resultado['loja']:<20} {resultado['situacao']:<10} {resultado['segundos']:>7.1f}s  {detalhe}")
+    return 1 if falhas else 0
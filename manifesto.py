@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from cache_local import DIRETORIO_ESTADO
+
+# --- MANIFESTO DA PREDIÇÃO (IMPRESSÃO DIGITAL DAS FONTES) ---
+# Cada execução completa grava a impressão digital das fontes que usou. Na seguinte, a predição
+# calcula a impressão digital barata (marca d'água das abas brutas ou o próprio resumo mensal) e,
+# se nada mudou, pula carga, modelos e dashboard: a página não é regravada e o workflow não comita.
+# Fica no diretório de estado, comitado junto com o dashboard: o cache do Actions expira e o
+# manifesto tem que acompanhar a página que está no repositório.
+# A decisão de pular é da execução inteira: backtest e previsões usam a série mensal completa, então
+# qualquer mês alterado refaz os modelos. O recálculo só do que mudou fica na carga (marca d'água do
+# cache Parquet, deltas do RESUMO_MENSAL, cubo incremental); o manifesto guarda os totais de cada mês
+# para a execução informar quais meses mudaram.
+ARQUIVO_MANIFESTO = os.environ.get('MANIFESTO_PREDICAO', os.path.join(DIRETORIO_ESTADO, 'manifesto_predicao.json'))
+
+# true = executa tudo mesmo com as fontes inalteradas (ex.: mudança só no layout do dashboard)
+IGNORAR_MANIFESTO = os.environ.get('IGNORAR_MANIFESTO', 'false').lower() == 'true'
+
+# Versão da lógica de modelos e dashboard. Mudou a saída para os mesmos dados? Incrementa aqui.
+VERSAO_MANIFESTO = 3
+# --------------------------------------------------------------------------------
+
+
+def impressao_digital(fontes):
+    """SHA-256 das fontes (dict serializável em JSON) junto com a versão do manifesto."""
+    conteudo = json.dumps({'versao': VERSAO_MANIFESTO, 'fontes': fontes}, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def totais_por_mes(df_mensal):
+    """Totais de cada mês do frame mensal ({'AAAA-MM': [vendas, gastos]}), para saber quais meses mudaram."""
+    return {
+        mes_ano.strftime('%Y-%m'): [round(float(vendas), 2), round(float(gastos), 2)]
+        for mes_ano, vendas, gastos in df_mensal[['Mes_Ano', 'Total_Vendas', 'Total_Gastos']].itertuples(index=False)
+    }
+
+
+def ler_manifesto(caminho=ARQUIVO_MANIFESTO):
+    """Manifesto da última execução completa ({} se não existir ou estiver ilegível)."""
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Alerta: manifesto '{caminho}' ilegível ({e}). Execução completa.")
+        return {}
+
+
+def fontes_inalteradas(manifesto, impressao, saidas):
+    """True se a impressão digital bate com a do manifesto e as saídas da última execução ainda existem."""
+    if IGNORAR_MANIFESTO or impressao is None:
+        return False
+    return manifesto.get('impressao') == impressao and all(os.path.exists(saida) for saida in saidas)
+
+
+def meses_alterados(manifesto, meses):
+    """Meses ('AAAA-MM') novos, removidos ou com totais diferentes dos do manifesto."""
+    anteriores = manifesto.get('meses', {})
+    return sorted(mes for mes in set(meses) | set(anteriores) if meses.get(mes) != anteriores.get(mes))
+
+
+def gravar_manifesto(impressao, meses, caminho=ARQUIVO_MANIFESTO):
+    """Grava o manifesto da execução completa (atômico)."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({
+            'impressao': impressao,
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'meses': meses,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def invalidar_manifesto(caminho=ARQUIVO_MANIFESTO):
+    """Remove o manifesto: a próxima execução roda completa."""
+    if os.path.exists(caminho):
+        os.remove(caminho)
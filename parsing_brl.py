@@ -0,0 +1,248 @@
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# --- ESQUEMA DECLARADO DAS ABAS E COLUNAS ---
+ABA_VENDAS = "VENDAS"
+ABA_GASTOS = "GASTOS"
+
+COLUNA_VALOR_VENDA = 'VALOR DA VENDA'
+COLUNA_COMPRADOR = 'DADOS DO COMPRADOR'
+COLUNA_ITEM_VENDIDO = 'SABORES'
+COLUNA_VALOR_GASTO = 'VALOR'
+COLUNA_DATA = 'DATA E HORA'
+
+# Formato oficial do 'DATA E HORA' exportado pelo Google Sheets (pt-BR)
+FORMATO_DATA = '%d/%m/%Y %H:%M:%S'
+
+# Caracteres descartados na leitura do valor em R$: símbolo, espaços (inclusive o não separável
+# que o Sheets coloca após o "R$"), separador de milhar e o preenchimento do buffer Unicode.
+CARACTERES_IGNORADOS = np.array([ord(c) for c in 'R$ \xa0.\0'], dtype=np.uint32)
+
+# Maior valor aceito (em unidades de inteiro lido): acima disso a conversão para centavos
+# estouraria o int64.
+LIMITE_INTEIRO_BRL = 10 ** 16
+
+# Linhas por bloco na conversão de datas em largura fixa (limita a matriz de caracteres em memória)
+TAMANHO_BLOCO_DATAS = 100_000
+
+# Tabela de tradução usada no fallback: remove símbolo, espaços e separador de milhar,
+# e troca a vírgula decimal por ponto.
+TABELA_BRL = str.maketrans({
+    'R': None,
+    '$': None,
+    ' ': None,
+    '\xa0': None,  # espaço não separável que o Sheets às vezes coloca após o "R$"
+    '.': None,
+    ',': '.',
+})
+# --------------------------------------------------------------------------------
+
+
+def _converter_brl_matriz(texto):
+    """
+    Lê os valores em R$ direto do buffer Unicode (matriz linhas x largura), numa passada
+    por coluna de caractere: acumula os dígitos, localiza a vírgula decimal e o sinal.
+    Retorna (inteiro, casas_decimais, valido) - o valor é inteiro / 10 ** casas_decimais.
+    """
+    qtd = len(texto)
+    largura = max(int(texto.str.len().max()), 1)
+    matriz = np.asarray(texto, dtype=f'U{largura}').view(np.uint32).reshape(qtd, largura)
+
+    inteiro = np.zeros(qtd, dtype=np.int64)
+    casas_decimais = np.zeros(qtd, dtype=np.int64)
+    qtd_digitos = np.zeros(qtd, dtype=np.int64)
+    qtd_virgulas = np.zeros(qtd, dtype=np.int64)
+    negativo = np.zeros(qtd, dtype=bool)
+    valido = np.ones(qtd, dtype=bool)
+
+    for pos in range(largura):
+        caractere = matriz[:, pos]
+        eh_digito = (caractere >= ord('0')) & (caractere <= ord('9'))
+        eh_virgula = caractere == ord(',')
+        eh_ignorado = np.isin(caractere, CARACTERES_IGNORADOS)
+        eh_sinal = caractere == ord('-')
+
+        inteiro = np.where(eh_digito, inteiro * 10 + (caractere.astype(np.int64) - ord('0')), inteiro)
+        casas_decimais += eh_digito & (qtd_virgulas > 0)
+        qtd_digitos += eh_digito
+        qtd_virgulas += eh_virgula
+        negativo |= eh_sinal
+        valido &= eh_digito | eh_virgula | eh_ignorado | eh_sinal
+
+    valido &= (qtd_digitos > 0) & (qtd_digitos <= 18) & (qtd_virgulas <= 1)
+    return np.where(negativo, -inteiro, inteiro), casas_decimais, valido
+
+
+def _escalar_para_centavos(inteiro, casas_decimais):
+    """
+    inteiro / 10 ** casas_decimais em centavos, só com aritmética inteira. Com mais de duas casas
+    arredonda para o centavo mais próximo (metade para longe do zero).
+    """
+    centavos = inteiro * 10 ** np.clip(2 - casas_decimais, 0, 2)
+    excesso = casas_decimais > 2
+    if excesso.any():
+        divisor = 10 ** (casas_decimais[excesso] - 2)
+        absoluto = (np.abs(inteiro[excesso]) + divisor // 2) // divisor
+        centavos[excesso] = np.where(inteiro[excesso] < 0, -absoluto, absoluto)
+    return centavos
+
+
+def converter_brl_centavos(serie):
+    """
+    Converte strings no formato 'R$ 1.234,56' para centavos (int64), sem passar por float:
+    as somas de dinheiro ficam exatas. Retorna (centavos, valido) - arrays NumPy alinhados com a
+    série; onde valido é False o centavo é 0.
+    Preços se repetem muito: fatoriza a coluna e converte só os valores distintos.
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    texto = pd.Series(distintos, dtype=object).astype(str)
+    # Posição extra: inválido para as células nulas (código -1)
+    centavos = np.zeros(len(texto) + 1, dtype=np.int64)
+    valido = np.zeros(len(texto) + 1, dtype=bool)
+
+    if len(texto):
+        inteiro, casas_decimais, reconhecido = _converter_brl_matriz(texto)
+        reconhecido &= np.abs(inteiro) < LIMITE_INTEIRO_BRL
+        centavos[:-1][reconhecido] = _escalar_para_centavos(inteiro[reconhecido], casas_decimais[reconhecido])
+        valido[:-1] = reconhecido
+
+        # Fallback: o que o caminho rápido não reconheceu passa pelo to_numeric do pandas
+        if not reconhecido.all():
+            resto = pd.to_numeric(texto[~reconhecido].str.translate(TABELA_BRL), errors='coerce').to_numpy(dtype='float64')
+            finito = np.isfinite(resto) & (np.abs(resto) < LIMITE_INTEIRO_BRL / 100)
+            centavos[:-1][~reconhecido] = np.where(finito, np.round(np.where(finito, resto, 0) * 100), 0).astype(np.int64)
+            valido[:-1][~reconhecido] = finito
+
+    return centavos[codigos], valido[codigos]
+
+
+def _converter_datas_largura_fixa(texto):
+    """
+    Caminho rápido para 'dd/mm/aaaa hh:mm:ss': lê os dígitos direto do buffer Unicode
+    (matriz linhas x 19) e monta o datetime64 com aritmética inteira.
+    Linhas fora do padrão (ou com data impossível, ex. 31/02) saem como NaT.
+    """
+    qtd = len(texto)
+    if qtd == 0:
+        return np.array([], dtype='datetime64[s]')
+
+    matriz = np.asarray(texto, dtype='U19').view(np.uint32).reshape(qtd, 19)
+    valido = texto.str.len().to_numpy() == 19
+
+    def digitos(*posicoes):
+        numero = np.zeros(qtd, dtype=np.int64)
+        for pos in posicoes:
+            d = matriz[:, pos].astype(np.int64) - 48
+            valido[:] &= (d >= 0) & (d <= 9)
+            numero = numero * 10 + d
+        return numero
+
+    for pos, separador in ((2, '/'), (5, '/'), (10, ' '), (13, ':'), (16, ':')):
+        valido &= matriz[:, pos] == ord(separador)
+
+    dia, mes, ano = digitos(0, 1), digitos(3, 4), digitos(6, 7, 8, 9)
+    hora, minuto, segundo = digitos(11, 12), digitos(14, 15), digitos(17, 18)
+    valido &= (mes >= 1) & (mes <= 12) & (dia >= 1) & (hora < 24) & (minuto < 60) & (segundo < 60)
+
+    # Monta a data: mês desde 1970 -> dia -> segundos
+    mes = np.where(valido, mes, 1)
+    inicio_mes = ((ano - 1970) * 12 + mes - 1).astype('datetime64[M]')
+    dias_no_mes = ((inicio_mes + 1).astype('datetime64[D]') - inicio_mes.astype('datetime64[D]')).astype(np.int64)
+    valido &= dia <= dias_no_mes
+
+    datas = (inicio_mes.astype('datetime64[D]') + (dia - 1)).astype('datetime64[s]')
+    datas = datas + (hora * 3600 + minuto * 60 + segundo).astype('timedelta64[s]')
+    datas[~valido] = np.datetime64('NaT')
+    return datas
+
+
+def converter_datas(serie, formato=FORMATO_DATA):
+    """
+    Converte datas pt-BR. Caminho rápido: formato declarado, lido em largura fixa.
+    Fallback: apenas as linhas que falharam são reprocessadas com inferência (dayfirst).
+    """
+    texto = serie.fillna('').astype(str)
+    if formato == FORMATO_DATA:
+        # Em blocos: a matriz de caracteres de cada bloco é descartada antes do próximo
+        blocos = [_converter_datas_largura_fixa(texto.iloc[i:i + TAMANHO_BLOCO_DATAS]) for i in range(0, len(texto), TAMANHO_BLOCO_DATAS)]
+        datas = np.concatenate(blocos) if blocos else np.array([], dtype='datetime64[s]')
+        datas = pd.Series(datas, index=serie.index).astype('datetime64[ns]')
+    else:
+        datas = pd.to_datetime(texto, format=formato, errors='coerce')
+
+    falhas = datas.isna() & texto.str.strip().ne('')
+    if falhas.any():
+        datas.loc[falhas] = pd.to_datetime(texto[falhas], format='mixed', dayfirst=True, errors='coerce')
+
+    return datas
+
+
+def selecionar_colunas(cabecalho, linhas, colunas):
+    """
+    Monta o DataFrame só com as colunas pedidas que existirem no cabeçalho, direto das linhas
+    brutas (lista de listas): as demais colunas da aba nunca viram objetos do pandas.
+    """
+    indices = {coluna: i for i, coluna in enumerate(cabecalho)}
+    colunas = [coluna for coluna in dict.fromkeys(colunas) if coluna in indices]
+    if not colunas:
+        return pd.DataFrame(index=range(len(linhas)))
+
+    # A API omite as células vazias no fim da linha: completa só as linhas curtas demais
+    largura = max(indices[coluna] for coluna in colunas) + 1
+    if min(map(len, linhas), default=largura) < largura:
+        linhas = [linha if len(linha) >= largura else list(linha) + [''] * (largura - len(linha)) for linha in linhas]
+
+    # dtype object: as colunas só apontam para as strings já lidas da API (sem copiá-las)
+    return pd.DataFrame({coluna: np.fromiter(map(itemgetter(indices[coluna]), linhas), dtype=object, count=len(linhas)) for coluna in colunas}, dtype=object, copy=False)
+
+
+def parsear_tabela(df, coluna_valor, coluna_data, prefixo, colunas_categoricas=()):
+    """
+    Tipa as colunas de Valor e Data do DataFrame bruto, sem alterá-lo.
+    Retorna (df_validos, relatorio). df_validos é um frame novo e compacto, só com as linhas
+    válidas: {prefixo}_Centavos (int64), Data_Datetime e as colunas_categoricas presentes
+    (dtype category). O relatório conta as linhas rejeitadas por motivo.
+    """
+    centavos, valor_valido = converter_brl_centavos(df[coluna_valor])
+    datas = converter_datas(df[coluna_data]).to_numpy()
+
+    valor_invalido = ~valor_valido
+    data_invalida = np.isnat(datas)
+    validas = ~(valor_invalido | data_invalida)
+
+    relatorio = {
+        'linhas_lidas': int(len(df)),
+        'valor_invalido': int(valor_invalido.sum()),
+        'data_invalida': int(data_invalida.sum()),
+        'rejeitadas': int((~validas).sum()),
+    }
+
+    colunas = {f'{prefixo}_Centavos': centavos[validas], 'Data_Datetime': datas[validas]}
+    for coluna in colunas_categoricas:
+        if coluna in df.columns:
+            codigos, categorias = pd.factorize(df[coluna])
+            colunas[coluna] = pd.Categorical.from_codes(codigos[validas], categorias)
+
+    return pd.DataFrame(colunas), relatorio
+
+
+def concatenar_tabelas(*dfs):
+    """
+    Concatena frames de parsear_tabela preservando as colunas categóricas (o pd.concat puro
+    cai para object quando as categorias diferem entre os frames).
+    """
+    dfs = [df for df in dfs if df is not None and not df.empty]
+    if len(dfs) < 2:
+        return dfs[0] if dfs else pd.DataFrame()
+
+    colunas = {}
+    for coluna in dfs[0].columns:
+        if isinstance(dfs[0][coluna].dtype, pd.CategoricalDtype):
+            # Categorias lidas do Parquet voltam como str: unifica o tipo antes de juntar (só as categorias, não as linhas)
+            colunas[coluna] = union_categoricals([pd.Categorical.from_codes(df[coluna].cat.codes, df[coluna].cat.categories.astype(object)) for df in dfs])
+        else:
+            colunas[coluna] = np.concatenate([df[coluna].to_numpy() for df in dfs])
+    return pd.DataFrame(colunas)
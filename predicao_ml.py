@@ -1,110 +1,249 @@
-import gspread
+import html
 import pandas as pd
-import numpy as np
-from datetime import datetime
 import os
-import json 
-from gspread.exceptions import WorksheetNotFound, APIError 
-
-# --- Adicionando as bibliotecas de Machine Learning ---
-# Removemos ARIMA/SARIMAX, mas mantemos o scikit-learn para o cálculo do MAE
-from sklearn.metrics import mean_absolute_error 
+from gspread.exceptions import WorksheetNotFound
+
+from acesso_planilhas import (
+    autenticar_gspread, abrir_planilha, intervalo, ler_intervalos, ler_abas, com_retentativa, contar_linhas_aba, sobrescrever_aba,
+)
+from parsing_brl import (
+    parsear_tabela, selecionar_colunas, concatenar_tabelas, ABA_VENDAS, ABA_GASTOS, COLUNA_VALOR_VENDA, COLUNA_COMPRADOR,
+    COLUNA_ITEM_VENDIDO, COLUNA_VALOR_GASTO, COLUNA_DATA,
+)
+from resumo_mensal import (
+    ABA_RESUMO, DIMENSAO_COMPRADOR, DIMENSAO_SABOR, linhas_para_resumo, mensal_do_resumo, resumo_para_linhas,
+    resumir_validos, cobertura_resumo, cobertura_confere, combinar_resumos, ler_resumo_importado,
+)
+from cubo_vendas import CuboVendas, NIVEIS_CUBO
+from indice_diario import IndiceDiario, caminho_indice_diario, comparativos_anuais
+from renderizacao import format_brl
+from config_planilhas import PLANILHA_HISTORICO_ID
+from instrumentacao import iniciar_execucao, etapa, gravar_relatorio_execucao
+from cache_local import (
+    ler_cache, gravar_cache, ler_meta_cache, ler_frame, gravar_frame, hash_linhas, normalizar_linhas, LINHAS_CAUDA_WATERMARK,
+)
+from manifesto import (
+    ARQUIVO_MANIFESTO, ler_manifesto, gravar_manifesto, invalidar_manifesto, impressao_digital, fontes_inalteradas, meses_alterados, totais_por_mes,
+)
+
+# --- Motor de backtesting (NumPy puro, sem scikit-learn) ---
+from backtesting import executar_backtest, prever_proximo, HORIZONTES_BACKTEST
+from simulacao_lucro import SIMULAR_CENARIOS, simular_cenarios
+from previsao_series import PREVER_POR_SERIE, ARQUIVO_PREVISOES_SERIES, prever_series, gravar_previsoes_series
+from dashboard_ml import OUTPUT_HTML, ARQUIVO_SNAPSHOT, montar_dashboard_ml, gravar_snapshot_dashboard, arquivos_dashboard
 
 # --- CONFIGURAÇÕES DE DADOS E GOVERNANÇA (TOLERÂNCIA DE ERRO) ---
-ID_PLANILHA_UNICA = "1XWdRbHqY6DWOlSO-oJbBSyOsXmYhM_NEA2_yvWbfq2Y"
+# Histórico da loja única (padrão de todas as funções de carga, em config_planilhas); com várias lojas, ver lojas.py
+ID_PLANILHA_UNICA = PLANILHA_HISTORICO_ID
+
+# Abas e Colunas: declaradas no esquema do parsing_brl (compartilhado com o backup)
 
-ABA_VENDAS = "VENDAS"
-ABA_GASTOS = "GASTOS" 
+# Saída, URL e governança do dashboard: ver dashboard_ml (renderização separada da carga)
 
-# Colunas
-COLUNA_VALOR_VENDA = 'VALOR DA VENDA'
-COLUNA_COMPRADOR = 'DADOS DO COMPRADOR' 
-COLUNA_ITEM_VENDIDO = 'SABORES'       
-COLUNA_VALOR_GASTO = 'VALOR' 
-COLUNA_DATA = 'DATA E HORA' 
+# Fast path: usa o resumo mensal materializado pelo backup (aba RESUMO_MENSAL) em vez das abas brutas
+USAR_RESUMO_MENSAL = os.environ.get('USAR_RESUMO_MENSAL', 'true').lower() == 'true'
 
-OUTPUT_HTML = "dashboard_ml_insights.html"
-URL_DASHBOARD = "https://acmsilva1.github.io/analise-de-vendas/dashboard_ml_insights.html" 
+# Abas brutas tratadas: {aba: (coluna de valor, prefixo, colunas categóricas)}
+# Comprador e sabor ficam como category (poucos valores distintos, repetidos em milhões de linhas)
+ABAS_TRATADAS = {
+    ABA_VENDAS: (COLUNA_VALOR_VENDA, 'Vendas', (COLUNA_COMPRADOR, COLUNA_ITEM_VENDIDO)),
+    ABA_GASTOS: (COLUNA_VALOR_GASTO, 'Gastos', ()),
+}
 
-# LIMITE DE GOVERNANÇA DE IA - 15% de tolerância de erro médio absoluto
-TOLERANCIA_MAE_PERCENTUAL = 0.15 
 # --------------------------------------------------------------------------------
 
-def format_brl(value):
-    """Função helper para formatar valores em R$"""
-    value = float(value)
-    return f"R$ {value:,.2f}".replace('.', 'X').replace(',', '.').replace('X', ',')
+def tratar_linhas_planilha(cabecalho, linhas, coluna_valor, prefixo, colunas_categoricas=()):
+    """
+    Converte as linhas brutas (lista de listas) em DataFrame compacto: Valor em centavos (int64),
+    Data tipada e as colunas_categoricas como category. Retorna apenas as linhas válidas.
+    """
+    with etapa(f'parsing_{prefixo}') as registro:
+        # Só as colunas usadas pela análise saem das linhas brutas
+        df = selecionar_colunas(cabecalho, linhas, [coluna_valor, COLUNA_DATA, *colunas_categoricas])
+        
+        # Conversão vetorizada de Valor (R$) e Data (formato declarado + fallback)
+        df_validos, relatorio = parsear_tabela(df, coluna_valor, COLUNA_DATA, prefixo, colunas_categoricas)
+        registro.update(linhas_entrada=relatorio['linhas_lidas'], linhas_saida=len(df_validos),
+                        valor_invalido=relatorio['valor_invalido'], data_invalida=relatorio['data_invalida'])
+    
+    if relatorio['rejeitadas']:
+        print(f"Alerta: {relatorio['rejeitadas']} de {relatorio['linhas_lidas']} linhas rejeitadas em {prefixo} "
+              f"(valor inválido: {relatorio['valor_invalido']}, data inválida: {relatorio['data_invalida']}).")
+    
+    return df_validos
+
+def _tratar_aba_completa(sheet_id, aba_nome, dados, coluna_valor, prefixo, colunas_categoricas):
+    """Trata a aba inteira (primeira execução ou cache invalidado) e regrava o cache."""
+    if not dados or len(dados) < 2:
+        return pd.DataFrame()
+    
+    cabecalho = dados[0]
+    linhas = dados[1:]
+    df_validos = tratar_linhas_planilha(cabecalho, linhas, coluna_valor, prefixo, colunas_categoricas)
+    # Só a cauda da marca d'água precisa das linhas normalizadas (sem cópia da aba inteira)
+    cauda = normalizar_linhas(linhas[-LINHAS_CAUDA_WATERMARK:], len(cabecalho))
+    gravar_cache(sheet_id, aba_nome, df_validos, cabecalho, len(linhas), cauda)
+    return df_validos
+
+def _aplicar_incremento(sheet_id, aba_nome, df_cache, meta, cabecalho_bruto, bloco, coluna_valor, prefixo, colunas_categoricas):
+    """
+    Confere a marca d'água (cabeçalho + hash da cauda) e anexa ao cache só as linhas novas.
+    Retorna None se a cauda divergir (linhas editadas/removidas).
+    """
+    qtd_cauda = meta['linhas_cauda']
+    cabecalho = cabecalho_bruto[0] if cabecalho_bruto else []
+    bloco = normalizar_linhas(bloco, len(cabecalho))
+    
+    if cabecalho != meta['cabecalho'] or len(bloco) < qtd_cauda or hash_linhas(bloco[:qtd_cauda]) != meta['hash_cauda']:
+        return None
+    
+    linhas_novas = bloco[qtd_cauda:]
+    if not linhas_novas:
+        return df_cache
+    
+    print(f"Cache {aba_nome}: {len(linhas_novas)} linhas novas desde a última execução.")
+    df_novas = tratar_linhas_planilha(cabecalho, linhas_novas, coluna_valor, prefixo, colunas_categoricas)
+    df_validos = concatenar_tabelas(df_cache, df_novas)
+    
+    total_linhas = meta['total_linhas'] + len(linhas_novas)
+    # Mesma geração: o frame só ganhou linhas no fim
+    gravar_cache(sheet_id, aba_nome, df_validos, cabecalho, total_linhas, bloco[-LINHAS_CAUDA_WATERMARK:], meta.get('geracao'))
+    return df_validos
 
-def autenticar_gspread():
-    SHEET_CREDENTIALS_JSON = os.environ.get('GCP_SA_CREDENTIALS')
-    if not SHEET_CREDENTIALS_JSON:
-        raise ConnectionError("Variável de ambiente 'GCP_SA_CREDENTIALS' não encontrada. O fluxo vai falhar!")
-    credentials_dict = json.loads(SHEET_CREDENTIALS_JSON) 
-    return gspread.service_account_from_dict(credentials_dict)
+def _intervalos_marca_dagua(aba_nome, meta):
+    """Cabeçalho + linhas a partir da cauda conferida pela marca d'água (a cauda e o que veio depois dela)."""
+    inicio = meta['total_linhas'] - meta['linhas_cauda'] + 2  # +1 do cabeçalho, +1 porque a planilha começa em 1
+    return [intervalo(aba_nome, 'A1:ZZ1'), intervalo(aba_nome, f'A{inicio}:ZZ')]
 
-def carregar_dados_de_planilha(gc, sheet_id, aba_nome, coluna_valor, prefixo):
+def carregar_abas_tratadas(planilha, sheet_id, abas):
     """
-    Carrega os dados da aba. Inclui tratamento de erro WorksheetNotFound.
+    Carrega as linhas válidas das abas {aba_nome: (coluna_valor, prefixo, colunas_categoricas)} usando o cache local.
+    Todas as abas saem em UMA requisição batchGet: com cache válido, só o cabeçalho e a cauda
+    conferida pela marca d'água + linhas novas; sem cache, a aba inteira.
+    Se o hash da cauda não bater, a aba é relida por completo. Retorna {aba_nome: df_validos}.
     """
-    try:
-        planilha = gc.open_by_key(sheet_id).worksheet(aba_nome)
-        dados = planilha.get_all_values()
-        
-        if not dados or len(dados) < 2:
-             print(f"Alerta: Planilha {aba_nome} está vazia.")
-             return pd.DataFrame()
-             
-        df = pd.DataFrame(dados[1:], columns=dados[0])
-        
-        # Limpeza e conversão de Valor
-        df['temp_valor'] = df[coluna_valor].astype(str).str.replace('R$', '', regex=False).str.replace('.', '', regex=False).str.replace(',', '.', regex=True).str.strip()
-        df[f'{prefixo}_Float'] = pd.to_numeric(df['temp_valor'], errors='coerce')
-        
-        # Limpeza e conversão de Data
-        df['Data_Datetime'] = pd.to_datetime(df[COLUNA_DATA], errors='coerce', dayfirst=True)
-        
-        df_validos = df.dropna(subset=['Data_Datetime', f'{prefixo}_Float']).copy()
-        
-        if aba_nome == ABA_VENDAS:
-             return df_validos
-        
-        # Agrupamento Mensal para GASTOS
-        df_validos['Mes_Ano'] = df_validos['Data_Datetime'].dt.to_period('M')
-        df_mensal = df_validos.groupby('Mes_Ano')[f'{prefixo}_Float'].sum().reset_index()
-        df_mensal.columns = ['Mes_Ano', f'Total_{prefixo}']
+    caches = {aba_nome: ler_cache(sheet_id, aba_nome) for aba_nome in abas}
+    
+    intervalos = []
+    for aba_nome, (df_cache, meta) in caches.items():
+        if meta is None:
+            intervalos.append(intervalo(aba_nome))
+        else:
+            intervalos += _intervalos_marca_dagua(aba_nome, meta)
+    
+    with etapa('leitura_sheets') as registro:
+        blocos = ler_intervalos(planilha, intervalos)
+        registro['linhas_lidas'] = sum(len(bloco) for bloco in blocos)
+    blocos = iter(blocos)
+    resultado = {}
+    abas_para_reconstruir = []
+    
+    for aba_nome, (coluna_valor, prefixo, colunas_categoricas) in abas.items():
+        df_cache, meta = caches[aba_nome]
         
-        return df_mensal.set_index('Mes_Ano')
+        if meta is None:
+            resultado[aba_nome] = _tratar_aba_completa(sheet_id, aba_nome, next(blocos), coluna_valor, prefixo, colunas_categoricas)
+            continue
         
-    except WorksheetNotFound:
-        print(f"ERRO CRÍTICO: Aba '{aba_nome}' não encontrada!")
-        return pd.DataFrame() 
-    except Exception as e:
-        print(f"ERRO ao carregar {aba_nome}: {e}")
-        return pd.DataFrame()
+        cabecalho_bruto, bloco = next(blocos), next(blocos)
+        df_validos = _aplicar_incremento(sheet_id, aba_nome, df_cache, meta, cabecalho_bruto, bloco, coluna_valor, prefixo, colunas_categoricas)
+        if df_validos is None:
+            print(f"Cache {aba_nome}: marca d'água divergente. Reconstruindo a partir da planilha completa.")
+            abas_para_reconstruir.append(aba_nome)
+        else:
+            resultado[aba_nome] = df_validos
+    
+    # Abas com cache invalidado: segunda leitura (rara), também em lote
+    for aba_nome, dados in ler_abas(planilha, abas_para_reconstruir).items():
+        resultado[aba_nome] = _tratar_aba_completa(sheet_id, aba_nome, dados, *abas[aba_nome])
+    
+    return resultado
 
-def carregar_e_combinar_dados(gc):
-    df_vendas_bruto = carregar_dados_de_planilha(gc, ID_PLANILHA_UNICA, ABA_VENDAS, COLUNA_VALOR_VENDA, 'Vendas')
-    df_gastos_mensal = carregar_dados_de_planilha(gc, ID_PLANILHA_UNICA, ABA_GASTOS, COLUNA_VALOR_GASTO, 'Gastos')
+def _marca_dagua(meta):
+    return {'cabecalho': meta['cabecalho'], 'total_linhas': meta['total_linhas'], 'hash_cauda': meta['hash_cauda']}
+
+def impressao_abas_brutas(gc, abas_nomes=(ABA_VENDAS, ABA_GASTOS), sheet_id=ID_PLANILHA_UNICA):
+    """
+    Impressão digital barata das abas brutas: a marca d'água do cache local conferida contra a
+    planilha numa única batchGet (cabeçalho + linhas a partir da cauda conhecida), sem abrir o
+    Parquet nem tratar linhas. Mesmo formato de impressao_abas_em_cache. Sem cache de alguma aba: None.
+    """
+    metas = {aba_nome: ler_meta_cache(sheet_id, aba_nome) for aba_nome in abas_nomes}
+    if any(meta is None for meta in metas.values()):
+        return None
     
-    if df_vendas_bruto.empty or df_gastos_mensal.empty:
-        raise ValueError("Dados insuficientes para análise de Lucro (Vendas ou Gastos estão vazios).")
+    planilha = abrir_planilha(gc, sheet_id)
+    blocos = iter(ler_intervalos(planilha, [faixa for aba_nome, meta in metas.items() for faixa in _intervalos_marca_dagua(aba_nome, meta)]))
+    impressao = {}
+    for aba_nome, meta in metas.items():
+        cabecalho_bruto, bloco = next(blocos), next(blocos)
+        cabecalho = cabecalho_bruto[0] if cabecalho_bruto else []
+        impressao[aba_nome] = {
+            'cabecalho': cabecalho,
+            'total_linhas': meta['total_linhas'] - meta['linhas_cauda'] + len(bloco),
+            'hash_cauda': hash_linhas(normalizar_linhas(bloco[-LINHAS_CAUDA_WATERMARK:], len(cabecalho))),
+        }
+    return impressao
+
+def impressao_abas_em_cache(abas_nomes=(ABA_VENDAS, ABA_GASTOS), sheet_id=ID_PLANILHA_UNICA):
+    """A impressão digital das abas brutas lida da marca d'água gravada pela carga (None sem cache)."""
+    metas = {aba_nome: ler_meta_cache(sheet_id, aba_nome) for aba_nome in abas_nomes}
+    if any(meta is None for meta in metas.values()):
+        return None
+    return {aba_nome: _marca_dagua(meta) for aba_nome, meta in metas.items()}
+
+def agregar_mensal(df_validos, prefixo):
+    """
+    Agrupamento Mensal (soma dos centavos por Mes_Ano), indexado por período.
+    Não altera df_validos nem copia o frame: agrupa a coluna de valor pela série de períodos.
+    """
+    mes_ano = df_validos['Data_Datetime'].dt.to_period('M').rename('Mes_Ano')
+    return df_validos[f'{prefixo}_Centavos'].groupby(mes_ano).sum().to_frame(f'Total_{prefixo}')
 
-    # 1. Consolidação Mensal de Vendas
-    df_vendas_mensal = df_vendas_bruto.copy()
-    df_vendas_mensal['Mes_Ano'] = df_vendas_mensal['Data_Datetime'].dt.to_period('M')
-    df_vendas_mensal = df_vendas_mensal.groupby('Mes_Ano')['Vendas_Float'].sum().reset_index().set_index('Mes_Ano')
-    df_vendas_mensal.columns = ['Total_Vendas']
+def carregar_tabelas_brutas(gc, sheet_id=ID_PLANILHA_UNICA):
+    """Vendas e gastos tratados (abas brutas, via cache local). Retorna (df_vendas_bruto, df_gastos_bruto)."""
+    # Abre a planilha UMA vez e busca VENDAS + GASTOS na mesma requisição
+    abas = ABAS_TRATADAS
+    try:
+        planilha = abrir_planilha(gc, sheet_id)
+        dfs = carregar_abas_tratadas(planilha, sheet_id, abas)
+    except WorksheetNotFound as e:
+        print(f"ERRO CRÍTICO: Aba '{ABA_VENDAS}' ou '{ABA_GASTOS}' não encontrada! ({e})")
+        dfs = {}
+    except Exception as e:
+        print(f"ERRO ao carregar {ABA_VENDAS}/{ABA_GASTOS}: {e}")
+        dfs = {}
     
-    # 2. Combinar
-    df_combinado = pd.merge(
-        df_vendas_mensal, 
-        df_gastos_mensal, 
-        left_index=True, 
-        right_index=True, 
-        how='outer' 
-    ).fillna(0) 
+    for aba_nome in abas:
+        if dfs.get(aba_nome) is None or dfs[aba_nome].empty:
+            print(f"Alerta: Planilha {aba_nome} está vazia.")
+            dfs[aba_nome] = pd.DataFrame()
+    
+    if dfs[ABA_VENDAS].empty or dfs[ABA_GASTOS].empty:
+        raise ValueError("Dados insuficientes para análise de Lucro (Vendas ou Gastos estão vazios).")
+    return dfs[ABA_VENDAS], dfs[ABA_GASTOS]
 
+def combinar_mensal(df_vendas_bruto, df_gastos_bruto):
+    """Frame mensal (Total_Vendas, Total_Gastos, Lucro_Liquido, Mes_Ano) a partir das vendas e gastos tratados."""
+    df_gastos_mensal = agregar_mensal(df_gastos_bruto, 'Gastos')
+
+    with etapa('agregacao_mensal') as registro:
+        # 1. Consolidação Mensal de Vendas (em centavos)
+        df_vendas_mensal = agregar_mensal(df_vendas_bruto, 'Vendas')
+        
+        # 2. Combinar
+        df_combinado = pd.merge(
+            df_vendas_mensal, 
+            df_gastos_mensal, 
+            left_index=True, 
+            right_index=True, 
+            how='outer' 
+        ).fillna(0).astype('int64')
+        registro.update(linhas_entrada=len(df_vendas_bruto) + len(df_gastos_bruto), linhas_saida=len(df_combinado))
+
+    # Lucro calculado em centavos; a divisão por 100 é a última operação (totais exatos até o centavo)
     df_combinado['Lucro_Liquido'] = df_combinado['Total_Vendas'] - df_combinado['Total_Gastos']
+    df_combinado = df_combinado / 100
     
     # Prepara o índice (necessário para a lógica de MAE)
     df_combinado = df_combinado.sort_index()
@@ -115,319 +254,350 @@ def carregar_e_combinar_dados(gc):
     if len(df_combinado) < 2: # Mínimo 2 meses para ter uma previsão Naive e cálculo de MAE
         raise ValueError(f"Dados insuficientes para ML: Apenas {len(df_combinado)} meses consolidados. Mínimo de 2 meses é recomendado para o Modelo Naive.")
             
-    return df_combinado, df_vendas_bruto
-
-def treinar_e_prever(df_mensal):
+    return df_combinado
+
+def carregar_e_combinar_dados(gc, sheet_id=ID_PLANILHA_UNICA):
+    """Retorna (df_mensal, df_vendas_bruto) das abas brutas."""
+    df_vendas_bruto, df_gastos_bruto = carregar_tabelas_brutas(gc, sheet_id)
+    return combinar_mensal(df_vendas_bruto, df_gastos_bruto), df_vendas_bruto
+
+def montar_indice_diario(df_vendas_bruto, df_gastos_bruto, sheet_id=ID_PLANILHA_UNICA):
+    """Índice de somas acumuladas diárias (consultas de período em O(1)), salvo no estado para o 'cli.py consulta'."""
+    with etapa('indice_diario') as registro:
+        indice = IndiceDiario.de_frames(df_vendas_bruto, df_gastos_bruto, COLUNA_ITEM_VENDIDO)
+        indice.salvar(caminho_indice_diario(sheet_id))
+        registro.update(linhas_entrada=len(df_vendas_bruto) + len(df_gastos_bruto), linhas_saida=indice.qtd_dias)
+    return indice
+
+def recarregar_indice_diario(sheet_id=ID_PLANILHA_UNICA, gc=None):
+    """Remonta e salva o índice diário a partir das abas brutas (comando 'consulta --recarregar' do cli.py)."""
+    df_vendas_bruto, df_gastos_bruto = carregar_tabelas_brutas(gc or autenticar_gspread(), sheet_id)
+    return montar_indice_diario(df_vendas_bruto, df_gastos_bruto, sheet_id)
+
+def carregar_indice_diario(df_mensal, sheet_id=ID_PLANILHA_UNICA):
+    """Índice diário salvo, só se os totais de todos os meses baterem com df_mensal (senão None: ausente ou desatualizado)."""
+    indice = IndiceDiario.carregar(caminho_indice_diario(sheet_id))
+    if indice is not None and not indice.confere_com_mensal(df_mensal):
+        return None
+    return indice
+
+def reconstruir_indice_diario(gc, df_mensal, sheet_id=ID_PLANILHA_UNICA):
     """
-    Treina o Modelo NAIVE (Previsão da Última Observação).
-    Ideal para séries temporais com poucos dados, estabelecendo um MAE BASELINE.
+    Índice diário salvo ausente ou desatualizado em relação ao resumo mensal: remonta das abas brutas
+    (via cache local) e confere de novo. None se nem assim bater (o dashboard avisa que o comparativo está indisponível).
     """
-    ts = df_mensal.set_index('Mes_Ano')['Lucro_Liquido']
-    
-    # 1. PREVISÃO: A previsão do próximo mês é o valor do último mês.
-    previsao_proximo_mes = ts.iloc[-1] 
-
-    # 2. CÁLCULO DO MAE HISTÓRICO (Baseline Naive)
-    # A previsão histórica (predicoes_historicas) é o valor do mês anterior (shift(1)).
-    predicoes_historicas_naive = ts.shift(1).dropna()
-    
-    # y_real são os valores reais correspondentes (após remover o primeiro NaN do shift)
-    y_real = ts.loc[predicoes_historicas_naive.index]
-
-    mae = mean_absolute_error(y_real, predicoes_historicas_naive)
-    
-    ultimo_lucro_real = ts.iloc[-1]
+    print("Alerta: índice diário salvo ausente ou desatualizado em relação ao resumo mensal. Reconstruindo das abas brutas.")
+    try:
+        indice = recarregar_indice_diario(sheet_id, gc)
+    except Exception as e:
+        print(f"Alerta: não foi possível reconstruir o índice diário ({e}). Comparativo anual indisponível.")
+        return None
+    if not indice.confere_com_mensal(df_mensal):
+        print("Alerta: índice diário das abas brutas não confere com o resumo mensal. Comparativo anual indisponível.")
+        return None
+    return indice
+
+def conferir_indice_diario(sheet_id=ID_PLANILHA_UNICA):
+    """
+    Comando 'consulta' do cli.py: confere o índice salvo com o resumo mensal e o remonta das abas brutas
+    se estiver ausente ou desatualizado. Sem resumo mensal, remonta direto das abas brutas.
+    """
+    gc = autenticar_gspread()
+    df_mensal, _ = carregar_resumo_mensal(gc, sheet_id) if USAR_RESUMO_MENSAL else (None, None)
+    if df_mensal is None:
+        recarregar_indice_diario(sheet_id, gc)
+    elif carregar_indice_diario(df_mensal, sheet_id) is None:
+        reconstruir_indice_diario(gc, df_mensal, sheet_id)
+
+def reconstruir_resumo_mensal(planilha, sheet_id=ID_PLANILHA_UNICA):
+    """
+    Refaz o resumo mensal das abas brutas (via cache local) + histórico importado de CSV, com as
+    linhas de controle, e o republica na aba RESUMO_MENSAL: o backup volta a somar deltas a ele.
+    """
+    dfs = carregar_abas_tratadas(planilha, sheet_id, ABAS_TRATADAS)
+    partes = [ler_resumo_importado(planilha)]
+    for aba_nome, (_, prefixo, _) in ABAS_TRATADAS.items():
+        df_validos = dfs.get(aba_nome)
+        meta = ler_meta_cache(sheet_id, aba_nome)
+        if df_validos is None or df_validos.empty or meta is None:
+            # Aba vazia ou sem cache gravado: conta as linhas pela coluna A
+            total_linhas = max(com_retentativa(contar_linhas_aba, planilha, aba_nome) - 1, 0)
+        else:
+            total_linhas = meta['total_linhas']
+        partes += [resumir_validos(df_validos if df_validos is not None else pd.DataFrame(), aba_nome, prefixo),
+                   cobertura_resumo(aba_nome, total_linhas)]
     
-    return previsao_proximo_mes, mae, ultimo_lucro_real
+    df_resumo = combinar_resumos(*partes)
+    com_retentativa(sobrescrever_aba, planilha, ABA_RESUMO, resumo_para_linhas(df_resumo))
+    print(f"Aba '{ABA_RESUMO}' reconstruída das abas brutas e republicada ({len(df_resumo)} linhas).")
+    return df_resumo
 
-def analisar_metricas_negocio(df_vendas_bruto, ano_foco):
-    """Calcula KPIs de negócio filtrando pelo ano de foco."""
-    df_filtrado = df_vendas_bruto[
-        df_vendas_bruto['Data_Datetime'].dt.year == ano_foco
-    ].copy()
+def carregar_resumo_mensal(gc, sheet_id=ID_PLANILHA_UNICA):
+    """
+    Fast path: lê só a aba RESUMO_MENSAL (poucas dezenas de linhas), sem tocar nas abas brutas,
+    e confere as linhas de controle com o fim de cada aba bruta (duas linhas por aba). Se não
+    bater (delta do backup perdido, resumo antigo), reconstrói e republica o resumo antes de usá-lo.
+    Retorna (df_mensal, df_resumo) ou (None, None) se o resumo não existir ou for insuficiente.
+    """
+    try:
+        planilha = abrir_planilha(gc, sheet_id)
+        linhas = ler_intervalos(planilha, [intervalo(ABA_RESUMO)], valores_brutos=True)[0]
+    except WorksheetNotFound:
+        print(f"Aba '{ABA_RESUMO}' não encontrada. Usando as abas brutas.")
+        return None, None
     
-    if df_filtrado.empty:
-        return f"N/A ({ano_foco} sem dados)", f"N/A ({ano_foco} sem dados)"
-        
-    # Verifica a existência das colunas
-    if COLUNA_COMPRADOR not in df_filtrado.columns or COLUNA_ITEM_VENDIDO not in df_filtrado.columns:
-        return "N/A (Colunas Faltantes)", "N/A (Colunas Faltantes)"
-        
-    # Melhor Comprador
-    comprador_df = df_filtrado.groupby(COLUNA_COMPRADOR)['Vendas_Float'].sum().reset_index()
-    if comprador_df.empty: return "N/A (Dados vazios)", "N/A (Dados vazios)"
-    melhor_comprador = comprador_df.sort_values(by='Vendas_Float', ascending=False).iloc[0]
+    df_resumo = linhas_para_resumo(linhas)
+    divergentes = cobertura_confere(planilha, df_resumo)
+    if divergentes:
+        print(f"Alerta: aba '{ABA_RESUMO}' não confere com {', '.join(divergentes)} (delta do backup perdido ou resumo antigo). "
+              "Reconstruindo a partir das abas brutas.")
+        df_resumo = reconstruir_resumo_mensal(planilha, sheet_id)
+    df_mensal = mensal_do_resumo(df_resumo)
+    if len(df_mensal) < 2:
+        print(f"Aba '{ABA_RESUMO}' com {len(df_mensal)} meses. Usando as abas brutas.")
+        return None, None
     
-    # Sabor/Produto Mais Vendido
-    produto_df = df_filtrado.groupby(COLUNA_ITEM_VENDIDO)['Vendas_Float'].sum().reset_index()
-    produto_mais_vendido = produto_df.sort_values(by='Vendas_Float', ascending=False).iloc[0]
-
-    resultado_comprador = (
-        f"{melhor_comprador[COLUNA_COMPRADOR]} ({format_brl(melhor_comprador['Vendas_Float'])})"
-    )
-    resultado_produto = (
-        f"{produto_mais_vendido[COLUNA_ITEM_VENDIDO]} ({format_brl(produto_mais_vendido['Vendas_Float'])})"
-    )
-
-    return resultado_comprador, resultado_produto
+    return df_mensal, df_resumo
 
-def gerar_tabela_auditoria(df_mensal):
-    """Gera o HTML da tabela histórica de Lucro, Vendas e Gastos (COMPLETA)."""
-    table_rows = ""
-    for index, row in df_mensal.iterrows():
-        lucro = row['Lucro_Liquido']
-        lucro_class = 'lucro-positivo-dark' if lucro >= 0 else 'lucro-negativo-dark'
-        mes_formatado = row['Mes_Ano'].strftime('%Y-%m')
-        
-        table_rows += f"""
-        <tr class="{lucro_class}">
-            <td>{mes_formatado}</td>
-            <td>{format_brl(row['Total_Vendas'])}</td>
-            <td>{format_brl(row['Total_Gastos'])}</td>
-            <td>{format_brl(lucro)}</td>
-        </tr>
-        """
-    return table_rows
-
-def gerar_html_balanco_grafico(df_dados, titulo_secao):
-    """Gera o HTML da tabela de balanço mensal com barras visuais."""
-    lucro_html = ""
-    if df_dados.empty: return f"<p>Não há dados de Lucro Mensal para {titulo_secao}.</p>"
-        
-    df_dados['Lucro_Abs'] = df_dados['Lucro_Liquido'].abs()
-    max_lucro = df_dados['Lucro_Abs'].max()
-
-    for index, row in df_dados.iterrows():
-        lucro = row['Lucro_Liquido']
-        cor_barra = '#006400' if lucro >= 0 else '#9c0000' 
-        largura = (row['Lucro_Abs'] / max_lucro) * 100 if max_lucro > 0 else 0 
-        mes_formatado = row['Mes_Ano'].strftime('%b/%Y') 
-
-        lucro_html += f"""
-        <tr>
-            <td>{mes_formatado}</td>
-            <td>
-                <div style="background-color: #2c2c2c; border-radius: 4px; overflow: hidden; height: 20px; text-align: left;">
-                    <div style="width: {largura}%; background-color: {cor_barra}; height: 100%; text-align: right; line-height: 20px; color: white; padding-right: 5px; box-sizing: border-box;">
-                        {format_brl(lucro)}
-                    </div>
-                </div>
-            </td>
-        </tr>
-        """
-        
-    html_final = f"""
-    <table>
-        <thead>
-            <tr>
-                <th style="width: 20%;">Mês/Ano</th>
-                <th>Lucro Líquido (Visualização)</th>
-            </tr>
-        </thead>
-        <tbody>
-            {lucro_html}
-        </tbody>
-    </table>
+def montar_cubo_vendas(df_vendas_bruto, sheet_id=ID_PLANILHA_UNICA):
     """
-    return html_final
-
-def montar_dashboard_ml(previsao, mae, ultimo_valor_real, df_historico, melhor_comprador_atual, produto_mais_vendido_atual, melhor_comprador_ant, produto_mais_vendido_ant, ano_ant, ano_atual):
+    Cubo de receita reaproveitando o da última execução (cache local). Se as vendas em cache só
+    ganharam linhas no fim (mesma geração e pelo menos as mesmas linhas), agrega apenas as linhas
+    novas e soma ao cubo salvo: só os meses dessas linhas são recalculados. Senão, agrega tudo.
+    """
+    nome_cache = f"{sheet_id}__CUBO_VENDAS"
+    meta_vendas = ler_meta_cache(sheet_id, ABA_VENDAS)
+    df_cubo, meta_cubo = ler_frame(nome_cache) if meta_vendas else (None, None)
     
-    # Lógica de Insight da Previsão
-    diferenca = previsao - ultimo_valor_real
-    if previsao < 0:
-        insight = f"🚨 **Previsão de PREJUÍZO!** Lucro negativo de {format_brl(abs(previsao))} esperado. Hora de cortar o cafezinho."
-        cor = "#9c0000" 
-    elif diferenca > (ultimo_valor_real * 0.10):
-        insight = f"🚀 **Crescimento de Lucro Esperado!** Aumento de {format_brl(diferenca)}. Suas vendas estão no *hype*!"
-        cor = "#006400" 
-    elif diferenca < -(ultimo_valor_real * 0.10):
-        insight = f"⚠️ **Risco de Queda de Lucro!** Retração de {format_brl(abs(diferenca))} esperada. Analise seus custos ou chame o Batman!"
-        cor = "#b8860b" 
+    if meta_cubo and meta_vendas.get('geracao') and meta_cubo.get('geracao') == meta_vendas['geracao'] and meta_cubo['linhas'] <= len(df_vendas_bruto):
+        df_novas = df_vendas_bruto.iloc[meta_cubo['linhas']:]
+        cubo = CuboVendas.de_cubo(df_cubo.set_index(NIVEIS_CUBO)['centavos']).somar_vendas(df_novas)
+        meses = sorted(df_novas['Data_Datetime'].dt.strftime('%Y-%m').unique())
+        print(f"Cubo de receita: {len(df_novas)} vendas novas somadas ao cubo salvo (meses recalculados: {', '.join(meses) or 'nenhum'}).")
     else:
-        insight = f"➡️ **Estabilidade Esperada.** Lucro projetado próximo ao mês passado. Nem frio, nem quente."
-        cor = "#005a8d" 
+        cubo = CuboVendas.de_vendas_brutas(df_vendas_bruto)
     
-    texto_box_cor = "white"
+    if meta_vendas and cubo.cubo is not None:
+        gravar_frame(nome_cache, cubo.cubo.rename('centavos').reset_index(), {'geracao': meta_vendas.get('geracao'), 'linhas': len(df_vendas_bruto)})
+    return cubo
 
-    tabela_auditoria_html = gerar_tabela_auditoria(df_historico)
+def treinar_e_prever(df_mensal):
+    """
+    Backtesting com origem móvel de vários modelos (Naive, Naive Sazonal, Médias Móveis,
+    Suavização Exponencial, Tendência Linear) e escolha automática do menor MAE fora da amostra.
+    Retorna (previsão do próximo mês, MAE do modelo escolhido, último lucro real, leaderboard).
+    """
+    ts = df_mensal.set_index('Mes_Ano')['Lucro_Liquido']
     
-    # --- GOVERNANÇA DE IA: ANÁLISE DO MAE (O Sargento do Controle) ---
-    lucro_liquido_medio = df_historico['Lucro_Liquido'].mean()
-    limite_mae = abs(lucro_liquido_medio * TOLERANCIA_MAE_PERCENTUAL)
+    # 1. BACKTEST: MAE fora da amostra de cada modelo, por horizonte
+    leaderboard = executar_backtest(ts.to_numpy())
+    modelo_escolhido = leaderboard.index[0]
+    mae = leaderboard.iloc[0][f'MAE_h{HORIZONTES_BACKTEST[0]}']
     
-    # Lógica de Alerta
-    if mae > limite_mae:
-        mae_status = f"🚨 **MAE ALTO!** O erro médio ({format_brl(mae)}) é maior que a tolerância de {format_brl(limite_mae)}. O modelo está apenas dando um palpite chique."
-        mae_cor = "red" 
-    else:
-        mae_status = f"✅ **MAE ACEITÁVEL.** O erro médio está dentro da margem de {format_brl(limite_mae)}. Siga usando, mas monitore!"
-        mae_cor = "#006400" 
+    # 2. PREVISÃO: o modelo vencedor projeta o próximo mês com o histórico completo
+    previsao_proximo_mes = prever_proximo(ts.to_numpy(), modelo_escolhido)
+    
+    ultimo_lucro_real = ts.iloc[-1]
     
-    # --- GERAÇÃO DOS GRÁFICOS DE BALANÇO ---
-    df_balanco_anterior = df_historico[df_historico['Mes_Ano'].dt.year == ano_ant].copy()
-    html_balanco_anterior = gerar_html_balanco_grafico(df_balanco_anterior, f"o Ano de {ano_ant}")
+    return previsao_proximo_mes, mae, ultimo_lucro_real, leaderboard
 
-    df_balanco_atual = df_historico[df_historico['Mes_Ano'].dt.year == ano_atual].copy()
-    html_balanco_atual = gerar_html_balanco_grafico(df_balanco_atual, f"o Ano de {ano_atual}")
+def analisar_metricas_negocio(cubo, ano_foco):
+    """Calcula KPIs de negócio do ano de foco a partir do cubo de receita (sem reprocessar dados brutos)."""
+    if cubo.colunas_faltantes:
+        return "N/A (Colunas Faltantes)", "N/A (Colunas Faltantes)"
     
+    # Melhor Comprador e Sabor/Produto Mais Vendido: top-1 de cada marginal
+    melhor_comprador = cubo.top(DIMENSAO_COMPRADOR, n=1, ano=ano_foco)
+    produto_mais_vendido = cubo.top(DIMENSAO_SABOR, n=1, ano=ano_foco)
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Dashboard ML Insights - Previsão de Lucro Líquido</title>
-         <style>
-            /* --- ESTILOS DARK MODE EXCLUSIVO --- */
-            body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #121212; color: #e0e0e0; }}
-            .container {{ max-width: 900px; margin: auto; background: #1e1e1e; padding: 20px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.5); }}
-            h2 {{ color: #bb86fc; border-bottom: 2px solid #bb86fc; padding-bottom: 10px; }}
-            h3 {{ color: #03dac6; margin-top: 25px; }}
-            
-            .metric-box {{ padding: 20px; margin-bottom: 20px; border-radius: 8px; background-color: {cor}; color: {texto_box_cor}; text-align: center; }}
-            .metric-box h3 {{ margin-top: 0; font-size: 1.5em; }}
-            .metric-box p {{ font-size: 2.5em; font-weight: bold; }}
-            
-            .info-box {{ padding: 10px; border: 1px dashed #444; background-color: #2c2c2c; margin-top: 15px; }}
-            
-            table {{ width: 100%; border-collapse: collapse; margin-top: 15px; }}
-            th, td {{ padding: 10px; border: 1px solid #333; text-align: left; }}
-            th {{ background-color: #3700b3; color: white; }}
-            
-            .lucro-positivo-dark {{ background-color: #1f311f; color: #c7ecc7; }} 
-            .lucro-negativo-dark {{ background-color: #3b1f1f; color: #ffbaba; }} 
-            
-            .metric-card {{ background: #2c2c2c; padding: 15px; border-radius: 6px; box-shadow: 0 2px 4px rgba(0,0,0,0.2); margin-top: 10px; }}
-            .metric-card h4 {{ color: #03dac6; margin-top: 0; }}
-            .metric-card p {{ font-size: 1.1em; font-weight: bold; color: #e0e0e0; }}
-            .grid-2 {{ display: grid; grid-template-columns: repeat(2, 1fr); gap: 20px; margin-top: 20px; }}
-            a {{ color: #bb86fc; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h2>🔮 Insights de Machine Learning e Negócios</h2>
-            <p>Modelo: **NAIVE (Última Observação)** - Focado em Estabilidade. Data: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}. Foco do ML: Previsão de {ano_atual}.</p>
-            
-            <div class="metric-box">
-                <h3>Lucro Líquido Projetado para o Próximo Mês</h3>
-                <p>{format_brl(previsao)}</p>
-            </div>
-            
-            <div class="info-box">
-                <h4>Insight da Previsão:</h4>
-                <p>{insight}</p>
-            </div>
-
-            <div class="info-box" style="border: 1px dashed {mae_cor};">
-                <h4>Métricas de Qualidade (Governança de IA)</h4>
-                <p>Lucro Real Mês Passado: **{format_brl(ultimo_valor_real)}**</p>
-                <p>Erro Absoluto Médio Histórico (MAE): **{format_brl(mae)}**</p> 
-                <p style="color: {mae_cor}; font-weight: bold;">Status da Governança: {mae_status}</p>
-            </div>
-            
-            <hr style="margin-top: 30px; border-color: #3700b3;">
+    if melhor_comprador.empty and produto_mais_vendido.empty:
+        return f"N/A ({ano_foco} sem dados)", f"N/A ({ano_foco} sem dados)"
+    if melhor_comprador.empty or produto_mais_vendido.empty:
+        return "N/A (Dados vazios)", "N/A (Dados vazios)"
 
-            <h2>🏺 Baú de Memórias - Performance de {ano_ant}</h2>
-            
-            <h3>Resumo de KPIs Chave ({ano_ant})</h3>
-            <div class="grid-2">
-                 <div class="metric-card">
-                    <h4>Melhor Comprador Histórico ({ano_ant})</h4>
-                    <p>{melhor_comprador_ant}</p>
-                </div>
-                 <div class="metric-card">
-                    <h4>Sabor Mais Vendido Histórico ({ano_ant})</h4>
-                    <p>{produto_mais_vendido_ant}</p>
-                </div>
-            </div>
-            
-            <h3>Balanço Mensal Detalhado de Lucro Líquido ({ano_ant})</h3>
-            {html_balanco_anterior}
-            
-            <hr style="margin-top: 30px; border-color: #3700b3;">
+    resultado_comprador = f"{melhor_comprador.index[0]} ({format_brl(melhor_comprador.iloc[0])})"
+    resultado_produto = f"{produto_mais_vendido.index[0]} ({format_brl(produto_mais_vendido.iloc[0])})"
 
-            
-            <h2>🏆 Principais Indicadores de Negócio ({ano_atual})</h2>
-            <p>Métricas de negócio baseadas nos dados brutos do ano corrente, essenciais para tomada de decisão AGORA.</p>
-            <div class="grid-2">
-                 <div class="metric-card">
-                    <h4>Melhor Comprador (Receita Gerada)</h4>
-                    <p>{melhor_comprador_atual}</p>
-                </div>
-                 <div class="metric-card">
-                    <h4>Sabor Mais Vendido (Receita Gerada)</h4>
-                    <p>{produto_mais_vendido_atual}</p>
-                </div>
-            </div>
-
-            <h2>📈 Análise de Lucro Mensal (Foco em {ano_atual})</h2>
-            {html_balanco_atual}
-            
-            <h2>📊 Tabela de Auditoria Histórica (Base do ML)</h2>
-            <p>Estes são os dados consolidados de Vendas e Gastos utilizados para treinar o modelo de previsão.</p>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Mês/Ano</th>
-                        <th>Vendas Totais</th>
-                        <th>Gastos Totais</th>
-                        <th>Lucro Líquido (Vendas - Gastos)</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {tabela_auditoria_html}
-                </tbody>
-            </table>
-
-            <p style="margin-top: 20px; font-size: 0.9em; color: #777;">Dashboard hospedado em: <a href="{URL_DASHBOARD}" target="_blank">{URL_DASHBOARD}</a></p>
-        </div>
-    </body>
-    </html>
+    return resultado_comprador, resultado_produto
+
+def carregar_mensal_e_cubo(gc, df_mensal=None, df_resumo=None, sheet_id=ID_PLANILHA_UNICA):
     """
+    Retorna (df_mensal, cubo, ano_atual, indice): do resumo mensal já lido (df_mensal e df_resumo de
+    carregar_resumo_mensal) ou, sem ele, das abas brutas. O índice diário é montado das abas brutas;
+    no fast path vale o salvo (última carga bruta + lotes do backup) se ainda bater com o resumo, senão
+    é remontado das abas brutas (None só se nem assim bater).
+    """
+    if df_mensal is not None:
+        print(f"Fast path: {len(df_mensal)} meses lidos da aba '{ABA_RESUMO}'.")
+        ano_atual = df_mensal.loc[df_mensal['Total_Vendas'] != 0, 'Mes_Ano'].dt.year.max()
+        with etapa('cubo_receita'):
+            cubo = CuboVendas.de_resumo(df_resumo)
+        indice = carregar_indice_diario(df_mensal, sheet_id)
+        if indice is None:
+            indice = reconstruir_indice_diario(gc, df_mensal, sheet_id)
+        return df_mensal, cubo, ano_atual, indice
+    
+    df_vendas_bruto, df_gastos_bruto = carregar_tabelas_brutas(gc, sheet_id)
+    df_mensal = combinar_mensal(df_vendas_bruto, df_gastos_bruto)
+    ano_atual = df_vendas_bruto['Data_Datetime'].dt.year.max()
+    with etapa('cubo_receita') as registro:
+        cubo = montar_cubo_vendas(df_vendas_bruto, sheet_id)
+        registro['linhas_entrada'] = len(df_vendas_bruto)
+    indice = montar_indice_diario(df_vendas_bruto, df_gastos_bruto, sheet_id)
+    return df_mensal, cubo, ano_atual, indice
+
+def calcular_argumentos_dashboard(df_mensal, cubo, ano_atual, indice=None):
+    """Previsão por série, backtest e KPIs: os argumentos de montar_dashboard_ml (nada é gravado em disco)."""
+    # Previsão em lote por sabor e por comprador (matriz séries x meses, em blocos)
+    df_previsoes_series = None
+    if PREVER_POR_SERIE and not cubo.colunas_faltantes:
+        with etapa('previsao_series') as registro:
+            df_previsoes_series = prever_series(cubo)
+            registro['linhas_saida'] = len(df_previsoes_series)
     
-    with open(OUTPUT_HTML, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Identificação dos Anos
+    ano_ant = ano_atual - 1 
+
+    with etapa('treinar_e_prever') as registro:
+        previsao, mae, ultimo_lucro_real, leaderboard = treinar_e_prever(df_mensal)
+        registro['linhas_entrada'] = len(df_mensal)
+
+    # Cenários de lucro (Monte Carlo): faixas de quantis e probabilidade de prejuízo por mês
+    df_cenarios = None
+    if SIMULAR_CENARIOS:
+        with etapa('simulacao_cenarios') as registro:
+            df_cenarios = simular_cenarios(df_mensal)
+            registro['linhas_entrada'] = len(df_mensal)
+
+    with etapa('metricas_negocio'):
+        # KPI 1: Métricas de Negócio (Ano Corrente)
+        melhor_comprador_atual, produto_mais_vendido_atual = analisar_metricas_negocio(cubo, ano_atual)
+    
+        # KPI 2: Métricas de Negócio (Ano Anterior - BAÚ DE MEMÓRIAS)
+        melhor_comprador_ant, produto_mais_vendido_ant = analisar_metricas_negocio(cubo, ano_ant)
+
+    # Comparativo com o ano anterior (acumulado do ano e janela recente): quatro leituras no índice diário
+    comparativo_anual = comparativos_anuais(indice) if indice is not None else None
+
+    return dict(
+        previsao=previsao,
+        mae=mae,
+        ultimo_valor_real=ultimo_lucro_real,
+        df_historico=df_mensal,
+        melhor_comprador_atual=melhor_comprador_atual,
+        produto_mais_vendido_atual=produto_mais_vendido_atual,
+        melhor_comprador_ant=melhor_comprador_ant,
+        produto_mais_vendido_ant=produto_mais_vendido_ant,
+        ano_ant=ano_ant,
+        ano_atual=ano_atual,
+        cubo=cubo,
+        leaderboard=leaderboard,
+        df_previsoes_series=df_previsoes_series,
+        df_cenarios=df_cenarios,
+        comparativo_anual=comparativo_anual,
+    )
 
+def carregar_argumentos_dashboard(gc, sheet_id=ID_PLANILHA_UNICA):
+    """Carga completa (resumo mensal ou abas brutas) até os argumentos do dashboard, sem gravar saídas. Usado pelo serviço."""
+    df_mensal, df_resumo = carregar_resumo_mensal(gc, sheet_id) if USAR_RESUMO_MENSAL else (None, None)
+    df_mensal, cubo, ano_atual, indice = carregar_mensal_e_cubo(gc, df_mensal, df_resumo, sheet_id)
+    if df_mensal.empty:
+        raise ValueError("Execução ML interrompida por falta de dados históricos.")
+    return calcular_argumentos_dashboard(df_mensal, cubo, ano_atual, indice)
 
 # --- EXECUÇÃO PRINCIPAL ---
-if __name__ == "__main__":
-    try:
-        gc = autenticar_gspread()
-        
-        df_mensal, df_vendas_bruto = carregar_e_combinar_dados(gc) 
-        
-        if not df_mensal.empty:
-            
-            # Identificação dos Anos
-            ano_atual = df_vendas_bruto['Data_Datetime'].dt.year.max()
-            ano_ant = ano_atual - 1 
+def executar_predicao(gc, sheet_id=ID_PLANILHA_UNICA, saida_html=OUTPUT_HTML, arquivo_snapshot=ARQUIVO_SNAPSHOT,
+                      arquivo_previsoes=ARQUIVO_PREVISOES_SERIES, arquivo_manifesto=ARQUIVO_MANIFESTO):
+    """
+    Carga, modelos, KPIs e dashboard de um Histórico. Os padrões são os da loja única; o agendador
+    de lojas.py passa a planilha e os arquivos de cada loja.
+    Retorna {'situacao': 'pulada' | 'concluida' | 'sem_dados', ...}. Erros sobem para quem chamou.
+    """
+    manifesto = ler_manifesto(arquivo_manifesto)
 
-            previsao, mae, ultimo_lucro_real = treinar_e_prever(df_mensal)
-            
-            # KPI 1: Métricas de Negócio (Ano Corrente)
-            melhor_comprador_atual, produto_mais_vendido_atual = analisar_metricas_negocio(df_vendas_bruto, ano_atual)
-            
-            # KPI 2: Métricas de Negócio (Ano Anterior - BAÚ DE MEMÓRIAS)
-            melhor_comprador_ant, produto_mais_vendido_ant = analisar_metricas_negocio(df_vendas_bruto, ano_ant)
-
-            montar_dashboard_ml(
-                previsao, 
-                mae, 
-                ultimo_lucro_real, 
-                df_mensal,
-                melhor_comprador_atual,
-                produto_mais_vendido_atual,
-                melhor_comprador_ant,
-                produto_mais_vendido_ant,
-                ano_ant,
-                ano_atual
-            )
+    # Fast path (resumo mensal materializado) ou caminho completo (abas brutas)
+    with etapa('carregar_resumo_mensal') as registro:
+        df_mensal, df_resumo = carregar_resumo_mensal(gc, sheet_id) if USAR_RESUMO_MENSAL else (None, None)
+        registro['linhas_saida'] = len(df_resumo) if df_resumo is not None else 0
+
+    # Impressão digital barata das fontes: o resumo inteiro (poucas linhas) ou a marca d'água das abas brutas
+    with etapa('impressao_digital'):
+        if df_mensal is not None:
+            impressao = impressao_digital({ABA_RESUMO: hash_linhas(resumo_para_linhas(df_resumo))})
         else:
-            print("Execução ML interrompida por falta de dados históricos.")
-            
+            # Sem manifesto não há com o que comparar: nem faz a leitura extra da cauda
+            impressao_abas = impressao_abas_brutas(gc, sheet_id=sheet_id) if manifesto else None
+            impressao = impressao_digital(impressao_abas) if impressao_abas else None
+
+    if fontes_inalteradas(manifesto, impressao, arquivos_dashboard(saida_html)):
+        print(f"Fontes inalteradas desde {manifesto.get('gerado_em')}: carga, modelos e dashboard pulados.")
+        return {'situacao': 'pulada', 'gerado_em': manifesto.get('gerado_em')}
+
+    df_mensal, cubo, ano_atual, indice = carregar_mensal_e_cubo(gc, df_mensal, df_resumo, sheet_id)
+    if df_resumo is None:
+        # Depois da carga a marca d'água está no cache (mesma impressão que a próxima execução vai calcular)
+        impressao_abas = impressao_abas_em_cache(sheet_id=sheet_id)
+        impressao = impressao_digital(impressao_abas) if impressao_abas else None
+
+    meses = totais_por_mes(df_mensal)
+    alterados = None
+    if manifesto:
+        alterados = meses_alterados(manifesto, meses)
+        print(f"Meses alterados desde a última execução: {', '.join(alterados) or 'nenhum'}.")
+
+    if df_mensal.empty:
+        print("Execução ML interrompida por falta de dados históricos.")
+        return {'situacao': 'sem_dados'}
+
+    argumentos_dashboard = calcular_argumentos_dashboard(df_mensal, cubo, ano_atual, indice)
+
+    df_previsoes_series = argumentos_dashboard['df_previsoes_series']
+    if df_previsoes_series is not None:
+        gravar_previsoes_series(df_previsoes_series, arquivo_previsoes)
+        print(f"Previsões por série: {len(df_previsoes_series)} séries gravadas.")
+
+    with etapa('renderizacao'):
+        montar_dashboard_ml(**argumentos_dashboard, destino=saida_html)
+
+    # Snapshot das entradas: 'python cli.py render' regera a página sem tocar na planilha
+    gravar_snapshot_dashboard(**argumentos_dashboard, caminho=arquivo_snapshot)
+
+    # Manifesto só depois do dashboard gravado: uma execução que falhou é refeita na próxima
+    if impressao is not None:
+        gravar_manifesto(impressao, meses, arquivo_manifesto)
+
+    return {
+        'situacao': 'concluida',
+        'meses': len(df_mensal),
+        'meses_alterados': alterados,
+        'previsao': float(argumentos_dashboard['previsao']),
+        'ultimo_lucro_real': float(argumentos_dashboard['ultimo_valor_real']),
+    }
+
+def gravar_pagina_erro(erro, saida_html=OUTPUT_HTML, arquivo_manifesto=ARQUIVO_MANIFESTO):
+    """Substitui o dashboard pela página de erro e invalida o manifesto (a próxima execução não pode pular)."""
+    invalidar_manifesto(arquivo_manifesto)
+    with open(saida_html, 'w', encoding='utf-8') as f:
+         f.write(f"<html><body><h2>Erro Crítico na Geração do ML Dashboard</h2><p>Detalhes: {html.escape(str(erro))}</p><p>Ação: Verifique o ID da Planilha, as permissões de acesso do Service Account, ou os nomes das abas/colunas: VENDAS e GASTOS.</p></body></html>")
+
+def main():
+    """Carga, modelos, KPIs e dashboard (chamado pelo script e pelo comando 'predict' do cli.py)."""
+    iniciar_execucao('predicao_ml')
+    fontes_sem_mudanca = False
+    try:
+        resultado = executar_predicao(autenticar_gspread())
+        fontes_sem_mudanca = resultado['situacao'] == 'pulada'
     except Exception as e:
         error_message = str(e)
         print(f"ERRO CRÍTICO NA EXECUÇÃO DO ML: {error_message}")
-        with open(OUTPUT_HTML, 'w', encoding='utf-8') as f:
-             f.write(f"<html><body><h2>Erro Crítico na Geração do ML Dashboard</h2><p>Detalhes: {error_message}</p><p>Ação: Verifique o ID da Planilha, as permissões de acesso do Service Account, ou os nomes das abas/colunas: VENDAS e GASTOS.</p></body></html>")
+        gravar_pagina_erro(error_message)
+    finally:
+        # Relatório de execução (com INSTRUMENTACAO=true), inclusive quando a execução falha.
+        # Execução pulada não regrava nada (o workflow não tem o que comitar).
+        if not fontes_sem_mudanca:
+            gravar_relatorio_execucao()
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtesting import MODELOS, selecionar_modelos, origens_comuns, erros_absolutos
+from resumo_mensal import DIMENSAO_COMPRADOR, DIMENSAO_SABOR
+
+# --- PREVISÃO POR SÉRIE (SABOR E COMPRADOR) ---
+# Milhares de séries curtas: a receita mensal de cada chave vira uma linha da matriz densa
+# (séries x meses) e todos os modelos do backtest rodam sobre blocos inteiros de linhas de uma vez.
+PREVER_POR_SERIE = os.environ.get('PREVER_POR_SERIE', 'true').lower() == 'true'
+
+# Séries por bloco: limita a memória das matrizes intermediárias (previsões/erros por modelo)
+TAMANHO_BLOCO_SERIES = int(os.environ.get('TAMANHO_BLOCO_SERIES', '2000'))
+
+ARQUIVO_PREVISOES_SERIES = os.environ.get('ARQUIVO_PREVISOES_SERIES', 'previsoes_series.csv.gz')
+COLUNAS_PREVISOES = ['DIMENSAO', 'CHAVE', 'MODELO', 'ULTIMO_MES', 'PREVISAO', 'VARIACAO', 'MAE']
+# --------------------------------------------------------------------------------
+
+
+def _periodos(serie_marginal):
+    """Índice mensal (ano * 12 + mês - 1) de cada linha de uma marginal (ano, mes, chave)."""
+    anos = serie_marginal.index.get_level_values('ano').to_numpy(dtype='int64')
+    meses = serie_marginal.index.get_level_values('mes').to_numpy(dtype='int64')
+    return anos * 12 + meses - 1
+
+
+def intervalo_periodos(marginais):
+    """Primeiro e último mês (índice mensal) presentes em qualquer dimensão do cubo."""
+    periodos = [_periodos(serie) for serie in marginais.values() if not serie.empty]
+    if not periodos:
+        return None
+    return min(p.min() for p in periodos), max(p.max() for p in periodos)
+
+
+def blocos_matriz_series(serie_marginal, primeiro, ultimo, tamanho_bloco=TAMANHO_BLOCO_SERIES):
+    """
+    Pivota a marginal (ano, mes, chave) -> receita em blocos densos (chaves, Y) com
+    Y[série, mês]; meses sem venda valem 0. Só um bloco de séries existe em memória por vez.
+    """
+    codigos, chaves = pd.factorize(serie_marginal.index.get_level_values('chave'), sort=True)
+    colunas = _periodos(serie_marginal) - primeiro
+    valores = serie_marginal.to_numpy(dtype='float64')
+
+    ordem = np.argsort(codigos, kind='stable')
+    codigos, colunas, valores = codigos[ordem], colunas[ordem], valores[ordem]
+    qtd_periodos = ultimo - primeiro + 1
+
+    for inicio in range(0, len(chaves), tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, len(chaves))
+        a, b = np.searchsorted(codigos, [inicio, fim])
+        Y = np.zeros((fim - inicio, qtd_periodos))
+        np.add.at(Y, (codigos[a:b] - inicio, colunas[a:b]), valores[a:b])
+        yield np.asarray(chaves[inicio:fim]), Y
+
+
+def prever_bloco(Y, horizonte=1):
+    """
+    Backtest de todos os modelos elegíveis sobre o bloco e escolha do menor MAE POR SÉRIE.
+    Retorna (índice do modelo escolhido, MAE, previsão), um valor por série. A previsão parte do
+    fim da série (origem = nº de meses, como backtesting.prever_proximo) e vale para `horizonte` meses depois.
+    """
+    modelos = selecionar_modelos(Y.shape[1], horizonte)
+    origens = origens_comuns(Y.shape[1], horizonte, modelos)
+
+    maes = np.column_stack([erros_absolutos(Y, nome, horizonte, origens).mean(axis=1) for nome in modelos])
+    proximo = np.array([Y.shape[1]])
+    previsoes = np.column_stack([MODELOS[nome][0](Y, proximo, horizonte)[:, 0] for nome in modelos])
+
+    escolhido = np.argmin(maes, axis=1)
+    linhas = np.arange(Y.shape[0])
+    return np.asarray(modelos)[escolhido], maes[linhas, escolhido], previsoes[linhas, escolhido]
+
+
+def prever_series(cubo):
+    """
+    Previsão do próximo mês para cada sabor e cada comprador, a partir das marginais do cubo
+    (a mesma agregação de df_vendas_bruto usada nos rankings). Retorna um DataFrame compacto.
+    """
+    limites = intervalo_periodos(cubo.marginais)
+    if limites is None or limites[1] - limites[0] < 1:
+        return pd.DataFrame(columns=COLUNAS_PREVISOES)
+
+    partes = []
+    for dimensao in (DIMENSAO_SABOR, DIMENSAO_COMPRADOR):
+        serie_marginal = cubo.marginais.get(dimensao)
+        if serie_marginal is None or serie_marginal.empty:
+            continue
+        for chaves, Y in blocos_matriz_series(serie_marginal, *limites):
+            modelos, maes, previsoes = prever_bloco(Y)
+            partes.append(pd.DataFrame({
+                'DIMENSAO': dimensao,
+                'CHAVE': chaves,
+                'MODELO': pd.Categorical(modelos, categories=list(MODELOS)),
+                'ULTIMO_MES': Y[:, -1],
+                'PREVISAO': previsoes,
+                'VARIACAO': previsoes - Y[:, -1],
+                'MAE': maes,
+            }))
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_PREVISOES)
+    return pd.concat(partes, ignore_index=True)
+
+
+def gravar_previsoes_series(df_previsoes, caminho=ARQUIVO_PREVISOES_SERIES):
+    """Grava as previsões em CSV comprimido (gzip), valores arredondados a centavos."""
+    df_previsoes.round({'ULTIMO_MES': 2, 'PREVISAO': 2, 'VARIACAO': 2, 'MAE': 2}).to_csv(
+        caminho, index=False, compression='gzip'
+    )
+
+
+def maiores_variacoes(df_previsoes, dimensao, n=10):
+    """Top movers: as n séries da dimensão com maior variação absoluta prevista (nlargest, sem ordenar tudo)."""
+    da_dimensao = df_previsoes[df_previsoes['DIMENSAO'] == dimensao]
+    indices = da_dimensao['VARIACAO'].abs().nlargest(n).index
+    return da_dimensao.loc[indices]
@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- RENDERIZAÇÃO DO DASHBOARD (VETORIZADA E EM STREAMING) ---
+# Linhas da tabela de auditoria geradas/escritas por bloco, sem acumular a página inteira em memória
+TAMANHO_BLOCO_LINHAS = 500
+
+# Meses mais recentes exibidos abertos na auditoria; os anteriores ficam recolhidos por ano
+MESES_AUDITORIA_VISIVEIS = int(os.environ.get('MESES_AUDITORIA_VISIVEIS', '12'))
+
+# Troca de separadores do padrão en-US (1,234.56) para pt-BR (1.234,56) numa passada só
+TABELA_SEPARADORES_BRL = str.maketrans({',': '.', '.': ','})
+# --------------------------------------------------------------------------------
+
+
+def format_brl(value):
+    """Função helper para formatar valores em R$"""
+    value = float(value)
+    return f"R$ {value:,.2f}".replace('.', 'X').replace(',', '.').replace('X', ',')
+
+
+def formatar_brl_serie(valores):
+    """Formata uma coluna inteira em R$ de uma vez (mesmo resultado de format_brl, célula a célula)."""
+    serie = pd.Series(np.asarray(valores, dtype='float64'))
+    return ('R$ ' + serie.map('{:,.2f}'.format).str.translate(TABELA_SEPARADORES_BRL)).to_numpy()
+
+
+def _blocos_linhas_auditoria(df_mensal):
+    """Gera o HTML das linhas de auditoria em blocos de TAMANHO_BLOCO_LINHAS."""
+    for inicio in range(0, len(df_mensal), TAMANHO_BLOCO_LINHAS):
+        bloco = df_mensal.iloc[inicio:inicio + TAMANHO_BLOCO_LINHAS]
+        lucro = bloco['Lucro_Liquido'].to_numpy()
+
+        classes = np.where(lucro >= 0, 'lucro-positivo-dark', 'lucro-negativo-dark')
+        meses = bloco['Mes_Ano'].dt.strftime('%Y-%m').to_numpy()
+        vendas = formatar_brl_serie(bloco['Total_Vendas'])
+        gastos = formatar_brl_serie(bloco['Total_Gastos'])
+        lucros = formatar_brl_serie(lucro)
+
+        yield "".join(
+            f'<tr class="{c}"><td>{m}</td><td>{v}</td><td>{g}</td><td>{l}</td></tr>\n'
+            for c, m, v, g, l in zip(classes, meses, vendas, gastos, lucros)
+        )
+
+
+CABECALHO_AUDITORIA = """
+<table>
+    <thead>
+        <tr>
+            <th>Mês/Ano</th>
+            <th>Vendas Totais</th>
+            <th>Gastos Totais</th>
+            <th>Lucro Líquido (Vendas - Gastos)</th>
+        </tr>
+    </thead>
+    <tbody>
+"""
+RODAPE_AUDITORIA = """
+    </tbody>
+</table>
+"""
+
+
+def escrever_tabela_auditoria(arquivo, df_mensal, meses_visiveis=MESES_AUDITORIA_VISIVEIS):
+    """
+    Escreve a auditoria direto no arquivo, em blocos. Os últimos meses_visiveis meses ficam
+    abertos; os anteriores, recolhidos por ano em <details> (a página não cresce na tela).
+    """
+    anteriores = df_mensal.iloc[:-meses_visiveis] if meses_visiveis else df_mensal.iloc[:0]
+    recentes = df_mensal.iloc[len(anteriores):]
+
+    arquivo.write(CABECALHO_AUDITORIA)
+    for bloco in _blocos_linhas_auditoria(recentes):
+        arquivo.write(bloco)
+    arquivo.write(RODAPE_AUDITORIA)
+
+    if anteriores.empty:
+        return
+
+    arquivo.write(f'<details class="auditoria-anterior"><summary>Meses anteriores ({len(anteriores)} meses)</summary>\n')
+    anos = anteriores['Mes_Ano'].dt.year.to_numpy()
+    for ano in np.unique(anos)[::-1]:
+        do_ano = anteriores[anos == ano]
+        arquivo.write(f'<details><summary>{ano} ({len(do_ano)} meses)</summary>\n')
+        arquivo.write(CABECALHO_AUDITORIA)
+        for bloco in _blocos_linhas_auditoria(do_ano):
+            arquivo.write(bloco)
+        arquivo.write(RODAPE_AUDITORIA)
+        arquivo.write('</details>\n')
+    arquivo.write('</details>\n')
+
+
+def gerar_html_balanco_grafico(df_dados, titulo_secao):
+    """Gera o HTML da tabela de balanço mensal com barras visuais."""
+    if df_dados.empty: return f"<p>Não há dados de Lucro Mensal para {titulo_secao}.</p>"
+
+    lucro = df_dados['Lucro_Liquido'].to_numpy(dtype='float64')
+    max_lucro = np.abs(lucro).max()
+    larguras = (np.abs(lucro) / max_lucro) * 100 if max_lucro > 0 else np.zeros(len(lucro))
+    classes = np.where(lucro >= 0, 'barra-positiva', 'barra-negativa')
+    meses = df_dados['Mes_Ano'].dt.strftime('%b/%Y').to_numpy()
+    valores = formatar_brl_serie(lucro)
+
+    lucro_html = "".join(
+        f'<tr><td>{m}</td><td><div class="barra-fundo"><div class="barra {c}" style="width: {w:.1f}%;">{v}</div></div></td></tr>\n'
+        for m, c, w, v in zip(meses, classes, larguras, valores)
+    )
+
+    html_final = f"""
+    <table>
+        <thead>
+            <tr>
+                <th style="width: 20%;">Mês/Ano</th>
+                <th>Lucro Líquido (Visualização)</th>
+            </tr>
+        </thead>
+        <tbody>
+            {lucro_html}
+        </tbody>
+    </table>
+    """
+    return html_final
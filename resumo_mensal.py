@@ -0,0 +1,229 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from gspread.exceptions import WorksheetNotFound
+
+from acesso_planilhas import com_retentativa, ler_intervalos, ler_abas, intervalo
+from parsing_brl import (
+    parsear_tabela, selecionar_colunas, ABA_VENDAS, ABA_GASTOS, COLUNA_VALOR_VENDA, COLUNA_COMPRADOR,
+    COLUNA_ITEM_VENDIDO, COLUNA_VALOR_GASTO, COLUNA_DATA,
+)
+
+# --- RESUMO MENSAL MATERIALIZADO (ROLLUP) ---
+# Aba mantida pelo backup no Histórico: uma linha TOTAL por mês + subtotais por comprador e por sabor.
+# Valores em centavos (inteiros) para a soma incremental ser exata.
+ABA_RESUMO = "RESUMO_MENSAL"
+COLUNAS_RESUMO = ['MES_ANO', 'DIMENSAO', 'CHAVE', 'VENDAS_CENTAVOS', 'GASTOS_CENTAVOS']
+CHAVES_RESUMO = ['MES_ANO', 'DIMENSAO', 'CHAVE']
+
+DIMENSAO_TOTAL = 'TOTAL'
+DIMENSAO_COMPRADOR = 'COMPRADOR'
+DIMENSAO_SABOR = 'SABOR'
+
+# Linhas de controle (MES_ANO vazio, CHAVE = aba): quantas linhas brutas de cada aba o resumo já somou,
+# na coluna de centavos da própria aba. Backup e predição conferem com as abas antes de confiar no resumo.
+DIMENSAO_LINHAS_BRUTAS = 'LINHAS_BRUTAS'
+
+# Histórico importado de CSV (ingestao_csv) não está nas abas brutas: fica também nesta aba, para
+# entrar de novo quando o resumo for reconstruído a partir delas.
+ABA_RESUMO_IMPORTADO = "RESUMO_IMPORTADO"
+
+# Coluna de valor por aba do Histórico
+COLUNA_VALOR_POR_ABA = {ABA_VENDAS: COLUNA_VALOR_VENDA, ABA_GASTOS: COLUNA_VALOR_GASTO}
+COLUNA_RESUMO_POR_ABA = {ABA_VENDAS: 'VENDAS_CENTAVOS', ABA_GASTOS: 'GASTOS_CENTAVOS'}
+# --------------------------------------------------------------------------------
+
+
+def resumo_vazio():
+    return pd.DataFrame({coluna: pd.Series(dtype='int64' if coluna.endswith('_CENTAVOS') else object) for coluna in COLUNAS_RESUMO})
+
+
+def colunas_da_aba(aba_nome):
+    """(coluna de valor, colunas categóricas) lidas de uma aba do Histórico para o resumo."""
+    categoricas = (COLUNA_COMPRADOR, COLUNA_ITEM_VENDIDO) if aba_nome == ABA_VENDAS else ()
+    return COLUNA_VALOR_POR_ABA[aba_nome], categoricas
+
+
+def rotulos_mes(datas):
+    """'AAAA-MM' de cada data. Formata só os meses distintos (strftime linha a linha domina o custo do resumo)."""
+    codigos, meses = pd.factorize(datas.to_numpy().astype('datetime64[M]'))
+    rotulos = np.asarray(pd.DatetimeIndex(meses).strftime('%Y-%m'), dtype=object)
+    return pd.Series(rotulos[codigos], index=datas.index, name=datas.name)
+
+
+def agregar_resumo(cabecalho, linhas, aba_nome):
+    """
+    Reduz linhas brutas de VENDAS ou GASTOS (mesmo layout do Histórico) ao resumo mensal.
+    Linhas com valor/data inválidos ficam de fora, como na carga da predição. Aba só com o
+    cabeçalho: só a linha de controle (0 linhas brutas).
+    """
+    if aba_nome not in COLUNA_VALOR_POR_ABA:
+        return resumo_vazio()
+    if not linhas:
+        return cobertura_resumo(aba_nome, 0)
+
+    coluna_valor, categoricas = colunas_da_aba(aba_nome)
+    df = selecionar_colunas(cabecalho, linhas, [coluna_valor, COLUNA_DATA, *categoricas])
+    return combinar_resumos(resumir_tabela(df, aba_nome)[0], cobertura_resumo(aba_nome, len(linhas)))
+
+
+def resumir_tabela(df, aba_nome):
+    """
+    Reduz um DataFrame bruto (colunas de texto da aba) ao resumo mensal: total do mês e, em VENDAS,
+    subtotais por comprador e por sabor. Retorna (resumo, relatorio de parsear_tabela).
+    """
+    coluna_valor, categoricas = colunas_da_aba(aba_nome)
+    df_validos, relatorio = parsear_tabela(df, coluna_valor, COLUNA_DATA, 'Resumo', categoricas)
+    return resumir_validos(df_validos, aba_nome), relatorio
+
+
+def resumir_validos(df_validos, aba_nome, prefixo='Resumo'):
+    """Resumo mensal das linhas já tratadas (colunas Data_Datetime e <prefixo>_Centavos de parsear_tabela)."""
+    if df_validos.empty:
+        return resumo_vazio()
+
+    centavos = df_validos[f'{prefixo}_Centavos']
+    mes_ano = rotulos_mes(df_validos['Data_Datetime'])
+    coluna_destino = COLUNA_RESUMO_POR_ABA[aba_nome]
+
+    partes = [centavos.groupby(mes_ano).sum().rename_axis('MES_ANO').reset_index(name=coluna_destino).assign(DIMENSAO=DIMENSAO_TOTAL, CHAVE='')]
+
+    # Subtotais por comprador e por sabor (só existem em VENDAS)
+    for dimensao, coluna in ((DIMENSAO_COMPRADOR, COLUNA_COMPRADOR), (DIMENSAO_SABOR, COLUNA_ITEM_VENDIDO)):
+        if aba_nome == ABA_VENDAS and coluna in df_validos.columns:
+            subtotal = centavos.groupby([mes_ano, df_validos[coluna].astype(str)]).sum()
+            subtotal.index.names = ['MES_ANO', 'CHAVE']
+            partes.append(subtotal.reset_index(name=coluna_destino).assign(DIMENSAO=dimensao))
+
+    return combinar_resumos(*partes)
+
+
+def cobertura_resumo(aba_nome, qtd_linhas):
+    """Linha de controle: o resumo somou qtd_linhas linhas brutas da aba (válidas ou não)."""
+    return pd.DataFrame([{'MES_ANO': '', 'DIMENSAO': DIMENSAO_LINHAS_BRUTAS, 'CHAVE': aba_nome, COLUNA_RESUMO_POR_ABA[aba_nome]: qtd_linhas}])
+
+
+def cobertura_do_resumo(df_resumo):
+    """{aba: linhas brutas somadas} das linhas de controle. Resumo antigo, sem elas: {}."""
+    controle = df_resumo[df_resumo['DIMENSAO'] == DIMENSAO_LINHAS_BRUTAS]
+    return {
+        aba: int(controle.loc[controle['CHAVE'] == aba, coluna].sum())
+        for aba, coluna in COLUNA_RESUMO_POR_ABA.items() if (controle['CHAVE'] == aba).any()
+    }
+
+
+def sem_cobertura(df_resumo):
+    """O resumo sem as linhas de controle (histórico importado de CSV não tem linhas nas abas brutas)."""
+    return df_resumo[df_resumo['DIMENSAO'] != DIMENSAO_LINHAS_BRUTAS].reset_index(drop=True)
+
+
+def cobertura_confere(planilha, df_resumo, abas=(ABA_VENDAS, ABA_GASTOS)):
+    """
+    Confere o resumo com as abas brutas numa leitura de duas linhas por aba: se o resumo somou N linhas,
+    a linha N + 1 da planilha (a última de dados, depois do cabeçalho) está preenchida e a N + 2 vazia.
+    Retorna as abas que não batem (vazia = resumo em dia). Sem linha de controle, a aba não bate.
+    """
+    cobertura = cobertura_do_resumo(df_resumo)
+    abas = [aba for aba in abas if aba in COLUNA_RESUMO_POR_ABA]
+    conferidas = [aba for aba in abas if aba in cobertura]
+    faixas = [intervalo(aba, f'A{cobertura[aba] + 1}:ZZ{cobertura[aba] + 2}') for aba in conferidas]
+    blocos = com_retentativa(ler_intervalos, planilha, faixas)
+    return [aba for aba in abas if aba not in cobertura] + [aba for aba, bloco in zip(conferidas, blocos) if len(bloco) != 1]
+
+
+def ler_resumo_importado(planilha):
+    """Resumo do histórico importado de CSV (aba RESUMO_IMPORTADO); vazio se a loja não tem importação."""
+    try:
+        linhas = com_retentativa(ler_intervalos, planilha, [intervalo(ABA_RESUMO_IMPORTADO)], valores_brutos=True)[0]
+    except WorksheetNotFound:
+        return resumo_vazio()
+    return sem_cobertura(linhas_para_resumo(linhas))
+
+
+def resumo_do_historico(planilha, abas, importado=None):
+    """
+    Resumo completo do Histórico numa varredura única das abas brutas (com as linhas de controle) +
+    o histórico importado de CSV (aba RESUMO_IMPORTADO, ou `importado` se já estiver em memória).
+    """
+    dados_historico = com_retentativa(ler_abas, planilha, list(abas))
+    importado = ler_resumo_importado(planilha) if importado is None else sem_cobertura(importado)
+    return combinar_resumos(importado, *[
+        agregar_resumo(dados[0], dados[1:], aba) for aba, dados in dados_historico.items() if dados
+    ])
+
+
+def combinar_resumos(*resumos):
+    """Soma resumos parciais (mesma chave mês/dimensão/chave)."""
+    resumos = [r for r in resumos if r is not None and not r.empty]
+    if not resumos:
+        return resumo_vazio()
+
+    combinado = pd.concat(resumos, ignore_index=True)
+    for coluna in ('VENDAS_CENTAVOS', 'GASTOS_CENTAVOS'):
+        combinado[coluna] = combinado[coluna].fillna(0).astype('int64') if coluna in combinado else 0
+
+    combinado = combinado.groupby(CHAVES_RESUMO, as_index=False)[['VENDAS_CENTAVOS', 'GASTOS_CENTAVOS']].sum()
+    return combinado[COLUNAS_RESUMO].sort_values(CHAVES_RESUMO, ignore_index=True)
+
+
+def resumo_para_linhas(df_resumo):
+    """Converte o resumo para linhas da planilha (com cabeçalho), números como inteiros nativos."""
+    linhas = [COLUNAS_RESUMO]
+    for mes_ano, dimensao, chave, vendas, gastos in df_resumo[COLUNAS_RESUMO].itertuples(index=False):
+        linhas.append([mes_ano, dimensao, chave, int(vendas), int(gastos)])
+    return linhas
+
+
+def linhas_para_resumo(linhas):
+    """Converte as linhas lidas da aba (UNFORMATTED_VALUE) de volta para o DataFrame do resumo."""
+    if not linhas or len(linhas) < 2:
+        return resumo_vazio()
+
+    largura = len(COLUNAS_RESUMO)
+    df = pd.DataFrame([(list(linha) + [''] * largura)[:largura] for linha in linhas[1:]], columns=COLUNAS_RESUMO)
+    for coluna in ('MES_ANO', 'DIMENSAO', 'CHAVE'):
+        df[coluna] = df[coluna].astype(str)
+    for coluna in ('VENDAS_CENTAVOS', 'GASTOS_CENTAVOS'):
+        df[coluna] = pd.to_numeric(df[coluna], errors='coerce').fillna(0).round().astype('int64')
+    return df
+
+
+def ler_resumo_arquivo(caminho):
+    """Lê um resumo persistido localmente (JSON de linhas). Sem arquivo = None."""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return linhas_para_resumo(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def gravar_resumo_arquivo(caminho, df_resumo):
+    """Persiste o resumo localmente de forma atômica."""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(resumo_para_linhas(df_resumo), f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def mensal_do_resumo(df_resumo):
+    """
+    Monta o mesmo frame mensal de carregar_e_combinar_dados (Total_Vendas, Total_Gastos,
+    Lucro_Liquido, Mes_Ano) a partir das linhas TOTAL do resumo.
+    """
+    totais = df_resumo[df_resumo['DIMENSAO'] == DIMENSAO_TOTAL]
+    totais = totais.groupby('MES_ANO')[['VENDAS_CENTAVOS', 'GASTOS_CENTAVOS']].sum().sort_index()
+
+    vendas = totais['VENDAS_CENTAVOS'].to_numpy()
+    gastos = totais['GASTOS_CENTAVOS'].to_numpy()
+    df_mensal = pd.DataFrame({
+        'Total_Vendas': vendas / 100,
+        'Total_Gastos': gastos / 100,
+        'Lucro_Liquido': (vendas - gastos) / 100,
+    })
+    df_mensal['Mes_Ano'] = pd.PeriodIndex(totais.index, freq='M').to_timestamp(how='end').normalize()
+    return df_mensal
+
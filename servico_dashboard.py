@@ -0,0 +1,237 @@
+import io
+import os
+import json
+import time
+import asyncio
+import contextlib
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from dashboard_ml import montar_dashboard_ml, snapshot_dashboard
+
+# --- SERVIÇO DO DASHBOARD (HTTP LOCAL COM CACHE EM MEMÓRIA) ---
+# 'python cli.py serve' mantém o frame mensal, os KPIs e a página renderizada em memória e responde
+# direto desse cache (bytes prontos): a latência não depende do tamanho do histórico.
+# A recarga (planilha + modelos) roda numa thread, a cada TTL. Requisições simultâneas compartilham
+# UMA recarga (single-flight) e, enquanto ela roda, recebem os dados anteriores (stale-while-revalidate).
+HOST_SERVICO = os.environ.get('SERVICO_HOST', '127.0.0.1')
+PORTA_SERVICO = int(os.environ.get('SERVICO_PORTA', '8050'))
+TTL_SERVICO_SEGUNDOS = float(os.environ.get('SERVICO_TTL_SEGUNDOS', '900'))
+
+# Tempo máximo para um cliente enviar a linha de requisição e os cabeçalhos
+TIMEOUT_REQUISICAO_SEGUNDOS = 10
+
+# Rotas servidas do cache (a página também no nome do arquivo publicado no GitHub Pages)
+ROTA_PAGINA = '/'
+ROTAS_CACHE = {ROTA_PAGINA, '/api/resumo', '/api/historico', '/api/snapshot'}
+APELIDOS_ROTAS = {'/dashboard_ml_insights.html': ROTA_PAGINA, '/index.html': ROTA_PAGINA}
+TIPO_JSON = 'application/json; charset=utf-8'
+# --------------------------------------------------------------------------------
+
+
+def _json(dados):
+    return TIPO_JSON, json.dumps(dados, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def montar_respostas(argumentos, gerado_em):
+    """Renderiza a página e serializa a API a partir dos argumentos de montar_dashboard_ml. {rota: (tipo, bytes)}."""
+    pagina = io.StringIO()
+    montar_dashboard_ml(**argumentos, destino=pagina)
+
+    leaderboard = argumentos['leaderboard']
+    df_cenarios = argumentos.get('df_cenarios')
+    resumo = {
+        'gerado_em': gerado_em,
+        'previsao_lucro_proximo_mes': float(argumentos['previsao']),
+        'mae': float(argumentos['mae']),
+        'ultimo_lucro_real': float(argumentos['ultimo_valor_real']),
+        'modelo': None if leaderboard is None else leaderboard.index[0],
+        'prob_prejuizo_proximo_mes': None if df_cenarios is None else float(df_cenarios['Prob_Prejuizo'].iloc[0]),
+        'ano_atual': int(argumentos['ano_atual']),
+        'ano_anterior': int(argumentos['ano_ant']),
+        'melhor_comprador_atual': argumentos['melhor_comprador_atual'],
+        'produto_mais_vendido_atual': argumentos['produto_mais_vendido_atual'],
+        'melhor_comprador_anterior': argumentos['melhor_comprador_ant'],
+        'produto_mais_vendido_anterior': argumentos['produto_mais_vendido_ant'],
+        'comparativo_anual': argumentos.get('comparativo_anual'),
+    }
+    historico = [
+        {'mes': mes_ano.strftime('%Y-%m'), 'vendas': float(vendas), 'gastos': float(gastos), 'lucro': float(lucro)}
+        for mes_ano, vendas, gastos, lucro in argumentos['df_historico'][['Mes_Ano', 'Total_Vendas', 'Total_Gastos', 'Lucro_Liquido']].itertuples(index=False)
+    ]
+    return {
+        ROTA_PAGINA: ('text/html; charset=utf-8', pagina.getvalue().encode('utf-8')),
+        '/api/resumo': _json(resumo),
+        '/api/historico': _json(historico),
+        '/api/snapshot': _json(snapshot_dashboard(**argumentos)),
+    }
+
+
+class CacheDashboard:
+    """
+    Respostas do dashboard em memória. carregar() é síncrona e pesada (planilha, pandas, backtest):
+    roda numa thread, no máximo uma por vez, e devolve os argumentos de montar_dashboard_ml.
+    """
+
+    def __init__(self, carregar, ttl=TTL_SERVICO_SEGUNDOS):
+        self.carregar = carregar
+        self.ttl = ttl
+        self.respostas = None      # {rota: (tipo, bytes)} da última recarga bem-sucedida
+        self.atualizado_em = None  # time.monotonic() dessa recarga
+        self.gerado_em = None      # o mesmo instante em ISO, para cabeçalhos e /saude
+        self.ultimo_erro = None
+        self.recargas = 0
+        self._recarga = None       # asyncio.Task da recarga em andamento (single-flight)
+
+    def idade_segundos(self):
+        return None if self.atualizado_em is None else time.monotonic() - self.atualizado_em
+
+    def expirado(self):
+        return self.atualizado_em is None or self.idade_segundos() >= self.ttl
+
+    def recarregar(self):
+        """Inicia uma recarga, ou devolve a que já está em andamento (single-flight)."""
+        if self._recarga is None:
+            self._recarga = asyncio.get_running_loop().create_task(self._executar_recarga())
+            self._recarga.add_done_callback(self._fim_recarga)
+        return self._recarga
+
+    def _fim_recarga(self, tarefa):
+        self._recarga = None
+        if not tarefa.cancelled():
+            tarefa.exception()  # já registrada em ultimo_erro; evita o aviso de exceção não lida
+
+    def _carregar_respostas(self):
+        argumentos = self.carregar()
+        gerado_em = datetime.now().isoformat(timespec='seconds')
+        return montar_respostas(argumentos, gerado_em), gerado_em
+
+    async def _executar_recarga(self):
+        inicio = time.perf_counter()
+        try:
+            respostas, gerado_em = await asyncio.to_thread(self._carregar_respostas)
+        except Exception as e:
+            self.ultimo_erro = f"{type(e).__name__}: {e}"
+            aviso = " Servindo os dados anteriores." if self.respostas else ""
+            print(f"Alerta: recarga do dashboard falhou ({e}).{aviso}")
+            raise
+
+        self.respostas, self.gerado_em = respostas, gerado_em
+        self.atualizado_em = time.monotonic()
+        self.ultimo_erro = None
+        self.recargas += 1
+        print(f"Dashboard recarregado em {time.perf_counter() - inicio:.1f}s ({gerado_em}).")
+
+    async def obter(self):
+        """
+        Respostas atuais. Só espera a recarga se ainda não houver nenhuma resposta; expiradas são
+        servidas assim mesmo e disparam a recarga em segundo plano.
+        """
+        if self.respostas is None:
+            # shield: um cliente que desconecta não cancela a recarga compartilhada
+            await asyncio.shield(self.recarregar())
+        elif self.expirado():
+            self.recarregar()
+        return self.respostas
+
+    def saude(self):
+        idade = self.idade_segundos()
+        return {
+            'gerado_em': self.gerado_em,
+            'idade_segundos': None if idade is None else round(idade, 1),
+            'ttl_segundos': self.ttl,
+            'atualizando': self._recarga is not None,
+            'recargas': self.recargas,
+            'ultimo_erro': self.ultimo_erro,
+        }
+
+
+async def manter_atualizado(cache):
+    """Recarga periódica: quando o TTL vence, recarrega mesmo sem requisições."""
+    while True:
+        idade = cache.idade_segundos()
+        await asyncio.sleep(cache.ttl if idade is None else max(cache.ttl - idade, 1.0))
+        if cache.expirado():
+            with contextlib.suppress(Exception):
+                await cache.recarregar()
+
+
+async def _responder(escritor, status, tipo, corpo, cabecalhos_extras=(), somente_cabecalhos=False):
+    cabecalhos = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {tipo}",
+        f"Content-Length: {len(corpo)}",
+        "Cache-Control: no-cache",
+        "Connection: close",
+        *cabecalhos_extras,
+    ]
+    escritor.write(("\r\n".join(cabecalhos) + "\r\n\r\n").encode('latin-1') + (b"" if somente_cabecalhos else corpo))
+    await escritor.drain()
+
+
+async def atender(cache, leitor, escritor):
+    """Uma requisição HTTP/1.1 por conexão: GET/HEAD das rotas do cache e /saude."""
+    try:
+        linha = await asyncio.wait_for(leitor.readline(), TIMEOUT_REQUISICAO_SEGUNDOS)
+        while (await asyncio.wait_for(leitor.readline(), TIMEOUT_REQUISICAO_SEGUNDOS)) not in (b"\r\n", b"\n", b""):
+            pass  # cabeçalhos da requisição não são usados
+
+        partes = linha.decode('latin-1').split()
+        if len(partes) < 2:
+            await _responder(escritor, HTTPStatus.BAD_REQUEST, 'text/plain; charset=utf-8', b"Requisicao invalida")
+            return
+        metodo, caminho = partes[0], urlsplit(partes[1]).path
+        rota = APELIDOS_ROTAS.get(caminho, caminho.rstrip('/') or ROTA_PAGINA)
+
+        if metodo not in ('GET', 'HEAD'):
+            await _responder(escritor, HTTPStatus.METHOD_NOT_ALLOWED, 'text/plain; charset=utf-8', b"Use GET", ("Allow: GET, HEAD",))
+            return
+        somente_cabecalhos = metodo == 'HEAD'
+
+        if rota == '/saude':
+            await _responder(escritor, HTTPStatus.OK, *_json(cache.saude()), somente_cabecalhos=somente_cabecalhos)
+        elif rota in ROTAS_CACHE:
+            try:
+                respostas = await cache.obter()
+            except Exception as e:
+                await _responder(escritor, HTTPStatus.SERVICE_UNAVAILABLE, *_json({'erro': str(e)}), ("Retry-After: 30",), somente_cabecalhos)
+                return
+            await _responder(escritor, HTTPStatus.OK, *respostas[rota], (f"X-Dados-Gerados-Em: {cache.gerado_em}",), somente_cabecalhos)
+        else:
+            await _responder(escritor, HTTPStatus.NOT_FOUND, *_json({'erro': f"Rota {rota} não existe", 'rotas': sorted(ROTAS_CACHE | {'/saude'})}), somente_cabecalhos=somente_cabecalhos)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        escritor.close()
+        with contextlib.suppress(ConnectionError):
+            await escritor.wait_closed()
+
+
+async def servir(carregar, host=HOST_SERVICO, porta=PORTA_SERVICO, ttl=TTL_SERVICO_SEGUNDOS, pronto=None):
+    """Sobe o servidor, aquece o cache e mantém a recarga periódica até ser cancelado."""
+    cache = CacheDashboard(carregar, ttl)
+    servidor = await asyncio.start_server(lambda leitor, escritor: atender(cache, leitor, escritor), host, porta)
+    cache.recarregar()  # aquecimento: a primeira requisição aguarda esta mesma recarga
+    atualizador = asyncio.create_task(manter_atualizado(cache))
+
+    porta_real = servidor.sockets[0].getsockname()[1]
+    print(f"Dashboard em http://{host}:{porta_real}/ (API em /api/resumo, /api/historico, /api/snapshot; TTL {ttl:.0f}s).")
+    if pronto is not None:
+        pronto(cache, porta_real)
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        atualizador.cancel()
+
+
+def main(host=HOST_SERVICO, porta=PORTA_SERVICO, ttl=TTL_SERVICO_SEGUNDOS):
+    """Serviço com a mesma carga da predição (planilha configurada em FONTE_DADOS)."""
+    from acesso_planilhas import autenticar_gspread
+    from predicao_ml import carregar_argumentos_dashboard
+
+    try:
+        asyncio.run(servir(lambda: carregar_argumentos_dashboard(autenticar_gspread()), host, porta, ttl))
+    except KeyboardInterrupt:
+        print("Serviço encerrado.")
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# --- CENÁRIOS DE LUCRO (MONTE CARLO COM BLOCK BOOTSTRAP) ---
+# Choques mensais = variação logarítmica de Vendas e de Gastos de um mês para o outro, sorteados
+# JUNTOS (mesmo mês histórico para as duas séries, preservando a correlação) em blocos de meses
+# consecutivos (preserva a autocorrelação). Cada caminho parte do último mês observado.
+# Os caminhos saem em lotes de tamanho fixo: a memória de trabalho não depende da quantidade de caminhos.
+SIMULAR_CENARIOS = os.environ.get('SIMULAR_CENARIOS', 'true').lower() == 'true'
+CAMINHOS_CENARIOS = int(os.environ.get('CENARIOS_CAMINHOS', '100000'))
+HORIZONTE_CENARIOS = min(max(int(os.environ.get('CENARIOS_HORIZONTE', '6')), 3), 12)
+TAMANHO_BLOCO_CHOQUES = int(os.environ.get('CENARIOS_TAMANHO_BLOCO', '3'))
+CAMINHOS_POR_LOTE = int(os.environ.get('CENARIOS_CAMINHOS_POR_LOTE', '20000'))
+
+# Processos para os lotes (1 = sequencial). Cada lote tem a sua semente: o resultado é o mesmo com qualquer número de processos
+PROCESSOS_CENARIOS = int(os.environ.get('CENARIOS_PROCESSOS', '1'))
+SEMENTE_CENARIOS = int(os.environ.get('CENARIOS_SEMENTE', '42'))
+
+QUANTIS_CENARIOS = (0.05, 0.25, 0.50, 0.75, 0.95)
+COLUNAS_QUANTIS = [f'P{int(q * 100):02d}' for q in QUANTIS_CENARIOS]
+
+# Piso (R$) antes do log: um mês zerado não vira -infinito
+PISO_NIVEL = 1.0
+# --------------------------------------------------------------------------------
+
+
+def choques_mensais(df_mensal):
+    """Matriz (meses - 1) x 2 com a variação logarítmica mês a mês de [Total_Vendas, Total_Gastos]."""
+    niveis = np.maximum(df_mensal[['Total_Vendas', 'Total_Gastos']].to_numpy(dtype='float64'), PISO_NIVEL)
+    return np.diff(np.log(niveis), axis=0)
+
+
+def indices_block_bootstrap(rng, qtd_caminhos, horizonte, qtd_choques, tamanho_bloco):
+    """Índices (caminhos x horizonte) de choques: blocos consecutivos com início sorteado, emendados até o horizonte."""
+    blocos = -(-horizonte // tamanho_bloco)
+    inicios = rng.integers(0, qtd_choques - tamanho_bloco + 1, size=(qtd_caminhos, blocos))
+    return (inicios[:, :, np.newaxis] + np.arange(tamanho_bloco)).reshape(qtd_caminhos, -1)[:, :horizonte]
+
+
+def _simular_lote(tarefa):
+    """Unidade de trabalho (lote): lucro de qtd_caminhos caminhos x horizonte meses, em float32."""
+    choques, niveis_iniciais, horizonte, tamanho_bloco, qtd_caminhos, semente = tarefa
+    rng = np.random.default_rng(semente)
+    indices = indices_block_bootstrap(rng, qtd_caminhos, horizonte, len(choques), tamanho_bloco)
+
+    # (caminhos x horizonte x 2): soma acumulada dos choques -> níveis de Vendas e Gastos em cada mês
+    niveis = np.exp(np.cumsum(choques[indices], axis=1))
+    niveis *= niveis_iniciais
+    return (niveis[:, :, 0] - niveis[:, :, 1]).astype('float32')
+
+
+def simular_caminhos(df_mensal, qtd_caminhos=CAMINHOS_CENARIOS, horizonte=HORIZONTE_CENARIOS,
+                     tamanho_bloco=TAMANHO_BLOCO_CHOQUES, caminhos_por_lote=CAMINHOS_POR_LOTE,
+                     processos=PROCESSOS_CENARIOS, semente=SEMENTE_CENARIOS):
+    """
+    Matriz (caminhos x horizonte) do Lucro_Liquido simulado nos próximos meses, em float32.
+    Só essa matriz cresce com qtd_caminhos; os intermediários vivem por lote.
+    Retorna None se o histórico for curto demais para sortear blocos.
+    """
+    choques = choques_mensais(df_mensal)
+    tamanho_bloco = min(tamanho_bloco, horizonte)
+    if len(choques) < 2 * tamanho_bloco:
+        print(f"Alerta: {len(df_mensal)} meses não bastam para os cenários (blocos de {tamanho_bloco} meses). Simulação pulada.")
+        return None
+
+    niveis_iniciais = df_mensal[['Total_Vendas', 'Total_Gastos']].to_numpy(dtype='float64')[-1]
+    tamanhos = [min(caminhos_por_lote, qtd_caminhos - inicio) for inicio in range(0, qtd_caminhos, caminhos_por_lote)]
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    tarefas = [(choques, niveis_iniciais, horizonte, tamanho_bloco, qtd, s) for qtd, s in zip(tamanhos, sementes)]
+
+    lucros = np.empty((qtd_caminhos, horizonte), dtype='float32')
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            lotes = executor.map(_simular_lote, tarefas)
+            # Cada lote é copiado para a matriz assim que chega (os resultados não se acumulam)
+            for inicio, lote in zip(np.cumsum([0] + tamanhos[:-1]), lotes):
+                lucros[inicio:inicio + len(lote)] = lote
+    else:
+        for inicio, tarefa in zip(np.cumsum([0] + tamanhos[:-1]), tarefas):
+            lucros[inicio:inicio + tarefa[4]] = _simular_lote(tarefa)
+    return lucros
+
+
+def resumir_caminhos(lucros, ultimo_mes):
+    """
+    Uma linha por mês simulado: Mes_Ano, as faixas de quantis (P05..P95), o lucro médio e a
+    probabilidade de prejuízo, P(Lucro_Liquido < 0).
+    """
+    quantis = np.quantile(lucros, QUANTIS_CENARIOS, axis=0)
+    df_cenarios = pd.DataFrame(quantis.T.astype('float64'), columns=COLUNAS_QUANTIS)
+    df_cenarios.insert(0, 'Mes_Ano', pd.date_range(ultimo_mes + pd.offsets.MonthEnd(1), periods=lucros.shape[1], freq='ME'))
+    df_cenarios['Lucro_Medio'] = lucros.mean(axis=0, dtype='float64')
+    df_cenarios['Prob_Prejuizo'] = (lucros < 0).mean(axis=0)
+    return df_cenarios
+
+
+def simular_cenarios(df_mensal, **kwargs):
+    """Cenários de lucro dos próximos meses a partir do frame mensal (None se o histórico for curto)."""
+    lucros = simular_caminhos(df_mensal, **kwargs)
+    if lucros is None:
+        return None
+    return resumir_caminhos(lucros, pd.Timestamp(df_mensal['Mes_Ano'].iloc[-1]).normalize())